@@ -0,0 +1,165 @@
+"""
+Микробенчмарки накладных расходов фреймворка на один update
+
+Сеть не используется: бот работает через InMemoryTransport, update подаются
+прямо в диспетчер. Результат каждого сценария - время на операцию (минимум
+из нескольких повторов).
+
+Запуск:
+    python benchmarks/bench_dispatch.py --save baseline.json
+    # ... изменения ...
+    python benchmarks/bench_dispatch.py --compare baseline.json --threshold 0.15
+
+С --compare скрипт завершается с кодом 1, если какой-то сценарий замедлился
+больше чем на threshold.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from typing import Awaitable, Callable, Dict
+
+from tgframework import TelegramBot, Filters, Middleware, MiddlewareManager
+from tgframework.testing import InMemoryTransport
+
+
+def message_update(text: str, chat_id: int = 1000) -> Dict:
+    user = {"id": chat_id, "is_bot": False, "first_name": "Bench"}
+    return {
+        "update_id": 1,
+        "message": {
+            "message_id": 1,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": user,
+            "text": text,
+        },
+    }
+
+
+def callback_update(data: str) -> Dict:
+    update = message_update("menu")
+    return {
+        "update_id": 1,
+        "callback_query": {
+            "id": "1",
+            "from": update["message"]["from"],
+            "message": update["message"],
+            "chat_instance": "1",
+            "data": data,
+        },
+    }
+
+
+class PassMiddleware(Middleware):
+    async def process(self, update, context):
+        context["seen"] = True
+        return True
+
+
+async def noop(update, context):
+    pass
+
+
+def build_bot(middlewares: int = 0) -> TelegramBot:
+    """Бот с типичным набором обработчиков"""
+    bot = TelegramBot("123456:BENCH", transport=InMemoryTransport(record=False))
+    for i in range(20):
+        bot.register_command(f"cmd{i}", noop)
+    for i in range(50):
+        bot.register_callback(f"action{i}:", noop)
+    for i in range(10):
+        bot.register_message_handler(noop, Filters.TextStartswith(f"prefix{i}") & Filters.PrivateChat())
+    bot.register_message_handler(noop, Filters.Text() & Filters.PrivateChat())
+    for _ in range(middlewares):
+        bot.middleware_manager.add(PassMiddleware())
+    return bot
+
+
+async def measure(func: Callable[[], Awaitable], iterations: int, repeat: int) -> float:
+    """Минимальное время одной операции в наносекундах"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            await func()
+        best = min(best, (time.perf_counter() - started) / iterations)
+    return best * 1e9
+
+
+async def run(iterations: int, repeat: int) -> Dict[str, float]:
+    bot = build_bot()
+    bot_mw = build_bot(middlewares=5)
+    manager = MiddlewareManager()
+    for _ in range(5):
+        manager.add(PassMiddleware())
+    
+    command = message_update("/cmd19 arg")
+    text = message_update("hello")
+    callback = callback_update("action49:42")
+    composite = (Filters.Text() & Filters.PrivateChat()) | Filters.Command("start")
+    
+    async def filters_check():
+        composite.check(text)
+    
+    async def send_message():
+        await bot.send_message(1000, "hi", rate_limit=False)
+    
+    scenarios = {
+        "process_update.command": lambda: bot.feed_update(command),
+        "process_update.text_filters": lambda: bot.feed_update(text),
+        "process_update.callback_routing": lambda: bot.feed_update(callback),
+        "process_update.5_middlewares": lambda: bot_mw.feed_update(text),
+        "middleware_manager.process.5": lambda: manager.process(text, {}),
+        "filters.composite_check": filters_check,
+        "send_message.in_memory": send_message,
+    }
+    
+    results = {}
+    for name, func in scenarios.items():
+        results[name] = await measure(func, iterations, repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dispatcher overhead benchmarks")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="Сохранить результаты в JSON")
+    parser.add_argument("--compare", help="Сравнить с сохраненными результатами")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Допустимое замедление (доля)")
+    args = parser.parse_args()
+    
+    logging.getLogger().setLevel(logging.WARNING)
+    results = asyncio.run(run(args.iterations, args.repeat))
+    
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    
+    regressions = []
+    print(f"{'scenario':<34} {'ns/op':>10} {'ops/s':>12} {'vs base':>9}")
+    for name, ns in results.items():
+        line = f"{name:<34} {ns:>10.0f} {1e9 / ns:>12.0f}"
+        if name in baseline:
+            change = ns / baseline[name] - 1
+            line += f" {change:>+8.1%}"
+            if change > args.threshold:
+                regressions.append(name)
+        print(line)
+    
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    
+    if regressions:
+        print(f"Regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+End-to-end бенчмарк TelegramBot на локальном FakeTelegramAPI
+
+Бот получает update через getUpdates и отвечает на каждый sendMessage.
+Измеряются updates/s от первого getUpdates до последнего ответа и
+перцентили задержки sendMessage.
+
+Запуск:
+    python benchmarks/bench_e2e.py --updates 5000 --latency 0.005 --rate-429 0.01
+    python benchmarks/bench_e2e.py --journal data/journal
+    python benchmarks/bench_e2e.py --poll-latency 0.05 --latency 0.001 --prefetch
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+from tgframework import TelegramBot
+from tgframework.testing import FakeTelegramAPI
+
+
+def percentile(values, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def run(args) -> None:
+    api = FakeTelegramAPI(
+        latency=args.latency,
+        rate_limit_rate=args.rate_429,
+        retry_after=args.retry_after,
+        error_rate=args.error_rate,
+        poll_latency=args.poll_latency,
+        seed=42,
+    )
+    await api.start()
+    
+    if args.journal:
+        api.add_journal(args.journal)
+    else:
+        api.generate_updates(args.updates, chats=args.chats)
+    total = len(api.updates)
+    
+    bot = TelegramBot("123456:BENCHMARK", api_base_url=api.base_url)
+    bot.timeout = 1
+    bot.limit = args.limit
+    bot.prefetch_updates = args.prefetch
+    latencies = []
+    
+    @bot.register_message_handler()
+    async def echo(update, context):
+        started = time.perf_counter()
+        try:
+            await bot.send_message(context["chat"]["id"], context.get("text") or "ok", rate_limit=False)
+        except Exception:
+            pass
+        latencies.append(time.perf_counter() - started)
+    
+    started = time.perf_counter()
+    polling = asyncio.create_task(bot.start_polling())
+    while len(latencies) < total and not polling.done():
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    
+    await bot.stop()
+    await polling
+    await api.stop()
+    
+    print(f"updates:        {len(latencies)}/{total}")
+    print(f"elapsed:        {elapsed:.2f}s")
+    print(f"throughput:     {len(latencies) / elapsed:.0f} updates/s")
+    print(f"send p50:       {percentile(latencies, 50) * 1000:.2f} ms")
+    print(f"send p95:       {percentile(latencies, 95) * 1000:.2f} ms")
+    print(f"send p99:       {percentile(latencies, 99) * 1000:.2f} ms")
+    print(f"server:         {api.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TelegramBot end-to-end benchmark")
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--chats", type=int, default=100)
+    parser.add_argument("--journal", help="Воспроизвести update из журнала UpdateJournal")
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка ответа API, секунды")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Доля ответов 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля ответов 500")
+    parser.add_argument("--poll-latency", type=float, default=0.0, help="Задержка ответа getUpdates, секунды")
+    parser.add_argument("--limit", type=int, default=100, help="limit для getUpdates")
+    parser.add_argument("--prefetch", action="store_true", help="Запрашивать следующую пачку во время обработки")
+    args = parser.parse_args()
+    
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
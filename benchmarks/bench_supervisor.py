@@ -0,0 +1,78 @@
+"""
+Бенчмарк BotSupervisor: пропускная способность в зависимости от числа воркеров
+
+Обработчик имитирует CPU-нагрузку, update генерируются локально (без сети).
+
+Запуск:
+    python benchmarks/bench_supervisor.py --updates 2000 --chats 200 --workers 1 2 4
+"""
+
+import argparse
+import hashlib
+import time
+
+from tgframework import TelegramBot, BotSupervisor
+
+WORK_ROUNDS = 2000
+
+
+async def heavy_handler(update, context):
+    """Обработчик с CPU-нагрузкой"""
+    data = (context.get("text") or "").encode()
+    for _ in range(WORK_ROUNDS):
+        data = hashlib.sha256(data).digest()
+
+
+def create_bot():
+    bot = TelegramBot("0:benchmark")
+    bot.register_message_handler(heavy_handler)
+    return bot
+
+
+def make_updates(count: int, chats: int):
+    return [
+        {
+            "update_id": i + 1,
+            "message": {
+                "message_id": i + 1,
+                "date": 0,
+                "chat": {"id": 1000 + i % chats, "type": "private"},
+                "from": {"id": 1000 + i % chats, "is_bot": False, "first_name": "bench"},
+                "text": f"message {i}",
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def run(workers: int, updates) -> float:
+    supervisor = BotSupervisor(create_bot, workers=workers, queue_size=len(updates))
+    supervisor.start_workers()
+    # Прогрев: дождаться запуска процессов
+    time.sleep(1.0)
+    
+    started = time.perf_counter()
+    for update in updates:
+        supervisor.dispatch_nowait(update)
+    supervisor.stop_workers(timeout=600)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BotSupervisor throughput benchmark")
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    
+    updates = make_updates(args.updates, args.chats)
+    baseline = None
+    print(f"{'workers':>8} {'seconds':>9} {'updates/s':>10} {'speedup':>8}")
+    for workers in args.workers:
+        elapsed = run(workers, updates)
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>9.2f} {len(updates) / elapsed:>10.0f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -33,6 +33,8 @@ from .orm import (
     Session,
     Migration,
     MigrationManager,
+    PartitionManager,
+    PartitionedTableMigration,
 )
 
 # Domain (DDD)
@@ -41,14 +43,21 @@ from .domain import (
     Chat,
     Message,
     UserState,
+    ScheduledJob,
     UserDTO,
     ChatDTO,
     MessageDTO,
     CreateUserDTO,
     UpdateUserDTO,
+    SearchHitDTO,
+    SearchPageDTO,
     UserRepository,
     ChatRepository,
     MessageRepository,
+    CachedUserRepository,
+    CachedChatRepository,
+    ScheduledJobRepository,
+    MessageSearchIndex,
     UserService,
     ChatService,
     MessageService,
@@ -58,13 +67,19 @@ from .domain import (
 from .application import (
     CommandHandler,
     CallbackHandler,
+    InlineQueryHandler,
     MessageHandler,
+    AlbumHandler,
     InlineKeyboardBuilder,
     ReplyKeyboardBuilder,
     Filter,
     Filters,
     Middleware,
     MiddlewareManager,
+    UserTrackingMiddleware,
+    MessageLogPipeline,
+    MessageLogMiddleware,
+    ThrottlingMiddleware,
     StateMachine,
     State,
     PaginationKeyboard,
@@ -75,6 +90,15 @@ from .application import (
 from .infrastructure import (
     RateLimiter,
     TelegramRateLimiter,
+    SlidingWindowCounter,
+    TTLCache,
+    UpdateDeduplicator,
+    SQLiteUpdateDeduplicator,
+    UpdateJournal,
+    JournalReader,
+    JournalReplayer,
+    FileIdCache,
+    SQLiteFileIdCache,
     get_user_info,
     get_chat_info,
     format_text,
@@ -96,6 +120,13 @@ from .features import (
 # Bot
 from .bot import TelegramBot
 from .bot import TelegramBot as Bot  # Alias
+from .bot import BotSupervisor, WebhookWorkerPool
+from .bot import OffsetStore, FileOffsetStore, DatabaseOffsetStore
+from .bot import Transport, AiohttpTransport, OutboundQueue, EditCoalescer
+from .bot import RetryPolicy, RetryBudget, CircuitBreaker, InputFile
+from .bot import MediaGroupAggregator, ChatMemberCache
+from .bot import Scheduler, Job, DateTrigger, IntervalTrigger, CronTrigger
+from .bot import HandlerExecutors
 
 # Web
 from .web import WebServer, TelegramAuth, Router, Controller
@@ -128,6 +159,8 @@ __all__ = [
     "Session",
     "Migration",
     "MigrationManager",
+    "PartitionManager",
+    "PartitionedTableMigration",
     "Database",  # Deprecated
     
     # Domain
@@ -135,14 +168,21 @@ __all__ = [
     "Chat",
     "Message",
     "UserState",
+    "ScheduledJob",
     "UserDTO",
     "ChatDTO",
     "MessageDTO",
     "CreateUserDTO",
     "UpdateUserDTO",
+    "SearchHitDTO",
+    "SearchPageDTO",
     "UserRepository",
     "ChatRepository",
     "MessageRepository",
+    "CachedUserRepository",
+    "CachedChatRepository",
+    "ScheduledJobRepository",
+    "MessageSearchIndex",
     "UserService",
     "ChatService",
     "MessageService",
@@ -150,13 +190,19 @@ __all__ = [
     # Application
     "CommandHandler",
     "CallbackHandler",
+    "InlineQueryHandler",
     "MessageHandler",
+    "AlbumHandler",
     "InlineKeyboardBuilder",
     "ReplyKeyboardBuilder",
     "Filter",
     "Filters",
     "Middleware",
     "MiddlewareManager",
+    "UserTrackingMiddleware",
+    "MessageLogPipeline",
+    "MessageLogMiddleware",
+    "ThrottlingMiddleware",
     "StateMachine",
     "State",
     "PaginationKeyboard",
@@ -165,6 +211,15 @@ __all__ = [
     # Infrastructure
     "RateLimiter",
     "TelegramRateLimiter",
+    "SlidingWindowCounter",
+    "TTLCache",
+    "UpdateDeduplicator",
+    "SQLiteUpdateDeduplicator",
+    "UpdateJournal",
+    "JournalReader",
+    "JournalReplayer",
+    "FileIdCache",
+    "SQLiteFileIdCache",
     "get_user_info",
     "get_chat_info",
     "format_text",
@@ -182,6 +237,27 @@ __all__ = [
     
     # Bot
     "TelegramBot",
+    "BotSupervisor",
+    "WebhookWorkerPool",
+    "OffsetStore",
+    "FileOffsetStore",
+    "DatabaseOffsetStore",
+    "Transport",
+    "AiohttpTransport",
+    "OutboundQueue",
+    "EditCoalescer",
+    "RetryPolicy",
+    "RetryBudget",
+    "CircuitBreaker",
+    "InputFile",
+    "MediaGroupAggregator",
+    "ChatMemberCache",
+    "Scheduler",
+    "Job",
+    "DateTrigger",
+    "IntervalTrigger",
+    "CronTrigger",
+    "HandlerExecutors",
     "Bot",
     
     # Web
@@ -2,23 +2,32 @@
 Application слой - handlers, keyboards, filters, middleware
 """
 
-from .handlers import CommandHandler, CallbackHandler, MessageHandler
+from .handlers import CommandHandler, CallbackHandler, InlineQueryHandler, MessageHandler, AlbumHandler
 from .keyboards import InlineKeyboardBuilder, ReplyKeyboardBuilder
 from .filters import Filter, Filters
 from .middleware import Middleware, MiddlewareManager
+from .tracking import UserTrackingMiddleware
+from .message_log import MessageLogPipeline, MessageLogMiddleware
+from .throttling import ThrottlingMiddleware
 from .state_machine import StateMachine, State
 from .pagination import PaginationKeyboard, SimplePagination
 
 __all__ = [
     "CommandHandler",
     "CallbackHandler",
+    "InlineQueryHandler",
     "MessageHandler",
+    "AlbumHandler",
     "InlineKeyboardBuilder",
     "ReplyKeyboardBuilder",
     "Filter",
     "Filters",
     "Middleware",
     "MiddlewareManager",
+    "UserTrackingMiddleware",
+    "MessageLogPipeline",
+    "MessageLogMiddleware",
+    "ThrottlingMiddleware",
     "StateMachine",
     "State",
     "PaginationKeyboard",
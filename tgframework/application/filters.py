@@ -1,13 +1,22 @@
 """
 Готовые фильтры для обработчиков (как в aiogram)
+
+Фильтры с is_async = True (например, IsAdmin) проверяются через
+check_async(update, context): им нужен бот из контекста и, возможно,
+запрос к API. Синхронный check таких фильтров отвечает только по кэшу.
 """
 
 from typing import Any, Dict, Optional, Callable
 
+from ..infrastructure.utils import extract_user_chat
+
 
 class Filter:
     """Базовый класс для фильтров"""
     
+    #: Фильтр требует check_async (обращение к боту / API)
+    is_async = False
+    
     def __call__(self, update: Dict[str, Any]) -> bool:
         """Проверить, соответствует ли update фильтру"""
         return self.check(update)
@@ -16,6 +25,10 @@ class Filter:
         """Проверить update"""
         raise NotImplementedError
     
+    async def check_async(self, update: Dict[str, Any], context: Dict[str, Any]) -> bool:
+        """Проверить update с доступом к контексту обработки (bot, ...)"""
+        return self.check(update)
+    
     def __and__(self, other):
         """Оператор & для комбинации фильтров"""
         return AndFilter(self, other)
@@ -29,15 +42,29 @@ class Filter:
         return NotFilter(self)
 
 
+def _sync_first(filter1: Filter, filter2: Filter) -> tuple:
+    """Порядок проверки в check_async: синхронный фильтр (с любой стороны) первым"""
+    if filter1.is_async and not filter2.is_async:
+        return filter2, filter1
+    return filter1, filter2
+
+
 class AndFilter(Filter):
     """Логическое И для фильтров"""
     
     def __init__(self, filter1: Filter, filter2: Filter):
         self.filter1 = filter1
         self.filter2 = filter2
+        self.is_async = filter1.is_async or filter2.is_async
+        self._async_order = _sync_first(filter1, filter2)
     
     def check(self, update: Dict[str, Any]) -> bool:
         return self.filter1.check(update) and self.filter2.check(update)
+    
+    async def check_async(self, update: Dict[str, Any], context: Dict[str, Any]) -> bool:
+        # Дешевая синхронная проверка отсекает запрос к API, с какой бы стороны & она ни стояла
+        first, second = self._async_order
+        return await first.check_async(update, context) and await second.check_async(update, context)
 
 
 class OrFilter(Filter):
@@ -46,9 +73,15 @@ class OrFilter(Filter):
     def __init__(self, filter1: Filter, filter2: Filter):
         self.filter1 = filter1
         self.filter2 = filter2
+        self.is_async = filter1.is_async or filter2.is_async
+        self._async_order = _sync_first(filter1, filter2)
     
     def check(self, update: Dict[str, Any]) -> bool:
         return self.filter1.check(update) or self.filter2.check(update)
+    
+    async def check_async(self, update: Dict[str, Any], context: Dict[str, Any]) -> bool:
+        first, second = self._async_order
+        return await first.check_async(update, context) or await second.check_async(update, context)
 
 
 class NotFilter(Filter):
@@ -56,9 +89,13 @@ class NotFilter(Filter):
     
     def __init__(self, filter_obj: Filter):
         self.filter_obj = filter_obj
+        self.is_async = filter_obj.is_async
     
     def check(self, update: Dict[str, Any]) -> bool:
         return not self.filter_obj.check(update)
+    
+    async def check_async(self, update: Dict[str, Any], context: Dict[str, Any]) -> bool:
+        return not await self.filter_obj.check_async(update, context)
 
 
 class Filters:
@@ -230,19 +267,42 @@ class Filters:
             return "reply_to_message" in message
     
     class IsAdmin(Filter):
-        """Фильтр для проверки администратора (требует bot в context)"""
+        """
+        Фильтр для администраторов группы (сообщения и callback query)
+        
+        Использует bot.chat_members: список администраторов чата кэшируется,
+        поэтому проверка обычно не обращается к API. В личных чатах - False.
+        """
+        
+        is_async = True
+        
+        def __init__(self, bot=None):
+            """
+            Args:
+                bot: TelegramBot (по умолчанию context["bot"])
+            """
+            self.bot = bot
+        
+        @staticmethod
+        def _user_chat(update: Dict[str, Any]):
+            user, chat = extract_user_chat(update)
+            if not user or not chat or chat.get("type") not in ("group", "supergroup"):
+                return None, None
+            return user["id"], chat["id"]
         
         def check(self, update: Dict[str, Any]) -> bool:
-            message = update.get("message", {})
-            user = message.get("from", {})
-            user_id = user.get("id")
-            
-            if not user_id:
+            # Без контекста отвечаем только по уже загруженному списку администраторов
+            user_id, chat_id = self._user_chat(update)
+            if user_id is None or self.bot is None:
                 return False
-            
-            # Получаем bot из context (должен быть установлен middleware)
-            # Это будет работать только если bot доступен через context
-            return False  # По умолчанию False, требует доступа к bot
+            return bool(self.bot.chat_members.peek_is_admin(chat_id, user_id))
+        
+        async def check_async(self, update: Dict[str, Any], context: Dict[str, Any]) -> bool:
+            user_id, chat_id = self._user_chat(update)
+            bot = self.bot or context.get("bot")
+            if user_id is None or bot is None:
+                return False
+            return await bot.chat_members.is_admin(chat_id, user_id)
 
 
 # Создаем экземпляры для удобного использования
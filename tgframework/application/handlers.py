@@ -4,12 +4,75 @@
 
 from typing import Any, Callable, Dict, Optional
 import functools
+import inspect
 
+from ..infrastructure.utils import extract_user_chat
 
-class CommandHandler:
+# Режимы выполнения синхронного обработчика вне цикла событий
+OFFLOAD_MODES = ("thread", "process")
+
+# Объекты контекста, привязанные к циклу событий: в процесс не передаются
+_LOCAL_CONTEXT_KEYS = ("bot", "db_session", "state_machine")
+
+
+class HandlerOptions:
+    """
+    Параметры выполнения обработчика
+    
+    - timeout - сколько секунд бот ждет обработчик (None - bot.handler_timeout)
+    - cancel_on_timeout - отменить обработчик по таймауту; False - перестать
+      ждать, но дать ему завершиться в фоне
+    - offload - синхронный обработчик выполняется в bot.executors:
+      "thread" - в пуле потоков (блокирующий ввод-вывод), "process" - в пуле
+      процессов (CPU-тяжелая работа; обработчик - функция уровня модуля,
+      context без bot, db_session и state_machine)
+    
+    Обработчик с offload может вернуть строку - она отправляется в чат update;
+    обработчик с offload="thread" может вернуть корутину - она выполняется в
+    цикле событий (например, bot.send_photo с результатом).
+    """
+    
+    def _set_options(self, timeout: Optional[float] = None, offload: Optional[str] = None,
+                     cancel_on_timeout: bool = True):
+        if offload is not None and offload not in OFFLOAD_MODES:
+            raise ValueError(f"Неизвестный режим offload: {offload}")
+        if timeout is not None and timeout <= 0:
+            raise ValueError("Таймаут обработчика должен быть больше нуля")
+        self.timeout = timeout
+        self.offload = offload
+        self.cancel_on_timeout = cancel_on_timeout
+    
+    @property
+    def name(self) -> str:
+        """Имя функции-обработчика для логов и ошибок"""
+        return getattr(self.handler, "__qualname__", repr(self.handler))
+    
+    async def _call(self, update: Dict[str, Any], context: Dict[str, Any]) -> Any:
+        """Вызвать обработчик в цикле событий или в bot.executors"""
+        if self.offload is None:
+            return await self.handler(update, context)
+        
+        bot = context["bot"]
+        if self.offload == "process":
+            context = {key: value for key, value in context.items() if key not in _LOCAL_CONTEXT_KEYS}
+        result = await bot.executors.run(self.offload, self.handler, update, context)
+        
+        if inspect.isawaitable(result):
+            return await result
+        if isinstance(result, str) and result:
+            _, chat = extract_user_chat(update)
+            if chat:
+                await bot.send_message(chat["id"], result)
+            return None
+        return result
+
+
+class CommandHandler(HandlerOptions):
     """Обработчик команд"""
     
-    def __init__(self, command: str, handler: Callable, description: Optional[str] = None):
+    def __init__(self, command: str, handler: Callable, description: Optional[str] = None,
+                 timeout: Optional[float] = None, offload: Optional[str] = None,
+                 cancel_on_timeout: bool = True):
         """
         Инициализация обработчика команды
         
@@ -17,10 +80,12 @@ class CommandHandler:
             command: Название команды (без /)
             handler: Функция-обработчик
             description: Описание команды
+            timeout, offload, cancel_on_timeout: Параметры выполнения (см. HandlerOptions)
         """
         self.command = command.lower()
         self.handler = handler
         self.description = description
+        self._set_options(timeout, offload, cancel_on_timeout)
     
     async def handle(self, update: Dict[str, Any], context: Dict[str, Any]):
         """
@@ -30,22 +95,25 @@ class CommandHandler:
             update: Update от Telegram
             context: Контекст обработки
         """
-        await self.handler(update, context)
+        await self._call(update, context)
 
 
-class CallbackHandler:
+class CallbackHandler(HandlerOptions):
     """Обработчик callback"""
     
-    def __init__(self, pattern: str, handler: Callable):
+    def __init__(self, pattern: str, handler: Callable, timeout: Optional[float] = None,
+                 offload: Optional[str] = None, cancel_on_timeout: bool = True):
         """
         Инициализация обработчика callback
         
         Args:
             pattern: Паттерн для callback_data (может начинаться с префикса)
             handler: Функция-обработчик
+            timeout, offload, cancel_on_timeout: Параметры выполнения (см. HandlerOptions)
         """
         self.pattern = pattern
         self.handler = handler
+        self._set_options(timeout, offload, cancel_on_timeout)
     
     def matches(self, callback_data: str) -> bool:
         """
@@ -69,22 +137,84 @@ class CallbackHandler:
             update: Update от Telegram
             context: Контекст обработки
         """
-        await self.handler(update, context)
+        await self._call(update, context)
 
 
-class MessageHandler:
+class InlineQueryHandler:
+    """
+    Обработчик inline query
+    
+    Обработчик может сам вызвать bot.answer_inline_query или вернуть список
+    результатов одной страницы: context["offset"] и context["limit"] задают
+    страницу, ответ с next_offset и кэширование выполняет бот.
+    """
+    
+    def __init__(self, pattern: str, handler: Callable, page_size: int = 50,
+                 cache_ttl: float = 300.0, cache_time: int = 300, is_personal: bool = False):
+        """
+        Инициализация обработчика inline query
+        
+        Args:
+            pattern: Префикс текста запроса ("" - любой запрос)
+            handler: Функция-обработчик
+            page_size: Результатов на странице (максимум Telegram - 50)
+            cache_ttl: Время жизни страницы в кэше бота в секундах (0 - не кэшировать)
+            cache_time: cache_time для Telegram в секундах
+            is_personal: Результаты зависят от пользователя (кэш по пользователю)
+        """
+        self.pattern = pattern
+        self.handler = handler
+        self.page_size = min(page_size, 50)
+        self.cache_ttl = cache_ttl
+        self.cache_time = cache_time
+        self.is_personal = is_personal
+    
+    def matches(self, query: str) -> bool:
+        """
+        Проверить, соответствует ли запрос префиксу
+        
+        Args:
+            query: Текст inline query
+        
+        Returns:
+            True если соответствует
+        """
+        return query.startswith(self.pattern)
+    
+    async def handle(self, update: Dict[str, Any], context: Dict[str, Any]) -> Any:
+        """
+        Обработать inline query
+        
+        Args:
+            update: Update от Telegram
+            context: Контекст обработки
+        
+        Returns:
+            Список результатов страницы или None, если обработчик ответил сам
+        """
+        return await self.handler(update, context)
+
+
+class MessageHandler(HandlerOptions):
     """Обработчик сообщений"""
     
-    def __init__(self, handler: Callable, filters: Optional[Callable] = None):
+    def __init__(self, handler: Callable, filters: Optional[Callable] = None,
+                 timeout: Optional[float] = None, offload: Optional[str] = None,
+                 cancel_on_timeout: bool = True):
         """
         Инициализация обработчика сообщений
         
         Args:
             handler: Функция-обработчик
             filters: Функция-фильтр для проверки сообщения
+            timeout, offload, cancel_on_timeout: Параметры выполнения (см. HandlerOptions)
         """
         self.handler = handler
         self.filters = filters
+        self._set_options(timeout, offload, cancel_on_timeout)
+        # Фильтр с check_async (Filters.IsAdmin и составные фильтры с ним)
+        self.is_async = getattr(filters, "is_async", False)
+        self._check = getattr(filters, "check", filters)
     
     def should_handle(self, update: Dict[str, Any]) -> bool:
         """
@@ -96,10 +226,25 @@ class MessageHandler:
         Returns:
             True если должен обработать
         """
-        if self.filters:
-            return self.filters(update)
+        if self._check:
+            return self._check(update)
         return True
     
+    async def should_handle_async(self, update: Dict[str, Any], context: Dict[str, Any]) -> bool:
+        """
+        Проверить сообщение фильтром, которому нужен контекст (bot) или API
+        
+        Args:
+            update: Update от Telegram
+            context: Контекст обработки
+        
+        Returns:
+            True если должен обработать
+        """
+        if self.is_async:
+            return await self.filters.check_async(update, context)
+        return self.should_handle(update)
+    
     async def handle(self, update: Dict[str, Any], context: Dict[str, Any]):
         """
         Обработать сообщение
@@ -108,7 +253,17 @@ class MessageHandler:
             update: Update от Telegram
             context: Контекст обработки
         """
-        await self.handler(update, context)
+        await self._call(update, context)
+
+
+class AlbumHandler(MessageHandler):
+    """
+    Обработчик альбомов (media group)
+    
+    Фильтр проверяется по первому сообщению альбома; обработчик вызывается
+    один раз на альбом, все сообщения доступны в context["album"].
+    """
+    pass
 
 
 def command(command_name: str, description: Optional[str] = None):
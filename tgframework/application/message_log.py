@@ -0,0 +1,268 @@
+"""
+Асинхронный буферизованный журнал сообщений
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from .middleware import Middleware
+from ..domain.dto import MessageDTO
+
+logger = logging.getLogger(__name__)
+
+
+class MessageLogPipeline:
+    """
+    Буфер сообщений с пакетной записью через MessageRepository.bulk_create
+    
+    Сообщения накапливаются в памяти и сбрасываются в БД при заполнении пачки
+    или по таймеру. Запись выполняется в отдельном потоке с собственным
+    подключением к БД (repository.detached()), цикл событий ее не ждет.
+    Если БД не успевает и буфер заполнен, применяется политика:
+    
+    - "block" - вызывающий ждет освобождения места (backpressure)
+    - "drop_new" - новое сообщение отбрасывается
+    - "drop_oldest" - вытесняется самое старое сообщение из буфера
+    
+    Usage:
+        pipeline = MessageLogPipeline(MessageRepository(session))
+        bot.middleware_manager.add(MessageLogMiddleware(pipeline))
+    """
+    
+    OVERFLOW_POLICIES = ("block", "drop_new", "drop_oldest")
+    
+    def __init__(self, repository, max_buffer: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 1.0, overflow: str = "drop_oldest",
+                 use_thread: bool = True):
+        """
+        Args:
+            repository: Репозиторий сообщений (нужен метод bulk_create)
+            max_buffer: Максимальное количество сообщений в буфере
+            batch_size: Размер пачки, при котором запускается сброс
+            flush_interval: Максимальная задержка записи в секундах
+            overflow: Политика при переполнении буфера
+            use_thread: Выполнять запись в отдельном потоке. Подключение берется из
+                repository.detached(); репозиторий без этого метода должен иметь отдельную сессию БД.
+                Если отдельное подключение невозможно (SQLite в памяти), запись идет в цикле событий
+        """
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Неизвестная политика переполнения: {overflow}")
+        
+        self.repository = repository
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.use_thread = use_thread
+        self._writer = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        
+        self._buffer: Deque[MessageDTO] = deque()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._space_available = asyncio.Event()
+        self._closed = False
+        
+        # Метрики
+        self.logged = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.flush_count = 0
+        self.flush_errors = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self._total_flush_latency = 0.0
+    
+    async def log(self, message_dto: MessageDTO) -> bool:
+        """
+        Поставить сообщение в очередь записи
+        
+        Args:
+            message_dto: Сообщение
+        
+        Returns:
+            True если сообщение принято, False если отброшено
+        """
+        if self.overflow == "block":
+            while len(self._buffer) >= self.max_buffer and not self._closed:
+                self._space_available.clear()
+                self._wakeup.set()
+                await self._space_available.wait()
+        return self.log_nowait(message_dto)
+    
+    def log_nowait(self, message_dto: MessageDTO) -> bool:
+        """
+        Поставить сообщение в очередь записи без ожидания
+        
+        При политике "block" и заполненном буфере сообщение отбрасывается.
+        
+        Returns:
+            True если сообщение принято, False если отброшено
+        """
+        if self._closed:
+            self.dropped += 1
+            return False
+        
+        if len(self._buffer) >= self.max_buffer:
+            if self.overflow == "drop_oldest":
+                self._buffer.popleft()
+                self.dropped += 1
+            else:
+                self.dropped += 1
+                return False
+        
+        if message_dto.created_at is None:
+            message_dto.created_at = datetime.now()
+        
+        self._buffer.append(message_dto)
+        self.logged += 1
+        self._ensure_started()
+        
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        return True
+    
+    def _ensure_started(self):
+        """Запустить фоновый сброс"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+    
+    async def _flush_loop(self):
+        """Сбрасывать буфер по таймеру или при заполнении пачки"""
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                await self.flush()
+        except asyncio.CancelledError:
+            pass
+    
+    async def flush(self):
+        """Записать все накопленные сообщения пачками"""
+        async with self._flush_lock:
+            while self._buffer:
+                batch: List[MessageDTO] = []
+                while self._buffer and len(batch) < self.batch_size:
+                    batch.append(self._buffer.popleft())
+                self._space_available.set()
+                
+                if not await self._write_batch(batch):
+                    break
+    
+    def _thread_writer(self):
+        """Репозиторий для записи из потока или None, если писать нужно в цикле событий"""
+        if not self.use_thread:
+            return None
+        if self._writer is None:
+            detached = getattr(self.repository, "detached", None)
+            self._writer = detached() if detached else self.repository
+            if self._writer is None:
+                logger.warning("Message log: no separate DB connection available, writing on the event loop")
+                self.use_thread = False
+                return None
+            # Один поток: подключение не используется конкурентно, пачки пишутся по порядку
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="tgframework-message-log")
+        return self._writer
+    
+    async def _write_batch(self, batch: List[MessageDTO]) -> bool:
+        """Записать одну пачку, при ошибке вернуть ее в начало буфера"""
+        started = time.perf_counter()
+        try:
+            writer = self._thread_writer()
+            if writer is not None:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(self._executor, writer.bulk_create, batch)
+            else:
+                self.repository.bulk_create(batch)
+        except Exception as e:
+            self.flush_errors += 1
+            logger.error(f"Error writing message log batch: {e}", exc_info=True)
+            
+            # Возвращаем пачку, если есть место, иначе она теряется
+            free = self.max_buffer - len(self._buffer)
+            if free > 0:
+                self._buffer.extendleft(reversed(batch[-free:]))
+            self.dropped += max(0, len(batch) - free)
+            return False
+        
+        latency = time.perf_counter() - started
+        self.last_flush_latency = latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+        self._total_flush_latency += latency
+        self.flush_count += 1
+        self.flushed += len(batch)
+        return True
+    
+    async def close(self):
+        """Остановить прием сообщений и выполнить финальный сброс"""
+        self._closed = True
+        self._space_available.set()
+        if self._flush_task:
+            # Не прерываем пачку, которую поток уже пишет: отменяем между сбросами
+            async with self._flush_lock:
+                self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._writer is not None and self._writer is not self.repository:
+            self._writer.session.engine.disconnect()
+        self._writer = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Получить метрики журнала
+        
+        Returns:
+            Словарь с метриками
+        """
+        return {
+            "buffered": len(self._buffer),
+            "logged": self.logged,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "flush_count": self.flush_count,
+            "flush_errors": self.flush_errors,
+            "last_flush_latency": self.last_flush_latency,
+            "max_flush_latency": self.max_flush_latency,
+            "avg_flush_latency": self._total_flush_latency / self.flush_count if self.flush_count else 0.0,
+        }
+
+
+class MessageLogMiddleware(Middleware):
+    """Middleware, записывающее входящие сообщения в MessageLogPipeline"""
+    
+    update_types = ("message",)
+    
+    def __init__(self, pipeline: MessageLogPipeline):
+        self.pipeline = pipeline
+    
+    async def process(self, update: Dict[str, Any], context: Dict[str, Any]) -> bool:
+        message = update.get("message")
+        if not message or "chat" not in message:
+            return True
+        
+        created_at = datetime.fromtimestamp(message["date"]) if message.get("date") else None
+        await self.pipeline.log(MessageDTO(
+            message_id=message["message_id"],
+            chat_id=message["chat"]["id"],
+            user_id=(message.get("from") or {}).get("id", 0),
+            text=message.get("text") or message.get("caption"),
+            created_at=created_at,
+        ))
+        return True
+    
+    async def shutdown(self):
+        """Сбросить остаток буфера при остановке бота"""
+        await self.pipeline.close()
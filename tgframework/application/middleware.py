@@ -2,13 +2,17 @@
 Система middleware
 """
 
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 from abc import ABC, abstractmethod
 
 
 class Middleware(ABC):
     """Базовый класс для middleware"""
     
+    # Типы update, которые middleware нужно получать от Telegram помимо
+    # типов зарегистрированных обработчиков (см. TelegramBot.allowed_updates)
+    update_types: Tuple[str, ...] = ()
+    
     @abstractmethod
     async def process(self, update: Dict[str, Any], context: Dict[str, Any]) -> bool:
         """
@@ -22,6 +26,10 @@ class Middleware(ABC):
             True если продолжить обработку, False если остановить
         """
         pass
+    
+    async def shutdown(self):
+        """Освободить ресурсы при остановке бота (сбросить буферы и т.п.)"""
+        pass
 
 
 class MiddlewareManager:
@@ -30,29 +38,48 @@ class MiddlewareManager:
     def __init__(self):
         self.middlewares: List[Middleware] = []
     
-    def add(self, middleware: Middleware):
+    def add(self, middleware: Middleware, first: bool = False):
         """
         Добавить middleware
         
         Args:
             middleware: Middleware для добавления
+            first: Поставить перед уже добавленными (например, ThrottlingMiddleware)
         """
-        self.middlewares.append(middleware)
+        if first:
+            self.middlewares.insert(0, middleware)
+        else:
+            self.middlewares.append(middleware)
     
-    async def process(self, update: Dict[str, Any], context: Dict[str, Any]) -> bool:
+    async def process(self, update: Dict[str, Any], context: Dict[str, Any], after: Optional[Middleware] = None) -> bool:
         """
         Обработать update через все middleware
         
         Args:
             update: Update от Telegram
             context: Контекст обработки
+            after: Начать со следующего за этим middleware (продолжение отложенного update)
             
         Returns:
             True если продолжить обработку, False если остановить
         """
-        for middleware in self.middlewares:
+        middlewares = self.middlewares
+        if after is not None:
+            middlewares = middlewares[middlewares.index(after) + 1:]
+        for middleware in middlewares:
             result = await middleware.process(update, context)
             if not result:
                 return False
         return True
-
+    
+    def update_types(self) -> Set[str]:
+        """Типы update, запрошенные всеми middleware"""
+        types: Set[str] = set()
+        for middleware in self.middlewares:
+            types.update(middleware.update_types)
+        return types
+    
+    async def shutdown(self):
+        """Остановить все middleware"""
+        for middleware in self.middlewares:
+            await middleware.shutdown()
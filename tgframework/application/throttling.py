@@ -0,0 +1,186 @@
+"""
+Защита от флуда входящими update
+"""
+
+import logging
+import time
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+from .middleware import Middleware
+from ..infrastructure import SlidingWindowCounter, TTLCache
+from ..infrastructure.utils import extract_user_chat
+
+logger = logging.getLogger(__name__)
+
+
+class ThrottlingMiddleware(Middleware):
+    """
+    Ограничение частоты update от пользователя и в чате
+    
+    Update сверх лимита останавливаются в middleware и не доходят до
+    следующих middleware (трекинг, журнал сообщений), состояния и обработчиков.
+    Действие при превышении:
+    
+    - "drop" - update отбрасывается
+    - "delay" - обработка откладывается (bot.defer_update), пока частота не
+      вернется к лимиту; остальные update обрабатываются без ожидания. Update
+      одного пользователя (чата) продолжаются по порядку; если суммарная
+      задержка превысит max_delay - update отбрасывается
+    - "warn" - как "drop", но пользователь (или чат) один раз за
+      warning_cooldown получает warning_text
+    
+    Usage:
+        # Добавляйте первым, чтобы флуд отсекался до остальных middleware
+        bot.middleware_manager.add(ThrottlingMiddleware(user_rate=3, window=1.0, action="warn"), first=True)
+    """
+    
+    ACTIONS = ("drop", "delay", "warn")
+    
+    def __init__(self, user_rate: int = 5, chat_rate: Optional[int] = 30, window: float = 1.0,
+                 action: str = "drop", max_delay: float = 2.0,
+                 warning_text: str = "Слишком много запросов, подождите немного",
+                 warning_cooldown: float = 60.0, max_users: int = 100000, max_chats: int = 10000,
+                 exempt_users: Optional[Iterable[int]] = None):
+        """
+        Args:
+            user_rate: Максимум update от одного пользователя за window
+            chat_rate: Максимум update в одном групповом чате за window (None - без лимита)
+            window: Окно в секундах
+            action: "drop", "delay" или "warn"
+            max_delay: Максимальная задержка для action="delay"
+            warning_text: Текст предупреждения для action="warn"
+            warning_cooldown: Не предупреждать одного пользователя (чат) чаще, чем раз в столько секунд
+            max_users: Сколько пользователей отслеживать одновременно
+            max_chats: Сколько чатов отслеживать одновременно
+            exempt_users: ID пользователей без ограничений (администраторы)
+        """
+        if action not in self.ACTIONS:
+            raise ValueError(f"Неизвестное действие: {action}")
+        
+        self.user_rate = user_rate
+        self.chat_rate = chat_rate
+        self.window = window
+        self.action = action
+        self.max_delay = max_delay
+        self.warning_text = warning_text
+        self.exempt_users = set(exempt_users or ())
+        
+        self.users = SlidingWindowCounter(window, max_users)
+        self.chats = SlidingWindowCounter(window, max_chats) if chat_rate else None
+        self._warned = TTLCache(maxsize=max_users, ttl=warning_cooldown, negative_ttl=None)
+        # ("user" | "chat", id) -> время (monotonic), когда продолжится последний отложенный update
+        self._release_at = TTLCache(maxsize=max_users, ttl=max_delay, negative_ttl=None)
+        
+        # Метрики
+        self.passed = 0
+        self.throttled = 0
+        self.dropped = 0
+        self.delayed = 0
+        self.warnings_sent = 0
+    
+    async def process(self, update: Dict[str, Any], context: Dict[str, Any]) -> bool:
+        """Пропустить update или применить действие при превышении лимита"""
+        user, chat = extract_user_chat(update)
+        user_id = user.get("id") if user else None
+        if user_id in self.exempt_users:
+            self.passed += 1
+            return True
+        
+        now = time.monotonic()
+        # Превышение лимита в долях лимита и кого предупреждать
+        excess = 0.0
+        offender: Optional[Hashable] = None
+        
+        if user_id is not None:
+            rate = self.users.hit(user_id, now)
+            if rate > self.user_rate:
+                excess = (rate - self.user_rate) / self.user_rate
+                offender = ("user", user_id)
+        
+        chat_id = chat.get("id") if chat else None
+        if self.chats is not None and chat_id is not None and chat_id != user_id:
+            rate = self.chats.hit(chat_id, now)
+            if rate > self.chat_rate and (rate - self.chat_rate) / self.chat_rate > excess:
+                excess = (rate - self.chat_rate) / self.chat_rate
+                offender = ("chat", chat_id)
+        
+        if self.action == "delay":
+            return self._delay(update, context, offender, excess, now, user_id, chat_id)
+        
+        if offender is None:
+            self.passed += 1
+            return True
+        
+        self.throttled += 1
+        if self.action == "warn":
+            await self._warn(update, context, offender, chat_id)
+        
+        self.dropped += 1
+        return False
+    
+    def _delay(self, update: Dict[str, Any], context: Dict[str, Any], offender: Optional[Hashable],
+               excess: float, now: float, user_id: Optional[int], chat_id: Optional[int]) -> bool:
+        """
+        Отложить update сверх лимита, не останавливая общий конвейер обработки
+        
+        Update пользователя (чата), у которого уже есть отложенные update,
+        тоже откладывается - после них, чтобы не обогнать их.
+        """
+        keys = [("user", user_id), ("chat", chat_id)]
+        pending = max((self._release_at.get(key) or 0.0 for key in keys), default=0.0)
+        if offender is None and pending <= now:
+            self.passed += 1
+            return True
+        
+        # Время, за которое лишние update "рассасываются" при разрешенной частоте
+        release = max(now + excess * self.window, pending)
+        bot = context.get("bot")
+        self.throttled += 1
+        if release - now > self.max_delay or bot is None:
+            self.dropped += 1
+            return False
+        
+        for key in keys:
+            if key[1] is not None:
+                self._release_at.set(key, release)
+        self.delayed += 1
+        bot.defer_update(update, context, release - now, self)
+        return False
+    
+    async def _warn(self, update: Dict[str, Any], context: Dict[str, Any],
+                    offender: Hashable, chat_id: Optional[int]):
+        """Один раз за warning_cooldown предупредить пользователя или чат"""
+        bot = context.get("bot")
+        if bot is None or self._warned.get(offender) is not None:
+            return
+        self._warned.set(offender, True)
+        
+        try:
+            callback_query = update.get("callback_query")
+            if callback_query:
+                await bot.answer_callback_query(callback_query["id"], text=self.warning_text)
+            elif chat_id is not None and "inline_query" not in update:
+                await bot.send_message(chat_id, self.warning_text)
+            else:
+                return
+            self.warnings_sent += 1
+        except Exception as e:
+            logger.warning(f"Failed to send throttling warning: {e}")
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Получить метрики middleware
+        
+        Returns:
+            Словарь с метриками
+        """
+        return {
+            "passed": self.passed,
+            "throttled": self.throttled,
+            "dropped": self.dropped,
+            "delayed": self.delayed,
+            "warnings_sent": self.warnings_sent,
+            "tracked_users": len(self.users),
+            "tracked_chats": len(self.chats) if self.chats is not None else 0,
+            "evictions": self.users.evictions + (self.chats.evictions if self.chats is not None else 0),
+        }
@@ -0,0 +1,220 @@
+"""
+Middleware для автоматического учета пользователей и чатов
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .middleware import Middleware
+from ..domain.models import User, Chat
+from ..infrastructure.utils import extract_user_chat
+
+logger = logging.getLogger(__name__)
+
+
+class UserTrackingMiddleware(Middleware):
+    """
+    Записывает пользователей и чаты из входящих update в БД
+    
+    Уже известные ID с неизменившимся профилем пропускаются без обращения к БД,
+    новые и изменившиеся записи копятся в буфере и сохраняются пакетным upsert
+    в отдельном потоке с собственным подключением к БД (session.detached()).
+    
+    Usage:
+        bot.middleware_manager.add(UserTrackingMiddleware(session))
+    """
+    
+    def __init__(self, session, flush_interval: float = 1.0, batch_size: int = 500,
+                 last_seen_resolution: float = 60.0, max_known: int = 100000,
+                 use_thread: bool = True):
+        """
+        Args:
+            session: Сессия БД
+            flush_interval: Интервал сброса буфера в секундах
+            batch_size: Размер буфера, при котором сброс выполняется сразу
+            last_seen_resolution: Как часто обновлять last_seen_at для одного ID (секунды)
+            max_known: Максимальное количество ID в памяти (LRU)
+            use_thread: Выполнять upsert в отдельном потоке. Если отдельное подключение
+                невозможно (SQLite в памяти), запись идет в цикле событий
+        """
+        self.session = session
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.last_seen_resolution = last_seen_resolution
+        self.max_known = max_known
+        self.use_thread = use_thread
+        self._writer = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        
+        # id -> (отпечаток профиля, время последней записи)
+        self._known_users: "OrderedDict[int, Tuple[int, float]]" = OrderedDict()
+        self._known_chats: "OrderedDict[int, Tuple[int, float]]" = OrderedDict()
+        self._pending_users: Dict[int, Dict[str, Any]] = {}
+        self._pending_chats: Dict[int, Dict[str, Any]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        
+        # Метрики
+        self.tracked = 0
+        self.skipped = 0
+        self.flushed_rows = 0
+        self.flush_count = 0
+        self.last_flush_latency = 0.0
+    
+    async def process(self, update: Dict[str, Any], context: Dict[str, Any]) -> bool:
+        """Запомнить отправителя и чат update"""
+        user, chat = extract_user_chat(update)
+        now = time.monotonic()
+        
+        if user and user.get("id") is not None:
+            row = {
+                "user_id": user["id"],
+                "username": user.get("username"),
+                "first_name": user.get("first_name"),
+                "last_name": user.get("last_name"),
+                "language_code": user.get("language_code"),
+                "is_bot": user.get("is_bot", False),
+            }
+            self._track(self._known_users, self._pending_users, user["id"], row, now)
+        
+        if chat and chat.get("id") is not None:
+            row = {
+                "chat_id": chat["id"],
+                "chat_type": chat.get("type"),
+                "title": chat.get("title"),
+                "username": chat.get("username"),
+            }
+            self._track(self._known_chats, self._pending_chats, chat["id"], row, now)
+        
+        if len(self._pending_users) + len(self._pending_chats) >= self.batch_size:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+        
+        return True
+    
+    def _track(self, known: "OrderedDict[int, Tuple[int, float]]", pending: Dict[int, Dict[str, Any]],
+               entity_id: int, row: Dict[str, Any], now: float):
+        """Поставить запись в буфер, если она новая, изменилась или устарел last_seen"""
+        fingerprint = hash(tuple(row.values()))
+        entry = known.get(entity_id)
+        
+        if entry is not None:
+            known.move_to_end(entity_id)
+            if entry[0] == fingerprint and now - entry[1] < self.last_seen_resolution:
+                self.skipped += 1
+                return
+        
+        timestamp = datetime.now()
+        row["last_seen_at"] = timestamp
+        row["created_at"] = timestamp
+        row["updated_at"] = timestamp
+        pending[entity_id] = row
+        self.tracked += 1
+        
+        known[entity_id] = (fingerprint, now)
+        while len(known) > self.max_known:
+            known.popitem(last=False)
+    
+    async def _flush_loop(self):
+        """Периодически сбрасывать буфер"""
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        except asyncio.CancelledError:
+            pass
+    
+    def _thread_session(self):
+        """Сессия для записи из потока или None, если писать нужно в цикле событий"""
+        if not self.use_thread:
+            return None
+        if self._writer is None:
+            self._writer = self.session.detached()
+            if self._writer is None:
+                logger.warning("User tracking: no separate DB connection available, writing on the event loop")
+                self.use_thread = False
+                return None
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="tgframework-tracking")
+        return self._writer
+    
+    @staticmethod
+    def _upsert(session, users: List[Dict[str, Any]], chats: List[Dict[str, Any]]):
+        """Записать пачку пользователей и чатов"""
+        # created_at заполняется только при вставке
+        session.bulk_upsert(User, users, update_fields=[
+            "username", "first_name", "last_name", "language_code",
+            "is_bot", "last_seen_at", "updated_at",
+        ])
+        session.bulk_upsert(Chat, chats, update_fields=[
+            "chat_type", "title", "username", "last_seen_at", "updated_at",
+        ])
+    
+    async def flush(self):
+        """Сохранить накопленные записи пакетным upsert"""
+        async with self._flush_lock:
+            users, self._pending_users = self._pending_users, {}
+            chats, self._pending_chats = self._pending_chats, {}
+            if not users and not chats:
+                return
+            
+            started = time.perf_counter()
+            try:
+                writer = self._thread_session()
+                if writer is not None:
+                    await asyncio.get_running_loop().run_in_executor(
+                        self._executor, self._upsert, writer, list(users.values()), list(chats.values())
+                    )
+                else:
+                    self._upsert(self.session, list(users.values()), list(chats.values()))
+            except Exception as e:
+                logger.error(f"Error flushing tracked users/chats: {e}", exc_info=True)
+                # Возвращаем записи в буфер, более свежие данные имеют приоритет
+                for user_id, row in users.items():
+                    self._pending_users.setdefault(user_id, row)
+                for chat_id, row in chats.items():
+                    self._pending_chats.setdefault(chat_id, row)
+                return
+            
+            self.last_flush_latency = time.perf_counter() - started
+            self.flushed_rows += len(users) + len(chats)
+            self.flush_count += 1
+    
+    async def shutdown(self):
+        """Остановить периодический сброс и записать остаток буфера"""
+        if self._flush_task:
+            # Не прерываем пачку, которую поток уже пишет
+            async with self._flush_lock:
+                self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Получить метрики middleware
+        
+        Returns:
+            Словарь с метриками
+        """
+        return {
+            "tracked": self.tracked,
+            "skipped": self.skipped,
+            "pending": len(self._pending_users) + len(self._pending_chats),
+            "known_users": len(self._known_users),
+            "known_chats": len(self._known_chats),
+            "flushed_rows": self.flushed_rows,
+            "flush_count": self.flush_count,
+            "last_flush_latency": self.last_flush_latency,
+        }
@@ -3,6 +3,25 @@ Bot модуль
 """
 
 from .telegram_bot import TelegramBot
+from .supervisor import BotSupervisor
+from .webhook_workers import WebhookWorkerPool
+from .offset_store import OffsetStore, FileOffsetStore, DatabaseOffsetStore
+from .transport import Transport, AiohttpTransport
+from .outbound import OutboundQueue
+from .edit_coalescer import EditCoalescer
+from .retry import RetryPolicy, RetryBudget, CircuitBreaker
+from .media import InputFile
+from .media_group import MediaGroupAggregator
+from .chat_members import ChatMemberCache
+from .scheduler import Scheduler, Job
+from .triggers import Trigger, DateTrigger, IntervalTrigger, CronTrigger
+from .executors import HandlerExecutors
 
-__all__ = ["TelegramBot"]
+__all__ = ["TelegramBot", "BotSupervisor", "WebhookWorkerPool",
+           "OffsetStore", "FileOffsetStore", "DatabaseOffsetStore",
+           "Transport", "AiohttpTransport", "OutboundQueue", "EditCoalescer",
+           "RetryPolicy", "RetryBudget", "CircuitBreaker", "InputFile",
+           "MediaGroupAggregator", "ChatMemberCache", "Scheduler", "Job",
+           "Trigger", "DateTrigger", "IntervalTrigger", "CronTrigger",
+           "HandlerExecutors"]
 
@@ -0,0 +1,198 @@
+"""
+Кэш участников и администраторов чатов
+
+Проверка прав (Filters.IsAdmin, модерация) на каждое сообщение не должна
+ходить в API. Список администраторов чата запрашивается одним вызовом
+getChatAdministrators и хранится ttl секунд; одновременные запросы по одному
+чату ждут один вызов API. Update chat_member / my_chat_member обновляют
+кэш сразу, без ожидания ttl.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from ..infrastructure import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ADMIN_STATUSES = ("creator", "administrator")
+
+
+class ChatMemberCache:
+    """
+    Кэш getChatAdministrators / getChatMember
+    
+    Usage:
+        if await bot.chat_members.is_admin(chat_id, user_id):
+            ...
+        
+        # Или фильтром
+        bot.register_message_handler(ban, Filters.Command("ban") & Filters.IsAdmin())
+    """
+    
+    # Типы update, по которым кэш обновляется
+    update_types = ("chat_member", "my_chat_member")
+    
+    def __init__(self, bot, ttl: float = 300.0, member_ttl: float = 60.0, maxsize: int = 10000):
+        """
+        Args:
+            bot: TelegramBot
+            ttl: Время жизни списка администраторов чата в секундах
+            member_ttl: Время жизни записи getChatMember в секундах
+            maxsize: Максимальное количество записей каждого вида
+        """
+        self.bot = bot
+        # chat_id -> {user_id: ChatMember}
+        self.admins = TTLCache(maxsize=maxsize, ttl=ttl, negative_ttl=None)
+        # (chat_id, user_id) -> ChatMember
+        self.members = TTLCache(maxsize=maxsize, ttl=member_ttl, negative_ttl=None)
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+        # Кэш использовался: боту нужны update chat_member
+        self.active = False
+        
+        # Метрики
+        self.api_calls = 0
+        self.coalesced = 0
+        self.updates_applied = 0
+    
+    async def _load(self, cache: TTLCache, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Значение из кэша или один вызов loader на все одновременные запросы ключа"""
+        self.active = True
+        value = cache.get(key)
+        if value is not None:
+            return value
+        
+        future = self._loading.get((id(cache), key))
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._loading[(id(cache), key)] = future
+        try:
+            self.api_calls += 1
+            value = await loader()
+            cache.set(key, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение уже передано ожидающим; не оставляем его "неполученным"
+            future.exception()
+            raise
+        finally:
+            self._loading.pop((id(cache), key), None)
+    
+    async def get_administrators(self, chat_id: int) -> Dict[int, Dict[str, Any]]:
+        """
+        Администраторы чата
+        
+        Args:
+            chat_id: ID чата
+        
+        Returns:
+            Словарь {user_id: ChatMember}
+        """
+        async def load():
+            members = await self.bot.get_chat_administrators(chat_id)
+            return {member["user"]["id"]: member for member in members}
+        
+        return await self._load(self.admins, chat_id, load)
+    
+    async def is_admin(self, chat_id: int, user_id: int) -> bool:
+        """
+        Является ли пользователь администратором (или создателем) чата
+        
+        Args:
+            chat_id: ID чата
+            user_id: ID пользователя
+        
+        Returns:
+            True если администратор
+        """
+        return user_id in await self.get_administrators(chat_id)
+    
+    def peek_is_admin(self, chat_id: int, user_id: int) -> Optional[bool]:
+        """
+        Проверить по кэшу без обращения к API
+        
+        Returns:
+            True/False или None, если список администраторов не загружен
+        """
+        admins = self.admins.get(chat_id)
+        if admins is None:
+            return None
+        return user_id in admins
+    
+    async def get_member(self, chat_id: int, user_id: int) -> Dict[str, Any]:
+        """
+        Участник чата (getChatMember)
+        
+        Args:
+            chat_id: ID чата
+            user_id: ID пользователя
+        
+        Returns:
+            ChatMember
+        """
+        admins = self.admins.get(chat_id)
+        if admins is not None and user_id in admins:
+            return admins[user_id]
+        return await self._load(self.members, (chat_id, user_id),
+                                lambda: self.bot.get_chat_member(chat_id, user_id))
+    
+    def invalidate(self, chat_id: int, user_id: Optional[int] = None):
+        """Забыть данные чата (или одного участника)"""
+        if user_id is None:
+            self.admins.invalidate(chat_id)
+        else:
+            self.members.invalidate((chat_id, user_id))
+    
+    def handle_update(self, update: Dict[str, Any]):
+        """
+        Обновить кэш по update chat_member / my_chat_member
+        
+        Args:
+            update: Update от Telegram
+        """
+        payload = update.get("chat_member") or update.get("my_chat_member")
+        if not payload:
+            return
+        
+        chat_id = payload["chat"]["id"]
+        member = payload.get("new_chat_member") or {}
+        user_id = (member.get("user") or {}).get("id")
+        if user_id is None:
+            return
+        self.updates_applied += 1
+        
+        if self.members.get((chat_id, user_id)) is not None:
+            self.members.set((chat_id, user_id), member)
+        
+        admins = self.admins.get(chat_id)
+        if admins is not None:
+            admins = dict(admins)
+            if member.get("status") in ADMIN_STATUSES:
+                admins[user_id] = member
+            else:
+                admins.pop(user_id, None)
+            self.admins.set(chat_id, admins)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Получить метрики
+        
+        Returns:
+            Словарь с метриками
+        """
+        return {
+            "api_calls": self.api_calls,
+            "coalesced": self.coalesced,
+            "updates_applied": self.updates_applied,
+            "admins": self.admins.stats(),
+            "members": self.members.stats(),
+        }
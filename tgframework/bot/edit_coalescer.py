@@ -0,0 +1,208 @@
+"""
+Объединение частых редактирований одного сообщения
+
+Прогресс-бары, счетчики и таймеры вызывают edit_message_text много раз в
+секунду для одного и того же сообщения. EditCoalescer отправляет в Telegram
+не больше одного редактирования сообщения за interval: пока редактирование
+ждет отправки, новые вызовы только заменяют его содержимое, и все вызывающие
+получают результат последнего. Редактирование, которое не меняет текст и
+разметку по сравнению с уже отправленным, не отправляется совсем: вызывающий
+получает сообщение из ответа на последнее отправленное редактирование.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingEdit:
+    """Редактирование, ожидающее отправки"""
+    
+    __slots__ = ("params", "lane", "digest", "future", "handle")
+    
+    def __init__(self, params: Dict[str, Any], lane: str, digest: bytes, future: asyncio.Future):
+        self.params = params
+        self.lane = lane
+        self.digest = digest
+        self.future = future
+        self.handle: Optional[asyncio.TimerHandle] = None
+
+
+class EditCoalescer:
+    """
+    Debounce и подавление пустых editMessageText по (chat_id, message_id)
+    
+    Usage:
+        bot.enable_edit_coalescing(interval=1.0)
+        
+        for percent in range(101):
+            # В Telegram уйдет около одного редактирования в секунду
+            asyncio.ensure_future(bot.edit_message_text(chat_id, message_id, f"{percent}%"))
+    """
+    
+    def __init__(self, bot, interval: float = 1.0, max_tracked: int = 10000):
+        """
+        Args:
+            bot: TelegramBot
+            interval: Минимальный интервал между редактированиями одного сообщения
+            max_tracked: Сколько сообщений помнить (хэш последнего содержимого)
+        """
+        self.bot = bot
+        self.interval = interval
+        self.max_tracked = max_tracked
+        
+        self._pending: Dict[Hashable, _PendingEdit] = {}
+        self._in_flight: Set[Hashable] = set()
+        # key -> (хэш отправленного содержимого, время отправки, ответ Telegram)
+        self._sent: "OrderedDict[Hashable, Tuple[Optional[bytes], float, Any]]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+        
+        # Метрики
+        self.requested = 0
+        self.coalesced = 0
+        self.skipped_unchanged = 0
+        self.sent = 0
+        self.failed = 0
+    
+    @staticmethod
+    def _key(params: Dict[str, Any]) -> Hashable:
+        if params.get("inline_message_id"):
+            return ("inline", params["inline_message_id"])
+        return (params.get("chat_id"), params.get("message_id"))
+    
+    @staticmethod
+    def _digest(params: Dict[str, Any]) -> bytes:
+        """Хэш содержимого: текст, разметка и остальные параметры"""
+        content = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()
+    
+    async def edit(self, params: Dict[str, Any], lane: str = "interactive") -> Any:
+        """
+        Поставить редактирование
+        
+        Args:
+            params: Параметры editMessageText
+            lane: Полоса очереди исходящих (если она включена)
+        
+        Returns:
+            Результат отправленного редактирования. Если отправка не понадобилась или
+            Telegram ответил "message is not modified" - последний известный результат
+            для сообщения (None, если его нет)
+        """
+        self.requested += 1
+        key = self._key(params)
+        digest = self._digest(params)
+        
+        pending = self._pending.get(key)
+        if pending is not None:
+            # Заменяем содержимое ожидающего редактирования
+            pending.params = params
+            pending.lane = lane
+            pending.digest = digest
+            self.coalesced += 1
+            return await asyncio.shield(pending.future)
+        
+        sent = self._sent.get(key)
+        if key not in self._in_flight and sent is not None and sent[0] == digest:
+            self.skipped_unchanged += 1
+            return sent[2]
+        
+        pending = _PendingEdit(params, lane, digest, asyncio.get_running_loop().create_future())
+        self._pending[key] = pending
+        if key not in self._in_flight:
+            self._schedule(key, pending)
+        return await asyncio.shield(pending.future)
+    
+    def _schedule(self, key: Hashable, pending: _PendingEdit):
+        """Запланировать отправку не раньше чем через interval после предыдущей"""
+        sent = self._sent.get(key)
+        delay = max(0.0, sent[1] + self.interval - time.monotonic()) if sent else 0.0
+        pending.handle = asyncio.get_running_loop().call_later(delay, self._start_flush, key)
+    
+    def _start_flush(self, key: Hashable):
+        task = asyncio.ensure_future(self._flush(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _flush(self, key: Hashable):
+        """Отправить ожидающее редактирование сообщения"""
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        
+        sent = self._sent.get(key)
+        if sent is not None and sent[0] == pending.digest:
+            # Содержимое вернулось к уже отправленному
+            self.skipped_unchanged += 1
+            if not pending.future.done():
+                pending.future.set_result(sent[2])
+            return
+        
+        self._in_flight.add(key)
+        previous = sent[2] if sent else None
+        self._remember(key, sent[0] if sent else None, previous)
+        try:
+            result = await self.bot._send("editMessageText", pending.params, pending.lane,
+                                          pending.params.get("chat_id"))
+        except Exception as e:
+            self.failed += 1
+            if not pending.future.done():
+                pending.future.set_exception(e)
+        else:
+            self.sent += 1
+            if result is None:
+                # "message is not modified": сообщение не изменилось с последнего ответа
+                result = previous
+            self._remember(key, pending.digest, result)
+            if not pending.future.done():
+                pending.future.set_result(result)
+        finally:
+            self._in_flight.discard(key)
+            following = self._pending.get(key)
+            if following is not None and following.handle is None:
+                self._schedule(key, following)
+    
+    def _remember(self, key: Hashable, digest: Optional[bytes], result: Any = None):
+        """Запомнить содержимое, время отправки и ответ (старые сообщения вытесняются)"""
+        self._sent[key] = (digest, time.monotonic(), result)
+        self._sent.move_to_end(key)
+        while len(self._sent) > self.max_tracked:
+            self._sent.popitem(last=False)
+    
+    def forget(self, chat_id: Any, message_id: Any):
+        """Забыть сообщение (например, после удаления)"""
+        self._sent.pop((chat_id, message_id), None)
+    
+    async def flush(self):
+        """Немедленно отправить все ожидающие редактирования и дождаться их"""
+        while self._pending or self._tasks:
+            for key, pending in list(self._pending.items()):
+                if pending.handle is not None:
+                    pending.handle.cancel()
+                    self._start_flush(key)
+            if not self._tasks:
+                break
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Получить метрики
+        
+        Returns:
+            Словарь с метриками
+        """
+        return {
+            "requested": self.requested,
+            "coalesced": self.coalesced,
+            "skipped_unchanged": self.skipped_unchanged,
+            "sent": self.sent,
+            "failed": self.failed,
+            "pending": len(self._pending),
+            "saved_ratio": 1 - self.sent / self.requested if self.requested else 0.0,
+        }
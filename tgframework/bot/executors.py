@@ -0,0 +1,120 @@
+"""
+Пулы потоков и процессов для тяжелых обработчиков
+
+Обработчики с offload="thread" / offload="process" выполняются здесь, а не в
+цикле событий: блокирующий или CPU-тяжелый код не останавливает бота.
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class HandlerExecutors:
+    """
+    Управляемые пулы bot.executors
+    
+    Пулы создаются при первом использовании и закрываются в bot.stop().
+    Задачу, уже выполняющуюся в потоке или процессе, прервать нельзя:
+    таймаут обработчика только перестает ее ждать.
+    """
+    
+    MODES = ("thread", "process")
+    
+    def __init__(self, max_threads: Optional[int] = None, max_processes: Optional[int] = None,
+                 mp_context: Optional[str] = None):
+        """
+        Args:
+            max_threads: Размер пула потоков (по умолчанию как у ThreadPoolExecutor)
+            max_processes: Размер пула процессов (по умолчанию число CPU)
+            mp_context: Способ запуска процессов ("fork", "spawn", "forkserver")
+        """
+        self.max_threads = max_threads
+        self.max_processes = max_processes
+        self.mp_context = mp_context
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        
+        # Метрики
+        self.submitted: Counter = Counter()
+        self.running: Counter = Counter()
+        self.failed: Counter = Counter()
+    
+    def _pool(self, mode: str) -> Executor:
+        if mode == "thread":
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(self.max_threads, thread_name_prefix="tgframework-handler")
+            return self._thread_pool
+        if mode == "process":
+            if self._process_pool is None:
+                context = multiprocessing.get_context(self.mp_context) if self.mp_context else None
+                self._process_pool = ProcessPoolExecutor(self.max_processes, mp_context=context)
+            return self._process_pool
+        raise ValueError(f"Неизвестный режим offload: {mode}")
+    
+    async def run(self, mode: str, func: Callable, *args: Any) -> Any:
+        """
+        Выполнить функцию в пуле
+        
+        Args:
+            mode: "thread" или "process"
+            func: Функция (для "process" - функция уровня модуля, аргументы должны сериализоваться pickle)
+            *args: Аргументы
+        
+        Returns:
+            Результат функции
+        """
+        pool = self._pool(mode)
+        self.submitted[mode] += 1
+        self.running[mode] += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, functools.partial(func, *args))
+        except BrokenProcessPool:
+            # Процесс пула упал (например, OOM): следующий вызов создаст новый пул
+            logger.error("Handler process pool is broken, recreating")
+            self.failed[mode] += 1
+            if self._process_pool is pool:
+                self._process_pool = None
+                pool.shutdown(wait=False)
+            raise
+        except Exception:
+            self.failed[mode] += 1
+            raise
+        finally:
+            self.running[mode] -= 1
+    
+    def shutdown(self, wait: bool = False):
+        """
+        Закрыть пулы
+        
+        Args:
+            wait: Ждать завершения выполняющихся задач
+        """
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=wait, cancel_futures=True)
+        self._thread_pool = None
+        self._process_pool = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Получить метрики
+        
+        Returns:
+            Словарь с метриками
+        """
+        return {
+            mode: {
+                "submitted": self.submitted[mode],
+                "running": self.running[mode],
+                "failed": self.failed[mode],
+            }
+            for mode in self.MODES
+        }
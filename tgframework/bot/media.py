@@ -0,0 +1,185 @@
+"""
+Файлы для загрузки в Telegram
+
+InputFile описывает источник файла: путь на диске, bytes или асинхронный
+итератор чанков. Файл передается транспорту потоком и не читается в память
+целиком; хэш содержимого используется как ключ кэша file_id.
+"""
+
+import asyncio
+import hashlib
+import json
+import mimetypes
+import os
+from collections import OrderedDict
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Optional, Tuple, Union
+
+# Хэши файлов на диске по (путь, размер, mtime): повторная отправка не читает файл
+_path_digests: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_PATH_DIGESTS_MAX = 10000
+
+# Фрагменты описаний ошибок 400, означающих, что сохраненный file_id недействителен
+_STALE_FILE_ID_ERRORS = (
+    "wrong file identifier",
+    "wrong remote file identifier",
+    "file reference expired",
+    "file_reference_expired",
+    "wrong padding in the string",
+    "type of file mismatch",
+    "media_empty",
+)
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class InputFile:
+    """
+    Файл для отправки через send_photo / send_document / send_media_group
+    
+    Usage:
+        await bot.send_photo(chat_id, InputFile("images/banner.png"))
+        await bot.send_document(chat_id, InputFile(b"id,name\\n1,Bob\\n", filename="users.csv"))
+        
+        async def chunks():
+            async for chunk in response.content.iter_chunked(65536):
+                yield chunk
+        await bot.send_document(chat_id, InputFile(chunks(), filename="report.pdf", cache_key="report-2025-11"))
+    """
+    
+    def __init__(self, source: Union[str, "os.PathLike[str]", bytes, AsyncIterable[bytes]],
+                 filename: Optional[str] = None, content_type: Optional[str] = None,
+                 cache_key: Optional[str] = None):
+        """
+        Args:
+            source: Путь к файлу, содержимое (bytes) или асинхронный итератор чанков
+            filename: Имя файла (по умолчанию имя файла на диске или "file")
+            content_type: MIME тип (по умолчанию определяется по имени)
+            cache_key: Ключ кэша file_id вместо хэша содержимого
+        """
+        if isinstance(source, (str, os.PathLike)):
+            self.path: Optional[str] = os.fspath(source)
+            self.source: Any = None
+            default_name = os.path.basename(self.path)
+        else:
+            self.path = None
+            self.source = bytes(source) if isinstance(source, (bytearray, memoryview)) else source
+            default_name = "file"
+        
+        self.filename = filename or default_name
+        self.content_type = content_type or mimetypes.guess_type(self.filename)[0] or "application/octet-stream"
+        self.cache_key = cache_key
+        self.stream_digest: Optional[str] = None
+        self._file = None
+        self._consumed = False
+    
+    @property
+    def reusable(self) -> bool:
+        """Можно ли прочитать источник повторно (для повторов запроса)"""
+        return self.path is not None or isinstance(self.source, bytes)
+    
+    async def digest(self) -> Optional[str]:
+        """
+        Ключ содержимого для кэша file_id
+        
+        Returns:
+            cache_key, sha256 файла или bytes; None для итератора без cache_key
+            (его хэш считается во время загрузки, см. stream_digest)
+        """
+        if self.cache_key:
+            return self.cache_key
+        if isinstance(self.source, bytes):
+            return hashlib.sha256(self.source).hexdigest()
+        if self.path is None:
+            return None
+        
+        stat = os.stat(self.path)
+        key = (os.path.realpath(self.path), stat.st_size, stat.st_mtime_ns)
+        digest = _path_digests.get(key)
+        if digest is None:
+            digest = await asyncio.get_running_loop().run_in_executor(None, _hash_file, self.path)
+            _path_digests[key] = digest
+            if len(_path_digests) > _PATH_DIGESTS_MAX:
+                _path_digests.popitem(last=False)
+        return digest
+    
+    def open(self) -> Any:
+        """
+        Открыть источник для передачи транспорту
+        
+        Returns:
+            Файловый объект, bytes или асинхронный итератор чанков
+        """
+        if self.path is not None:
+            self.close()
+            self._file = open(self.path, "rb")
+            return self._file
+        if isinstance(self.source, bytes):
+            return self.source
+        if self._consumed:
+            raise RuntimeError(f"{self.filename}: stream has already been uploaded")
+        self._consumed = True
+        return self._hashing_stream()
+    
+    async def _hashing_stream(self) -> AsyncIterator[bytes]:
+        """Отдать чанки итератора, попутно считая их хэш"""
+        digest = hashlib.sha256()
+        async for chunk in self.source:
+            digest.update(chunk)
+            yield chunk
+        self.stream_digest = digest.hexdigest()
+    
+    def close(self):
+        """Закрыть открытый файл"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def __repr__(self) -> str:
+        return f"InputFile({self.path or self.filename!r})"
+
+
+def file_id_from_message(message: Dict[str, Any], kind: str) -> Optional[str]:
+    """
+    Достать file_id отправленного файла из Message
+    
+    Args:
+        message: Результат send* метода
+        kind: Тип медиа ("photo", "document", "video", "audio", ...)
+    
+    Returns:
+        file_id или None
+    """
+    media = message.get(kind) if isinstance(message, dict) else None
+    if isinstance(media, list):
+        # photo - список размеров, последний самый большой
+        media = media[-1] if media else None
+    return media.get("file_id") if isinstance(media, dict) else None
+
+
+def is_stale_file_id_error(description: str) -> bool:
+    """
+    Ошибка относится к самому file_id (просрочен, от другого бота, не того типа)
+    
+    Args:
+        description: Описание ошибки BadRequestError
+    
+    Returns:
+        True если file_id нужно забыть и загрузить файл заново
+    """
+    description = description.lower()
+    return any(fragment in description for fragment in _STALE_FILE_ID_ERRORS)
+
+
+def form_value(value: Any) -> str:
+    """Значение обычного параметра в multipart запросе"""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
@@ -0,0 +1,138 @@
+"""
+Сборка альбомов (media group)
+
+Альбом приходит отдельными message update с общим media_group_id, обычно
+в пределах долей секунды. MediaGroupAggregator копит такие update и после
+паузы window (или при 10 элементах - максимум Telegram) передает их
+обработчику одним списком.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (update, context) одного элемента альбома
+AlbumItem = Tuple[Dict[str, Any], Dict[str, Any]]
+
+
+class _Group:
+    """Собираемый альбом"""
+    
+    __slots__ = ("items", "handle")
+    
+    def __init__(self):
+        self.items: List[AlbumItem] = []
+        self.handle: Optional[asyncio.TimerHandle] = None
+
+
+class MediaGroupAggregator:
+    """
+    Буфер update альбомов по (chat_id, media_group_id)
+    
+    Память ограничена: не больше max_groups собираемых альбомов, при
+    переполнении самый старый альбом передается обработчику досрочно.
+    """
+    
+    MAX_GROUP_SIZE = 10
+    
+    def __init__(self, handler: Callable[[List[AlbumItem]], Awaitable[Any]],
+                 window: float = 0.5, max_groups: int = 1000):
+        """
+        Args:
+            handler: Корутина, получающая элементы альбома в порядке message_id
+            window: Пауза после последнего элемента, после которой альбом считается полным
+            max_groups: Максимум одновременно собираемых альбомов
+        """
+        self.handler = handler
+        self.window = window
+        self.max_groups = max_groups
+        self._groups: "OrderedDict[Hashable, _Group]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+        # update_id собираемых и обрабатываемых альбомов (для safe_offset)
+        self._pending_ids: Set[int] = set()
+        
+        # Метрики
+        self.albums = 0
+        self.messages = 0
+        self.overflow_flushes = 0
+    
+    def add(self, update: Dict[str, Any], context: Dict[str, Any]):
+        """
+        Добавить update с media_group_id
+        
+        Args:
+            update: Update с message.media_group_id
+            context: Контекст обработки update
+        """
+        message = update["message"]
+        key = (message["chat"]["id"], message["media_group_id"])
+        self.messages += 1
+        
+        group = self._groups.get(key)
+        if group is None:
+            if len(self._groups) >= self.max_groups:
+                self.overflow_flushes += 1
+                self._start_flush(next(iter(self._groups)))
+            group = self._groups[key] = _Group()
+        group.items.append((update, context))
+        if "update_id" in update:
+            self._pending_ids.add(update["update_id"])
+        
+        if group.handle is not None:
+            group.handle.cancel()
+        if len(group.items) >= self.MAX_GROUP_SIZE:
+            self._start_flush(key)
+        else:
+            group.handle = asyncio.get_running_loop().call_later(self.window, self._start_flush, key)
+    
+    def _start_flush(self, key: Hashable):
+        group = self._groups.pop(key, None)
+        if group is None:
+            return
+        if group.handle is not None:
+            group.handle.cancel()
+        
+        task = asyncio.ensure_future(self._deliver(group.items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _deliver(self, items: List[AlbumItem]):
+        """Передать альбом обработчику"""
+        self.albums += 1
+        items.sort(key=lambda item: item[0]["message"].get("message_id", 0))
+        try:
+            await self.handler(items)
+        except Exception as e:
+            logger.error(f"Error in album handler: {e}", exc_info=True)
+        finally:
+            for update, _ in items:
+                self._pending_ids.discard(update.get("update_id"))
+    
+    def oldest_update_id(self) -> Optional[int]:
+        """Минимальный update_id среди еще не обработанных элементов альбомов"""
+        return min(self._pending_ids) if self._pending_ids else None
+    
+    async def flush(self):
+        """Передать обработчику все собираемые альбомы и дождаться обработки"""
+        for key in list(self._groups):
+            self._start_flush(key)
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Получить метрики
+        
+        Returns:
+            Словарь с метриками
+        """
+        return {
+            "collecting": len(self._groups),
+            "buffered_messages": sum(len(group.items) for group in self._groups.values()),
+            "albums": self.albums,
+            "messages": self.messages,
+            "overflow_flushes": self.overflow_flushes,
+        }
@@ -0,0 +1,135 @@
+"""
+Хранилища offset для long polling
+
+Offset сохраняется только после того, как все update до него обработаны,
+поэтому после перезапуска бот продолжает с первого необработанного update.
+"""
+
+import logging
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+class OffsetStore(ABC):
+    """Базовый класс хранилища offset"""
+    
+    @abstractmethod
+    def load(self) -> Optional[int]:
+        """
+        Загрузить сохраненный offset
+        
+        Returns:
+            Offset или None, если он еще не сохранялся
+        """
+        pass
+    
+    @abstractmethod
+    def save(self, offset: int):
+        """
+        Сохранить offset
+        
+        Args:
+            offset: ID следующего update, который нужно запросить
+        """
+        pass
+
+
+class FileOffsetStore(OffsetStore):
+    """
+    Offset в локальном файле
+    
+    Запись атомарная: временный файл + fsync + os.replace, поэтому сбой
+    во время записи оставляет предыдущее значение.
+    """
+    
+    def __init__(self, path: Union[str, Path], fsync: bool = True):
+        """
+        Args:
+            path: Путь к файлу
+            fsync: Сбрасывать данные на диск при каждом сохранении
+        """
+        self.path = Path(path)
+        self.fsync = fsync
+    
+    def load(self) -> Optional[int]:
+        try:
+            content = self.path.read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            return None
+        
+        try:
+            return int(content)
+        except ValueError:
+            logger.warning(f"Corrupted offset file {self.path}, ignoring")
+            return None
+    
+    def save(self, offset: int):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(str(offset))
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+
+class DatabaseOffsetStore(OffsetStore):
+    """Offset в таблице БД (несколько ботов различаются ключом)"""
+    
+    def __init__(self, engine, key: str = "default", table: str = "bot_offsets"):
+        """
+        Args:
+            engine: Движок БД
+            key: Ключ бота (например, его username)
+            table: Имя таблицы
+        """
+        self.engine = engine
+        self.key = key
+        self.table = table
+        self._ready = False
+    
+    def _ensure_table(self):
+        """Создать таблицу, если ее нет"""
+        if self._ready:
+            return
+        
+        self.engine.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            f"bot_key VARCHAR(255) PRIMARY KEY, "
+            f"update_offset BIGINT NOT NULL, "
+            f"updated_at TIMESTAMP)"
+        )
+        self.engine.commit()
+        self._ready = True
+    
+    def load(self) -> Optional[int]:
+        self._ensure_table()
+        row = self.engine.fetchone(
+            f"SELECT update_offset FROM {self.table} WHERE bot_key = ?",
+            (self.key,)
+        )
+        return row["update_offset"] if row else None
+    
+    def save(self, offset: int):
+        self._ensure_table()
+        self.engine.execute(
+            f"INSERT INTO {self.table} (bot_key, update_offset, updated_at) VALUES (?, ?, ?) "
+            f"ON CONFLICT (bot_key) DO UPDATE SET "
+            f"update_offset = excluded.update_offset, updated_at = excluded.updated_at",
+            (self.key, offset, datetime.now())
+        )
+        self.engine.commit()
@@ -0,0 +1,376 @@
+"""
+Очередь исходящих запросов с приоритетными полосами
+
+Полосы (lanes):
+    callback    - ответы на callback query (пользователь ждет реакцию кнопки)
+    interactive - ответы на команды и сообщения
+    bulk        - рассылки и фоновые отправки
+
+Полосы обслуживаются взвешенным round robin (smooth weighted round robin):
+при общей нагрузке bulk получает только свою долю пропускной способности,
+а при отсутствии интерактивных запросов - всю свободную. Внутри полосы
+чаты обслуживаются по кругу, поэтому один чат с большой рассылкой не
+задерживает остальные. Общий лимит Telegram соблюдается token bucket'ом,
+лимит на чат - минимальным интервалом между отправками в один чат.
+В один чат одновременно выполняется не больше одного запроса, поэтому
+сообщения приходят в порядке постановки в очередь. Ответ 429 приостанавливает
+весь token bucket на retry_after секунд (см. pause).
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Hashable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+LANES = ("callback", "interactive", "bulk")
+
+
+class _Job:
+    """Запрос в очереди"""
+    
+    __slots__ = ("method", "params", "chat_id", "future", "enqueued_at", "lane")
+    
+    def __init__(self, method: str, params: Dict[str, Any], chat_id: Optional[Hashable],
+                 future: asyncio.Future):
+        self.method = method
+        self.params = params
+        self.chat_id = chat_id
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.lane: Optional["_Lane"] = None
+
+
+class _Lane:
+    """Полоса: очереди запросов по чатам, обслуживаемые по кругу"""
+    
+    def __init__(self, name: str, weight: int):
+        self.name = name
+        self.weight = weight
+        self.current = 0
+        self.size = 0
+        self.chats: "OrderedDict[Optional[Hashable], Deque[_Job]]" = OrderedDict()
+        
+        # Метрики
+        self.submitted = 0
+        self.dispatched = 0
+        self.sent = 0
+        self.failed = 0
+        self.max_wait = 0.0
+        self.total_wait = 0.0
+    
+    def push(self, job: _Job):
+        queue = self.chats.get(job.chat_id)
+        if queue is None:
+            queue = self.chats[job.chat_id] = deque()
+        queue.append(job)
+        self.size += 1
+        self.submitted += 1
+    
+    def pop(self, chat_ready) -> Optional[_Job]:
+        """Взять запрос первого по кругу чата, которому уже можно отправлять"""
+        for chat_id in self.chats:
+            if chat_ready(chat_id):
+                break
+        else:
+            return None
+        
+        queue = self.chats[chat_id]
+        job = queue.popleft()
+        if queue:
+            self.chats.move_to_end(chat_id)
+        else:
+            del self.chats[chat_id]
+        self.size -= 1
+        return job
+
+
+class OutboundQueue:
+    """
+    Планировщик исходящих запросов бота
+    
+    Usage:
+        bot.enable_outbound_queue(rate=30)
+        
+        # Обычные методы бота используют очередь автоматически
+        await bot.send_message(chat_id, "Ответ")
+        
+        # Рассылка без ожидания результата
+        for chat_id in subscribers:
+            bot.outbound.submit_nowait("sendMessage", {"chat_id": chat_id, "text": text},
+                                       lane="bulk", chat_id=chat_id)
+    """
+    
+    DEFAULT_WEIGHTS = {"callback": 8, "interactive": 4, "bulk": 1}
+    
+    def __init__(self, bot, rate: float = 30.0, burst: Optional[int] = None,
+                 private_chat_interval: float = 0.0, group_chat_interval: float = 3.0,
+                 weights: Optional[Dict[str, int]] = None, max_in_flight: int = 32,
+                 max_queue: int = 100000):
+        """
+        Args:
+            bot: TelegramBot
+            rate: Максимум запросов в секунду (общий лимит)
+            burst: Размер token bucket (по умолчанию равен rate)
+            private_chat_interval: Минимальный интервал между отправками в личный чат
+            group_chat_interval: Минимальный интервал между отправками в группу (20 в минуту)
+            weights: Веса полос {"callback": 8, "interactive": 4, "bulk": 1}
+            max_in_flight: Максимум одновременно выполняемых запросов
+            max_queue: Максимальный размер очереди
+        """
+        self.bot = bot
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.private_chat_interval = private_chat_interval
+        self.group_chat_interval = group_chat_interval
+        self.max_queue = max_queue
+        
+        weights = {**self.DEFAULT_WEIGHTS, **(weights or {})}
+        self.lanes: Dict[str, _Lane] = {name: _Lane(name, weights[name]) for name in LANES}
+        
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._now = self._refilled_at
+        self._chat_next: Dict[Hashable, float] = {}
+        self._chat_busy: Set[Hashable] = set()
+        self._paused_until = 0.0
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight = 0
+        self._closed = False
+        
+        # Метрики
+        self.pauses = 0
+    
+    @property
+    def pending(self) -> int:
+        """Количество запросов в очереди"""
+        return sum(lane.size for lane in self.lanes.values())
+    
+    def submit(self, method: str, params: Dict[str, Any], lane: str = "interactive",
+               chat_id: Optional[Hashable] = None) -> asyncio.Future:
+        """
+        Поставить запрос в очередь
+        
+        Args:
+            method: Метод Bot API
+            params: Параметры
+            lane: Полоса ("callback", "interactive", "bulk")
+            chat_id: Чат получателя (для справедливости и лимита на чат)
+        
+        Returns:
+            Future с результатом запроса (можно await)
+        """
+        if lane not in self.lanes:
+            raise ValueError(f"Неизвестная полоса: {lane}")
+        if self._closed:
+            raise RuntimeError("Outbound queue is closed")
+        if self.pending >= self.max_queue:
+            raise OverflowError("Outbound queue is full")
+        
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.lanes[lane].push(_Job(method, params, chat_id, future))
+        
+        if self._task is None:
+            self._task = loop.create_task(self._run())
+        self._wakeup.set()
+        return future
+    
+    def submit_nowait(self, method: str, params: Dict[str, Any], lane: str = "bulk",
+                      chat_id: Optional[Hashable] = None):
+        """Поставить запрос в очередь без ожидания результата (ошибки только логируются)"""
+        future = self.submit(method, params, lane, chat_id)
+        future.add_done_callback(self._log_failure)
+    
+    @staticmethod
+    def _log_failure(future: asyncio.Future):
+        if not future.cancelled() and future.exception():
+            logger.error(f"Outbound request failed: {future.exception()}")
+    
+    def pause(self, seconds: float):
+        """
+        Приостановить отправку всех запросов (ответ 429: лимит общий для бота)
+        
+        Args:
+            seconds: На сколько секунд (retry_after)
+        """
+        until = time.monotonic() + seconds
+        if until <= self._paused_until:
+            return
+        self._paused_until = until
+        # Токены за время паузы не накапливаются: после нее нет всплеска запросов
+        self._tokens = min(self._tokens, 0.0)
+        self._refilled_at = max(self._refilled_at, until)
+        self.pauses += 1
+        logger.warning(f"Outbound queue paused for {seconds:.1f}s (rate limit)")
+    
+    def _chat_ready(self, chat_id: Optional[Hashable]) -> bool:
+        if chat_id is None:
+            return True
+        return chat_id not in self._chat_busy and self._chat_next.get(chat_id, 0.0) <= self._now
+    
+    def _chat_interval(self, chat_id: Hashable) -> float:
+        if isinstance(chat_id, int) and chat_id < 0:
+            return self.group_chat_interval
+        return self.private_chat_interval
+    
+    def _next_job(self) -> Optional[_Job]:
+        """Выбрать полосу (smooth weighted round robin) и запрос в ней"""
+        candidates = [lane for lane in self.lanes.values() if lane.size]
+        while candidates:
+            total = 0
+            best = None
+            for lane in candidates:
+                lane.current += lane.weight
+                total += lane.weight
+                if best is None or lane.current > best.current:
+                    best = lane
+            best.current -= total
+            
+            job = best.pop(self._chat_ready)
+            if job is not None:
+                wait = self._now - job.enqueued_at
+                best.total_wait += wait
+                best.max_wait = max(best.max_wait, wait)
+                job.lane = best
+                best.dispatched += 1
+                return job
+            candidates.remove(best)
+        return None
+    
+    def _refill(self):
+        """Пополнить token bucket"""
+        elapsed = self._now - self._refilled_at
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._refilled_at = self._now
+    
+    def _next_chat_ready_in(self) -> float:
+        """Через сколько секунд освободится ближайший ограниченный чат"""
+        waits = [
+            self._chat_next.get(chat_id, 0.0) - self._now
+            for lane in self.lanes.values()
+            for chat_id in lane.chats
+            if chat_id is not None and chat_id not in self._chat_busy
+        ]
+        return max(0.001, min(waits)) if waits else 1.0
+    
+    async def _run(self):
+        """Основной цикл планировщика"""
+        try:
+            while True:
+                if not self.pending:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                
+                self._now = time.monotonic()
+                if self._paused_until > self._now:
+                    await asyncio.sleep(self._paused_until - self._now)
+                    continue
+                
+                self._refill()
+                if self._tokens < 1:
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+                    continue
+                
+                await self._slots.acquire()
+                self._now = time.monotonic()
+                job = self._next_job()
+                if job is None:
+                    self._slots.release()
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), self._next_chat_ready_in())
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                
+                if job.future.done():
+                    # Вызывающий отменил запрос
+                    self._slots.release()
+                    continue
+                
+                self._tokens -= 1
+                if job.chat_id is not None:
+                    self._chat_busy.add(job.chat_id)
+                    self._chat_next[job.chat_id] = self._now + self._chat_interval(job.chat_id)
+                    if len(self._chat_next) > 10000:
+                        self._chat_next = {k: v for k, v in self._chat_next.items() if v > self._now}
+                
+                self._in_flight += 1
+                asyncio.ensure_future(self._execute(job))
+        except asyncio.CancelledError:
+            pass
+    
+    async def _execute(self, job: _Job):
+        """Выполнить запрос и передать результат в future"""
+        lane = job.lane
+        try:
+            result = await self.bot._make_request(job.method, **job.params)
+        except Exception as e:
+            lane.failed += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            lane.sent += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+            if job.chat_id is not None:
+                # Следующий запрос этого чата можно отправлять
+                self._chat_busy.discard(job.chat_id)
+                self._wakeup.set()
+    
+    async def close(self, timeout: float = 30.0):
+        """
+        Перестать принимать запросы и дождаться отправки очереди
+        
+        Args:
+            timeout: Максимальное время ожидания; неотправленные запросы отменяются
+        """
+        self._closed = True
+        deadline = time.monotonic() + timeout
+        while (self.pending or self._in_flight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        
+        for lane in self.lanes.values():
+            for queue in lane.chats.values():
+                for job in queue:
+                    job.future.cancel()
+            lane.chats.clear()
+            lane.size = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Получить метрики очереди
+        
+        Returns:
+            Словарь с метриками по полосам
+        """
+        lanes: Dict[str, Any] = {}
+        for name, lane in self.lanes.items():
+            lanes[name] = {
+                "pending": lane.size,
+                "submitted": lane.submitted,
+                "sent": lane.sent,
+                "failed": lane.failed,
+                "avg_wait": lane.total_wait / lane.dispatched if lane.dispatched else 0.0,
+                "max_wait": lane.max_wait,
+            }
+        return {
+            "in_flight": self._in_flight,
+            "tokens": self._tokens,
+            "paused_for": max(0.0, self._paused_until - time.monotonic()),
+            "pauses": self.pauses,
+            "lanes": lanes,
+        }
@@ -0,0 +1,260 @@
+"""
+Политика повторов запросов к Bot API
+
+Ошибки классифицируются по типу исключения (core.exceptions):
+    RetryAfterError          - 429, повтор через retry_after от Telegram
+    ServerError, NetworkError - 5xx и сетевые ошибки, повтор с экспоненциальной
+                               задержкой и jitter
+    остальные APIException   - 400/401/403/409, повтор не поможет
+
+Повторы ограничены бюджетом на метод: каждый запрос пополняет бюджет на
+долю ratio, каждый повтор его расходует. При массовых ошибках число повторов
+не превышает ~ratio от числа запросов, и повторы не умножают нагрузку.
+Если API деградировал (несколько ошибок подряд), CircuitBreaker на время
+перестает отправлять запросы и сразу отвечает CircuitOpenError.
+"""
+
+import logging
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from ..core.exceptions import APIException, CircuitOpenError, RetryAfterError
+
+logger = logging.getLogger(__name__)
+
+
+class RetryBudget:
+    """Бюджет повторов (token bucket, пополняемый запросами)"""
+    
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10, max_tokens: float = 100.0):
+        """
+        Args:
+            ratio: Сколько повторов разрешено на один запрос
+            min_retries: Запас повторов при малом числе запросов
+            max_tokens: Максимальный накопленный бюджет
+        """
+        self.ratio = ratio
+        self.max_tokens = max(max_tokens, min_retries)
+        self.tokens = float(min_retries)
+    
+    def deposit(self):
+        """Учесть запрос"""
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+    
+    def withdraw(self) -> bool:
+        """
+        Потратить один повтор
+        
+        Returns:
+            False если бюджет исчерпан
+        """
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker для API
+    
+    closed    - запросы идут как обычно
+    open      - после failure_threshold ошибок подряд запросы не отправляются
+                recovery_timeout секунд
+    half_open - пропускается один пробный запрос; успех закрывает breaker,
+                ошибка снова открывает
+    """
+    
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        """
+        Args:
+            failure_threshold: Сколько ошибок подряд открывает breaker
+            recovery_timeout: Время до пробного запроса в секундах
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+    
+    def allow(self, method: Optional[str] = None):
+        """
+        Проверить, можно ли отправить запрос
+        
+        Raises:
+            CircuitOpenError: Breaker открыт
+        """
+        if self.state == "closed":
+            return
+        
+        remaining = self.opened_at + self.recovery_timeout - time.monotonic()
+        if self.state == "open" and remaining <= 0:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return
+        raise CircuitOpenError("Telegram API is unavailable, request not sent",
+                               method=method, retry_after=max(0.0, remaining))
+    
+    def record_success(self):
+        """Учесть успешный ответ API"""
+        if self.state != "closed":
+            logger.info("Circuit breaker closed: API recovered")
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+    
+    def record_failure(self):
+        """Учесть ошибку сети или сервера"""
+        self.failures += 1
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            if self.state == "closed":
+                logger.error(f"Circuit breaker opened after {self.failures} consecutive failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+        self._probe_in_flight = False
+    
+    def release(self):
+        """Пробный запрос прерван, не дав ответа о состоянии API"""
+        self._probe_in_flight = False
+
+
+class RetryPolicy:
+    """
+    Политика повторов TelegramBot._make_request
+    
+    Usage:
+        policy = RetryPolicy(max_attempts=5, method_budgets={"sendMessage": 0.5})
+        bot = TelegramBot(token, retry_policy=policy)
+        
+        print(bot.retry_policy.stats())
+    """
+    
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 30.0,
+                 max_retry_after: float = 60.0, budget_ratio: float = 0.2,
+                 method_budgets: Optional[Dict[str, float]] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None):
+        """
+        Args:
+            max_attempts: Максимум попыток на запрос (включая первую)
+            base_delay: Задержка перед первым повтором (удваивается с каждой попыткой)
+            max_delay: Максимальная задержка между попытками
+            max_retry_after: Не ждать 429 дольше этого времени (ошибка передается вызывающему)
+            budget_ratio: Доля повторов от числа запросов по умолчанию
+            method_budgets: Доля повторов для отдельных методов {"sendMessage": 0.5}
+            circuit_breaker: CircuitBreaker (по умолчанию создается; False - отключить)
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.budget_ratio = budget_ratio
+        self.method_budgets = method_budgets or {}
+        self.circuit_breaker = CircuitBreaker() if circuit_breaker is None else circuit_breaker or None
+        self._budgets: Dict[str, RetryBudget] = {}
+        
+        # Метрики
+        self.requests: Counter = Counter()
+        self.retries: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.budget_exhausted: Counter = Counter()
+    
+    def _budget(self, method: str) -> RetryBudget:
+        budget = self._budgets.get(method)
+        if budget is None:
+            budget = self._budgets[method] = RetryBudget(self.method_budgets.get(method, self.budget_ratio))
+        return budget
+    
+    def before_request(self, method: str):
+        """
+        Вызывается перед первой попыткой запроса
+        
+        Raises:
+            CircuitOpenError: API недоступен
+        """
+        if self.circuit_breaker:
+            self.circuit_breaker.allow(method)
+        self.requests[method] += 1
+        self._budget(method).deposit()
+    
+    def record_success(self, method: str):
+        """Учесть успешный ответ"""
+        if self.circuit_breaker:
+            self.circuit_breaker.record_success()
+    
+    def record_cancelled(self, method: str):
+        """Учесть запрос, отмененный до получения ответа"""
+        if self.circuit_breaker:
+            self.circuit_breaker.release()
+    
+    def record_failure(self, method: str, error: APIException):
+        """Учесть ошибку попытки"""
+        self.errors[type(error).__name__] += 1
+        if self.circuit_breaker:
+            if error.retryable and not isinstance(error, RetryAfterError):
+                self.circuit_breaker.record_failure()
+            else:
+                # API ответил: он доступен, хотя запрос и неудачный
+                self.circuit_breaker.record_success()
+    
+    def backoff(self, attempt: int) -> float:
+        """Экспоненциальная задержка с полным jitter"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+    
+    def retry_delay(self, method: str, error: APIException, attempt: int,
+                    max_attempts: Optional[int] = None) -> Optional[float]:
+        """
+        Решить, повторять ли запрос
+        
+        Args:
+            method: Метод API
+            error: Ошибка попытки
+            attempt: Номер завершившейся попытки (с 1)
+            max_attempts: Переопределение max_attempts для запроса
+        
+        Returns:
+            Задержка перед повтором в секундах или None, если повторять не нужно
+        """
+        if not error.retryable or attempt >= (max_attempts or self.max_attempts):
+            return None
+        
+        if isinstance(error, RetryAfterError):
+            # Telegram сам сообщает, когда можно повторить: бюджет не расходуется
+            retry_after = error.retry_after or 1
+            if retry_after > self.max_retry_after:
+                return None
+            self.retries[method] += 1
+            return float(retry_after)
+        
+        if self.circuit_breaker and self.circuit_breaker.state != "closed":
+            return None
+        if not self._budget(method).withdraw():
+            self.budget_exhausted[method] += 1
+            return None
+        self.retries[method] += 1
+        return self.backoff(attempt)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Получить метрики
+        
+        Returns:
+            Словарь с метриками
+        """
+        breaker = self.circuit_breaker
+        return {
+            "requests": dict(self.requests),
+            "retries": dict(self.retries),
+            "errors": dict(self.errors),
+            "budget_exhausted": dict(self.budget_exhausted),
+            "circuit": {
+                "state": breaker.state,
+                "consecutive_failures": breaker.failures,
+                "times_opened": breaker.times_opened,
+            } if breaker else None,
+        }
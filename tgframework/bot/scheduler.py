@@ -0,0 +1,641 @@
+"""
+Планировщик отложенных и периодических заданий
+
+Задание - это имя зарегистрированной задачи (корутины), ее аргументы и
+триггер (DateTrigger, IntervalTrigger, CronTrigger). Ближайшие запуски
+хранятся в куче по времени: добавление и выбор следующего задания - O(log n).
+
+С хранилищем (bot.set_job_store(ScheduledJobRepository(session))) задания
+переживают перезапуск. В памяти держится только окно ближайших запусков
+(horizon секунд, не больше page_size заданий за загрузку), остальные
+догружаются из БД по мере приближения, поэтому число отложенных заданий
+ограничено размером БД, а не памятью. Изменения заданий записываются в БД
+пакетами раз в flush_interval; после сбоя задание может быть выполнено
+повторно (at-least-once). Запись и загрузка окна выполняются в отдельном
+потоке с собственным подключением к БД (store.detached()), цикл событий
+их не ждет.
+
+Пропущенные запуски (бот был остановлен или не успевал) обрабатываются
+политикой misfire_policy задания:
+    "run_once" - выполнить один раз и продолжить расписание от текущего времени
+    "skip"     - не выполнять, продолжить расписание от текущего времени
+    "run_all"  - выполнить каждый пропущенный запуск
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from .triggers import Trigger, trigger_from_dict
+
+logger = logging.getLogger(__name__)
+
+# Задача: async def task(bot, **kwargs)
+TaskFunc = Callable[..., Awaitable[Any]]
+
+# Курсор загруженного окна: (время запуска, job_id)
+_MAX_ID = "\U0010ffff"
+
+
+class Job:
+    """Задание планировщика"""
+    
+    __slots__ = ("id", "task", "trigger", "kwargs", "next_run", "misfire_policy", "misfire_grace_time",
+                 "runs", "failures", "misfires", "last_run_at", "last_duration", "last_error", "seq")
+    
+    def __init__(self, job_id: str, task: str, trigger: Trigger, kwargs: Optional[Dict[str, Any]] = None,
+                 next_run: Optional[float] = None, misfire_policy: str = "run_once",
+                 misfire_grace_time: Optional[float] = None):
+        self.id = job_id
+        self.task = task
+        self.trigger = trigger
+        self.kwargs = kwargs or {}
+        self.next_run = next_run
+        self.misfire_policy = misfire_policy
+        self.misfire_grace_time = misfire_grace_time
+        
+        # Метрики задания
+        self.runs = 0
+        self.failures = 0
+        self.misfires = 0
+        self.last_run_at: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+        
+        # Номер актуальной записи в куче
+        self.seq = -1
+    
+    def to_row(self) -> Dict[str, Any]:
+        """Строка для ScheduledJobRepository"""
+        return {
+            "job_id": self.id,
+            "task": self.task,
+            "trigger": json.dumps(self.trigger.to_dict()),
+            "kwargs": json.dumps(self.kwargs, ensure_ascii=False),
+            "next_run_at": round(self.next_run * 1000),
+            "misfire_policy": self.misfire_policy,
+            "misfire_grace_time": None if self.misfire_grace_time is None else round(self.misfire_grace_time),
+            "runs": self.runs,
+            "failures": self.failures,
+            "misfires": self.misfires,
+            "last_run_at": None if self.last_run_at is None else round(self.last_run_at * 1000),
+            "last_duration_ms": None if self.last_duration is None else round(self.last_duration * 1000),
+            "last_error": self.last_error,
+        }
+    
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "Job":
+        """Восстановить задание из строки ScheduledJobRepository"""
+        job = cls(
+            row["job_id"],
+            row["task"],
+            trigger_from_dict(json.loads(row["trigger"])),
+            json.loads(row["kwargs"]) if row.get("kwargs") else {},
+            next_run=row["next_run_at"] / 1000,
+            misfire_policy=row.get("misfire_policy") or "run_once",
+            misfire_grace_time=row.get("misfire_grace_time"),
+        )
+        job.runs = row.get("runs") or 0
+        job.failures = row.get("failures") or 0
+        job.misfires = row.get("misfires") or 0
+        if row.get("last_run_at") is not None:
+            job.last_run_at = row["last_run_at"] / 1000
+        if row.get("last_duration_ms") is not None:
+            job.last_duration = row["last_duration_ms"] / 1000
+        job.last_error = row.get("last_error")
+        return job
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Получить метрики задания
+        
+        Returns:
+            Словарь с метриками
+        """
+        return {
+            "task": self.task,
+            "trigger": repr(self.trigger),
+            "next_run": self.next_run,
+            "runs": self.runs,
+            "failures": self.failures,
+            "misfires": self.misfires,
+            "last_run_at": self.last_run_at,
+            "last_duration": self.last_duration,
+            "last_error": self.last_error,
+        }
+    
+    def __repr__(self) -> str:
+        return f"Job({self.id!r}, task={self.task!r}, trigger={self.trigger!r})"
+
+
+async def _send_message_task(bot, chat_id: Union[int, str], text: str, lane: str = "bulk", **kwargs):
+    """Встроенная задача отправки сообщения (Scheduler.schedule_message)"""
+    await bot.send_message(chat_id, text, lane=lane, **kwargs)
+
+
+class Scheduler:
+    """
+    Планировщик заданий бота (bot.scheduler)
+    
+    Задачи регистрируются по имени: в БД сохраняется имя и аргументы, поэтому
+    после перезапуска задачи должны быть зарегистрированы до bot.start_*.
+    
+    Usage:
+        @bot.scheduler.task("daily_digest")
+        async def daily_digest(bot, chat_id):
+            await bot.send_message(chat_id, await build_digest(), lane="bulk")
+        
+        bot.set_job_store(ScheduledJobRepository(session))
+        bot.scheduler.add_job("daily_digest", CronTrigger("0 9 * * *"),
+                              job_id=f"digest:{chat_id}", kwargs={"chat_id": chat_id})
+        
+        # Напоминание через час
+        bot.scheduler.schedule_message(chat_id, "Напоминание!", DateTrigger(time.time() + 3600))
+    """
+    
+    MISFIRE_POLICIES = ("run_once", "skip", "run_all")
+    
+    def __init__(self, bot, store=None, horizon: float = 3600.0, page_size: int = 10000,
+                 misfire_grace_time: float = 60.0, max_concurrency: int = 100,
+                 flush_interval: float = 1.0):
+        """
+        Args:
+            bot: TelegramBot
+            store: Хранилище заданий (ScheduledJobRepository) или None - только в памяти
+            horizon: Окно загрузки заданий из хранилища в секундах
+            page_size: Максимум заданий за одну загрузку из хранилища
+            misfire_grace_time: Опоздание запуска в секундах, после которого он считается пропущенным
+            max_concurrency: Максимум одновременно выполняемых заданий
+            flush_interval: Интервал записи изменений в хранилище в секундах
+        """
+        self.bot = bot
+        self.horizon = horizon
+        self.page_size = page_size
+        self.misfire_grace_time = misfire_grace_time
+        self.max_concurrency = max_concurrency
+        self.flush_interval = flush_interval
+        
+        self.tasks: Dict[str, TaskFunc] = {"send_message": _send_message_task}
+        self._jobs: Dict[str, Job] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._dirty: Dict[str, Job] = {}
+        self._deleted: Set[str] = set()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._wakeup = asyncio.Event()
+        self._loop_task: Optional[asyncio.Task] = None
+        self.store = None
+        self._loaded_until: Tuple[float, str] = (float("inf"), _MAX_ID)
+        self._refill_retry_at = 0.0
+        # Изменения, которые сейчас записываются (см. flush)
+        self._flushing: Dict[str, Job] = {}
+        self._flushing_deleted: Set[str] = set()
+        self._flush_lock = asyncio.Lock()
+        self._io = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.set_store(store)
+        
+        # Метрики
+        self.runs = 0
+        self.failures = 0
+        self.misfires = 0
+        self.overlaps = 0
+        self.loaded = 0
+        self.flush_errors = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+    
+    def set_store(self, store):
+        """
+        Установить хранилище заданий (до запуска планировщика)
+        
+        Args:
+            store: ScheduledJobRepository или None
+        """
+        if self._loop_task is not None:
+            raise RuntimeError("Хранилище нельзя сменить после запуска планировщика")
+        self.store = store
+        self._io = None
+        if store is None:
+            self._loaded_until = (float("inf"), _MAX_ID)
+        else:
+            # Задания из памяти будут сохранены и загружены обратно при старте
+            self._loaded_until = (float("-inf"), "")
+            for job in self._jobs.values():
+                self._dirty[job.id] = job
+            self._jobs.clear()
+            self._heap.clear()
+    
+    def task(self, name: Optional[str] = None):
+        """
+        Декоратор регистрации задачи
+        
+        Args:
+            name: Имя задачи (по умолчанию module.qualname функции)
+        """
+        def decorator(func: TaskFunc) -> TaskFunc:
+            self.register_task(func, name)
+            return func
+        return decorator
+    
+    def register_task(self, func: TaskFunc, name: Optional[str] = None) -> str:
+        """
+        Зарегистрировать задачу
+        
+        Args:
+            func: Корутина async def task(bot, **kwargs)
+            name: Имя задачи (по умолчанию module.qualname функции)
+        
+        Returns:
+            Имя задачи
+        """
+        name = name or f"{func.__module__}.{func.__qualname__}"
+        self.tasks[name] = func
+        return name
+    
+    def add_job(self, task: Union[str, TaskFunc], trigger: Trigger, job_id: Optional[str] = None,
+                kwargs: Optional[Dict[str, Any]] = None, misfire_policy: str = "run_once",
+                misfire_grace_time: Optional[float] = None, replace_existing: bool = True) -> Job:
+        """
+        Добавить задание
+        
+        Args:
+            task: Имя зарегистрированной задачи или корутина (регистрируется автоматически)
+            trigger: Триггер запуска
+            job_id: ID задания (по умолчанию случайный); задание с тем же ID заменяется
+            kwargs: Аргументы задачи (JSON-сериализуемые, если есть хранилище)
+            misfire_policy: "run_once", "skip" или "run_all"
+            misfire_grace_time: Допустимое опоздание в секундах (по умолчанию scheduler.misfire_grace_time)
+            replace_existing: Заменять задание с тем же ID (иначе ValueError)
+        
+        Returns:
+            Задание
+        """
+        if callable(task):
+            task = next((name for name, func in self.tasks.items() if func is task), None) \
+                or self.register_task(task)
+        elif task not in self.tasks:
+            raise ValueError(f"Задача {task!r} не зарегистрирована")
+        if misfire_policy not in self.MISFIRE_POLICIES:
+            raise ValueError(f"Неизвестная политика пропуска: {misfire_policy}")
+        
+        job_id = job_id or uuid.uuid4().hex
+        if not replace_existing and self.get_job(job_id) is not None:
+            raise ValueError(f"Задание {job_id!r} уже существует")
+        
+        next_run = trigger.first_run(time.time())
+        if next_run is None:
+            raise ValueError(f"Триггер {trigger!r} не имеет будущих запусков")
+        
+        job = Job(job_id, task, trigger, kwargs, next_run, misfire_policy, misfire_grace_time)
+        if self.store is not None:
+            # Ошибка сериализации должна возникнуть здесь, а не при записи в БД
+            job.to_row()
+        self._deleted.discard(job_id)
+        self._put(job)
+        return job
+    
+    def schedule_message(self, chat_id: Union[int, str], text: str, trigger: Trigger,
+                         job_id: Optional[str] = None, lane: str = "bulk", **kwargs) -> Job:
+        """
+        Запланировать отправку сообщения
+        
+        Сообщение отправляется через bot.send_message, то есть через rate limiter
+        или очередь исходящих (полоса lane), если она включена.
+        
+        Args:
+            chat_id: ID чата
+            text: Текст сообщения
+            trigger: Триггер запуска
+            job_id: ID задания
+            lane: Полоса очереди исходящих
+            **kwargs: Параметры send_message (parse_mode, reply_markup, ...)
+        
+        Returns:
+            Задание
+        """
+        return self.add_job("send_message", trigger, job_id=job_id,
+                            kwargs={"chat_id": chat_id, "text": text, "lane": lane, **kwargs})
+    
+    def remove_job(self, job_id: str) -> bool:
+        """
+        Удалить задание (выполняющийся запуск не прерывается)
+        
+        Returns:
+            True если задание было в памяти
+        """
+        job = self._jobs.pop(job_id, None)
+        self._dirty.pop(job_id, None)
+        if self.store is not None:
+            self._deleted.add(job_id)
+        return job is not None
+    
+    def get_job(self, job_id: str) -> Optional[Job]:
+        """
+        Получить задание (из памяти или хранилища)
+        
+        Returns:
+            Задание или None
+        """
+        job = self._jobs.get(job_id) or self._dirty.get(job_id) or self._flushing.get(job_id)
+        if job is not None or self.store is None or job_id in self._deleted or job_id in self._flushing_deleted:
+            return job
+        row = self.store.get(job_id)
+        return Job.from_row(row.to_dict()) if row is not None else None
+    
+    def _put(self, job: Job):
+        """Поставить задание в кучу (если оно в загруженном окне) и отметить для записи"""
+        # Хранилище сравнивает время с точностью до миллисекунды
+        if (round(job.next_run, 3), job.id) <= self._loaded_until:
+            job.seq = next(self._seq)
+            self._jobs[job.id] = job
+            heapq.heappush(self._heap, (job.next_run, job.seq, job.id))
+            if self._heap[0][1] == job.seq:
+                self._wakeup.set()
+        else:
+            # Задание загрузится из хранилища, когда подойдет его время
+            self._jobs.pop(job.id, None)
+        if self.store is not None:
+            self._dirty[job.id] = job
+    
+    def start(self):
+        """Запустить планировщик (вызывается из bot.start_polling / start_webhook)"""
+        if self._loop_task is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop_task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self, timeout: float = 30.0):
+        """
+        Остановить планировщик
+        
+        Ждет выполняющиеся задания не дольше timeout и записывает изменения
+        в хранилище.
+        """
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+        
+        if self._running:
+            done, pending = await asyncio.wait(list(self._running.values()), timeout=timeout)
+            if pending:
+                logger.warning(f"Stopping scheduler with {len(pending)} job(s) still running")
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+        await self.flush()
+        
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._io is not None and self._io is not self.store:
+            self._io.session.close()
+        self._io = None
+    
+    async def _run(self):
+        """Основной цикл: запуск наступивших заданий, догрузка окна, запись изменений"""
+        next_flush = time.monotonic() + self.flush_interval
+        try:
+            while True:
+                self._wakeup.clear()
+                now = time.time()
+                if self.store is not None and now >= self._next_refill():
+                    await self._refill(now)
+                    now = time.time()
+                
+                while self._heap and self._heap[0][0] <= now:
+                    _, seq, job_id = heapq.heappop(self._heap)
+                    job = self._jobs.get(job_id)
+                    if job is not None and job.seq == seq:
+                        self._fire(job, now)
+                
+                if self.store is not None and time.monotonic() >= next_flush:
+                    await self.flush()
+                    next_flush = time.monotonic() + self.flush_interval
+                
+                timeout = None
+                if self._heap:
+                    timeout = self._heap[0][0] - time.time()
+                if self.store is not None:
+                    refill_in = self._next_refill() - time.time()
+                    timeout = min(x for x in (timeout, refill_in, self.flush_interval) if x is not None)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), None if timeout is None else max(0.0, timeout))
+                except asyncio.TimeoutError:
+                    pass
+        except Exception as e:
+            logger.error(f"Scheduler loop crashed: {e}", exc_info=True)
+            raise
+    
+    def _fire(self, job: Job, now: float):
+        """Обработать наступивший запуск задания"""
+        if job.id in self._running and job.misfire_policy == "run_all":
+            # Пропущенные запуски выполняются по очереди: продолжим после текущего (см. _execute)
+            return
+        
+        lateness = now - job.next_run
+        self.last_lag = lateness
+        self.max_lag = max(self.max_lag, lateness)
+        
+        grace = job.misfire_grace_time if job.misfire_grace_time is not None else self.misfire_grace_time
+        missed = lateness > grace
+        run = True
+        if missed:
+            job.misfires += 1
+            self.misfires += 1
+            run = job.misfire_policy != "skip"
+        if run and job.id in self._running:
+            # Предыдущий запуск еще выполняется: не запускаем второй экземпляр
+            self.overlaps += 1
+            run = False
+        
+        base = job.next_run if not missed or job.misfire_policy == "run_all" else now
+        next_run = job.trigger.next_after(base)
+        # Время из хранилища округлено до миллисекунды: не повторяем тот же запуск
+        while next_run is not None and next_run - base < 0.001:
+            next_run = job.trigger.next_after(next_run)
+        job.next_run = next_run
+        
+        if run:
+            self._running[job.id] = asyncio.ensure_future(self._execute(job))
+        
+        if job.next_run is not None:
+            self._put(job)
+        elif not run:
+            self._finish(job)
+        # Иначе однократное задание удалится после выполнения (см. _execute)
+    
+    async def _execute(self, job: Job):
+        """Выполнить задание"""
+        async with self._semaphore:
+            started = time.time()
+            started_perf = time.perf_counter()
+            try:
+                func = self.tasks.get(job.task)
+                if func is None:
+                    raise LookupError(f"Task {job.task!r} is not registered")
+                await func(self.bot, **job.kwargs)
+                job.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.failures += 1
+                self.failures += 1
+                job.last_error = f"{type(e).__name__}: {e}"[:1000]
+                logger.error(f"Scheduled job {job.id} ({job.task}) failed: {e}", exc_info=True)
+            finally:
+                job.runs += 1
+                self.runs += 1
+                job.last_run_at = started
+                job.last_duration = time.perf_counter() - started_perf
+                self._running.pop(job.id, None)
+                if job.next_run is None:
+                    self._finish(job)
+                    return
+                if self.store is not None and job.id not in self._deleted:
+                    self._mark_dirty(job)
+                if job.misfire_policy == "run_all" and self._jobs.get(job.id) is job \
+                        and job.next_run <= time.time():
+                    self._put(job)
+    
+    def _mark_dirty(self, job: Job):
+        """Отметить метрики выполненного задания для записи"""
+        current = self._jobs.get(job.id)
+        if current is not None and current is not job:
+            # Задание успели загрузить из хранилища заново: переносим метрики
+            for attr in ("runs", "failures", "misfires", "last_run_at", "last_duration", "last_error"):
+                setattr(current, attr, getattr(job, attr))
+            job = current
+        self._dirty[job.id] = job
+    
+    def _finish(self, job: Job):
+        """Задание больше не запускается"""
+        if self._jobs.get(job.id) is job:
+            del self._jobs[job.id]
+        if self.store is not None:
+            self._dirty.pop(job.id, None)
+            self._deleted.add(job.id)
+    
+    def _next_refill(self) -> float:
+        """Время следующей загрузки окна из хранилища (Unix время)"""
+        until = self._loaded_until[0]
+        if len(self._heap) < self.page_size:
+            until -= self.horizon / 2
+        # Иначе в памяти полная страница: следующая загружается, когда дойдет очередь до ее заданий
+        return max(until, self._refill_retry_at)
+    
+    def _store_io(self):
+        """Хранилище для запросов из потока планировщика или None, если запросы идут в цикле событий"""
+        if self._io is None:
+            detached = getattr(self.store, "detached", None)
+            self._io = detached() if detached else None
+            if self._io is None:
+                logger.warning("Scheduler: no separate DB connection available, job store I/O runs on the event loop")
+                self._io = self.store
+            else:
+                # Один поток: подключение не используется конкурентно, запросы идут по порядку
+                self._executor = ThreadPoolExecutor(1, thread_name_prefix="tgframework-scheduler")
+        return self._io if self._executor is not None else None
+    
+    async def _call_store(self, method: str, *args: Any) -> Any:
+        """Вызвать метод хранилища в потоке планировщика (или в цикле событий, см. _store_io)"""
+        io = self._store_io()
+        if io is None:
+            return getattr(self.store, method)(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, getattr(io, method), *args)
+    
+    async def _refill(self, now: float):
+        """Загрузить из хранилища задания, запуск которых наступит в пределах horizon"""
+        # Хранилище должно отражать перенесенные в памяти запуски до чтения
+        await self.flush()
+        until = now + self.horizon
+        after_time, after_id = self._loaded_until
+        after_ms = -1 if after_time == float("-inf") else round(after_time * 1000)
+        try:
+            rows = await self._call_store("load_window", after_ms, after_id, round(until * 1000), self.page_size)
+        except Exception as e:
+            logger.error(f"Error loading scheduled jobs: {e}", exc_info=True)
+            self._refill_retry_at = now + max(self.flush_interval, 1.0)
+            return
+        
+        for row in rows:
+            data = row.to_dict()
+            # Задание, измененное во время загрузки, в памяти новее строки из хранилища
+            if data["job_id"] in self._jobs or data["job_id"] in self._deleted or data["job_id"] in self._dirty:
+                continue
+            try:
+                job = Job.from_row(data)
+            except Exception as e:
+                logger.error(f"Skipping corrupted scheduled job {data['job_id']}: {e}")
+                continue
+            job.seq = next(self._seq)
+            self._jobs[job.id] = job
+            heapq.heappush(self._heap, (job.next_run, job.seq, job.id))
+            self.loaded += 1
+        
+        if len(rows) >= self.page_size:
+            last = rows[-1]
+            self._loaded_until = (last.next_run_at / 1000, last.job_id)
+        else:
+            self._loaded_until = (until, _MAX_ID)
+        
+        # Задания, добавленные во время загрузки, проверяются по новому окну
+        for job in list(self._dirty.values()):
+            if job.id not in self._jobs and job.next_run is not None and job.id not in self._running:
+                self._put(job)
+    
+    async def flush(self):
+        """Записать измененные и удаленные задания в хранилище"""
+        async with self._flush_lock:
+            if self.store is None or (not self._dirty and not self._deleted):
+                return
+            dirty, self._dirty = self._dirty, {}
+            deleted, self._deleted = self._deleted, set()
+            self._flushing, self._flushing_deleted = dirty, deleted
+            try:
+                # Строки готовятся в цикле событий: задания меняются только в нем
+                rows = [job.to_row() for job in dirty.values()]
+                if deleted:
+                    await self._call_store("delete_many", list(deleted))
+                if rows:
+                    await self._call_store("save_many", rows)
+            except Exception as e:
+                self.flush_errors += 1
+                logger.error(f"Error saving scheduled jobs: {e}", exc_info=True)
+                # Повторим при следующей записи; более свежие изменения имеют приоритет
+                for job_id, job in dirty.items():
+                    self._dirty.setdefault(job_id, job)
+                self._deleted |= deleted - set(self._dirty)
+            finally:
+                self._flushing, self._flushing_deleted = {}, set()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Получить метрики
+        
+        Returns:
+            Словарь с метриками
+        """
+        return {
+            "jobs_in_memory": len(self._jobs),
+            "running": len(self._running),
+            "pending_writes": len(self._dirty) + len(self._deleted),
+            "runs": self.runs,
+            "failures": self.failures,
+            "misfires": self.misfires,
+            "overlaps": self.overlaps,
+            "loaded": self.loaded,
+            "flush_errors": self.flush_errors,
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+        }
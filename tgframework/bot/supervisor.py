@@ -0,0 +1,306 @@
+"""
+Supervisor: один процесс получает update, N рабочих процессов их обрабатывают
+
+Update распределяются по воркерам по хэшу chat_id, поэтому все update одного чата
+попадают в один процесс и обрабатываются строго по порядку.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+
+from aiohttp import web
+
+from ..infrastructure.utils import extract_user_chat
+
+logger = logging.getLogger(__name__)
+
+
+def shard_key(update: Dict[str, Any]) -> int:
+    """
+    Ключ шардирования update: chat_id, затем user_id, затем update_id
+    
+    Args:
+        update: Update от Telegram
+    
+    Returns:
+        Целочисленный ключ
+    """
+    user, chat = extract_user_chat(update)
+    if chat and chat.get("id") is not None:
+        return chat["id"]
+    if user and user.get("id") is not None:
+        return user["id"]
+    return update.get("update_id", 0)
+
+
+def _worker_main(index: int, bot_factory: Callable, updates: "multiprocessing.Queue"):
+    """Точка входа рабочего процесса"""
+    bot = bot_factory()
+    try:
+        asyncio.run(_worker_loop(index, bot, updates))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_loop(index: int, bot, updates: "multiprocessing.Queue"):
+    """Обрабатывать update из очереди по одному, сохраняя порядок"""
+    loop = asyncio.get_running_loop()
+    bot.running = True
+    logger.info(f"Worker {index} started (pid {os.getpid()})")
+    
+    try:
+        while True:
+            update = await loop.run_in_executor(None, updates.get)
+            if update is None:
+                break
+            try:
+                await bot._process_update(update)
+            except Exception as e:
+                logger.error(f"Worker {index}: error processing update: {e}", exc_info=True)
+                await bot._handle_error(e, update=update)
+    finally:
+        await bot.stop()
+        logger.info(f"Worker {index} stopped")
+
+
+class BotSupervisor:
+    """
+    Запуск бота на нескольких процессах с шардированием по чатам
+    
+    bot_factory должна быть функцией верхнего уровня модуля (процессы запускаются
+    через spawn) и возвращать полностью настроенный TelegramBot.
+    
+    Usage:
+        def create_bot():
+            bot = TelegramBot(TOKEN)
+            bot.register_command("start", start)
+            return bot
+        
+        if __name__ == "__main__":
+            BotSupervisor(create_bot, workers=4).run()
+    """
+    
+    def __init__(self, bot_factory: Callable, workers: Optional[int] = None,
+                 queue_size: int = 10000, restart_delay: float = 1.0):
+        """
+        Args:
+            bot_factory: Функция, создающая бота (вызывается в каждом процессе)
+            workers: Количество рабочих процессов (по умолчанию число ядер)
+            queue_size: Максимальная длина очереди одного воркера
+            restart_delay: Пауза перед перезапуском упавшего воркера
+        """
+        self.bot_factory = bot_factory
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.restart_delay = restart_delay
+        
+        self._context = multiprocessing.get_context("spawn")
+        self._queues: List["multiprocessing.Queue"] = []
+        self._processes: List[Optional[multiprocessing.Process]] = []
+        self._died_at: Dict[int, float] = {}
+        self.bot = None
+        
+        # Метрики
+        self.dispatched = 0
+        self.restarts = 0
+    
+    def start_workers(self):
+        """Запустить рабочие процессы"""
+        for index in range(self.workers):
+            self._queues.append(self._context.Queue(self.queue_size))
+            self._processes.append(None)
+            self._spawn(index)
+    
+    def _spawn(self, index: int):
+        """Запустить (или перезапустить) воркер index"""
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, self.bot_factory, self._queues[index]),
+            name=f"tgframework-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[index] = process
+    
+    def check_workers(self):
+        """Перезапустить упавшие воркеры"""
+        now = time.monotonic()
+        for index, process in enumerate(self._processes):
+            if process is None or process.is_alive():
+                continue
+            
+            died_at = self._died_at.setdefault(index, now)
+            if now - died_at < self.restart_delay:
+                continue
+            
+            logger.warning(f"Worker {index} exited with code {process.exitcode}, restarting")
+            del self._died_at[index]
+            # Упавший процесс мог умереть, удерживая блокировку чтения очереди,
+            # поэтому новый воркер получает новую очередь; необработанные update теряются
+            self._queues[index].cancel_join_thread()
+            self._queues[index].close()
+            self._queues[index] = self._context.Queue(self.queue_size)
+            self.restarts += 1
+            self._spawn(index)
+    
+    def dispatch_nowait(self, update: Dict[str, Any]) -> bool:
+        """
+        Отправить update воркеру без ожидания
+        
+        Returns:
+            False если очередь воркера заполнена
+        """
+        index = zlib.crc32(str(shard_key(update)).encode()) % self.workers
+        try:
+            self._queues[index].put_nowait(update)
+        except queue.Full:
+            return False
+        self.dispatched += 1
+        return True
+    
+    async def dispatch(self, update: Dict[str, Any]):
+        """Отправить update воркеру, дождавшись места в очереди (backpressure)"""
+        while not self.dispatch_nowait(update):
+            self.check_workers()
+            await asyncio.sleep(0.01)
+    
+    def stop_workers(self, timeout: float = 30.0):
+        """
+        Остановить воркеры, дав им обработать очередь
+        
+        Воркер, не завершившийся за timeout (в том числе из-за заполненной
+        очереди, куда не помещается сигнал остановки), завершается принудительно.
+        
+        Args:
+            timeout: Сколько ждать завершения всех воркеров
+        """
+        deadline = time.monotonic() + timeout
+        pending = {index for index, process in enumerate(self._processes)
+                   if process is not None and process.is_alive()}
+        
+        # Сигнал остановки ставится без блокировки: очередь упавшего или зависшего
+        # воркера может быть заполнена, и put(None) ждал бы вечно
+        while pending and time.monotonic() < deadline:
+            for index in list(pending):
+                try:
+                    self._queues[index].put_nowait(None)
+                except queue.Full:
+                    if self._processes[index].is_alive():
+                        continue
+                pending.discard(index)
+            if pending:
+                time.sleep(0.05)
+        
+        for index, process in enumerate(self._processes):
+            if process is None:
+                continue
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Worker {index} did not stop in time, terminating")
+                process.terminate()
+                process.join(5.0)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+        
+        for updates in self._queues:
+            # Необработанные update не должны задерживать выход процесса
+            updates.cancel_join_thread()
+            updates.close()
+        
+        self._processes = []
+        self._queues = []
+    
+    async def _monitor(self, interval: float = 1.0):
+        """Периодически проверять воркеры"""
+        while True:
+            await asyncio.sleep(interval)
+            self.check_workers()
+    
+    async def start_polling(self):
+        """Получать update через getUpdates и раздавать воркерам"""
+        self.bot = self.bot_factory()
+        self.bot.running = True
+        self.start_workers()
+        monitor = asyncio.create_task(self._monitor())
+        logger.info(f"Supervisor started in polling mode with {self.workers} workers")
+        
+        try:
+            while self.bot.running:
+                try:
+                    updates = await self.bot.get_updates()
+                    for update in updates:
+                        update_id = update.get("update_id")
+                        if update_id:
+                            self.bot.offset = update_id + 1
+                        await self.dispatch(update)
+                except Exception as e:
+                    logger.error(f"Error in supervisor polling loop: {e}", exc_info=True)
+                    await asyncio.sleep(5)
+        finally:
+            monitor.cancel()
+            self.stop_workers()
+            await self.bot.stop()
+    
+    async def start_webhook(self, host: str = "0.0.0.0", port: int = 8080,
+                            path: str = "/webhook", secret_token: Optional[str] = None,
+                            webhook_url: Optional[str] = None):
+        """
+        Принимать update через webhook и раздавать воркерам
+        
+        Args:
+            host: Адрес для прослушивания
+            port: Порт
+            path: Путь webhook
+            secret_token: Секретный токен для проверки запросов от Telegram
+            webhook_url: Публичный URL; если указан, webhook будет установлен в Telegram
+        """
+        self.bot = self.bot_factory()
+        self.start_workers()
+        monitor = asyncio.create_task(self._monitor())
+        
+        async def webhook_handler(request):
+            if secret_token and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != secret_token:
+                return web.Response(status=403)
+            await self.dispatch(await request.json())
+            return web.Response(status=200)
+        
+        app = web.Application()
+        app.router.add_post(path, webhook_handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"Supervisor webhook started on {host}:{port}{path} with {self.workers} workers")
+        if webhook_url:
+            await self.bot.set_webhook(webhook_url, secret_token)
+        
+        try:
+            while True:
+                await asyncio.sleep(3600)
+        finally:
+            monitor.cancel()
+            await runner.cleanup()
+            self.stop_workers()
+            await self.bot.stop()
+    
+    def run(self, mode: str = "polling", **kwargs):
+        """
+        Запустить supervisor (синхронный метод)
+        
+        Args:
+            mode: "polling" или "webhook"
+            **kwargs: Параметры start_webhook
+        """
+        try:
+            if mode == "webhook":
+                asyncio.run(self.start_webhook(**kwargs))
+            else:
+                asyncio.run(self.start_polling())
+        except KeyboardInterrupt:
+            logger.info("Stopping supervisor...")
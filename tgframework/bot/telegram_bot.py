@@ -5,12 +5,28 @@
 import asyncio
 import json
 import logging
-from typing import Any, Callable, Dict, List, Optional
+import os
+import shutil
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Union
 import aiohttp
 from aiohttp import web
 
-from ..application import CommandHandler, CallbackHandler, MessageHandler, StateMachine, MiddlewareManager
-from ..infrastructure import TelegramRateLimiter, parse_command
+from ..application import CommandHandler, CallbackHandler, InlineQueryHandler, MessageHandler, AlbumHandler
+from ..application import StateMachine, MiddlewareManager
+from ..infrastructure import TelegramRateLimiter, UpdateDeduplicator, UpdateJournal, JournalReplayer, parse_command
+from ..infrastructure import FileIdCache, TTLCache
+from .offset_store import OffsetStore
+from .transport import Transport, AiohttpTransport
+from .outbound import OutboundQueue
+from .edit_coalescer import EditCoalescer
+from .retry import RetryPolicy
+from .media import InputFile, file_id_from_message, is_stale_file_id_error
+from .media_group import MediaGroupAggregator, AlbumItem
+from .chat_members import ChatMemberCache
+from .scheduler import Scheduler
+from .executors import HandlerExecutors
+from ..core.exceptions import APIException, BadRequestError, NetworkError, HandlerTimeoutError, RetryAfterError
 
 # Настройка логирования
 logging.basicConfig(
@@ -19,29 +35,59 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Файл для send_photo / send_document: file_id или URL (str), InputFile, путь или bytes
+MediaSource = Union[str, InputFile, "os.PathLike[str]", bytes]
+
 
 class TelegramBot:
     """Основной класс бота для Telegram"""
     
-    def __init__(self, token: str, session=None):
+    def __init__(self, token: str, session=None, offset_store: Optional[OffsetStore] = None,
+                 api_base_url: str = "https://api.telegram.org", transport: Optional[Transport] = None,
+                 retry_policy: Optional[RetryPolicy] = None, file_base_url: Optional[str] = None):
         """
         Инициализация бота
         
         Args:
             token: Токен бота от @BotFather
             session: Сессия БД (опционально)
+            offset_store: Хранилище offset для polling (опционально)
+            api_base_url: Адрес Bot API (собственный Bot API сервер или FakeTelegramAPI)
+            transport: Транспорт запросов к API (по умолчанию AiohttpTransport)
+            retry_policy: Политика повторов запросов (по умолчанию RetryPolicy())
+            file_base_url: Адрес скачивания файлов (по умолчанию {api_base_url}/file/bot{token})
         """
         self.token = token
-        self.api_url = f"https://api.telegram.org/bot{token}"
+        self.api_base_url = api_base_url.rstrip("/")
+        self.api_url = f"{self.api_base_url}/bot{token}"
+        self.file_url = (file_base_url or f"{self.api_base_url}/file/bot{token}").rstrip("/")
         self.db_session = session
         self.state_machine = None
         self.middleware_manager = MiddlewareManager()
         self.rate_limiter = TelegramRateLimiter()
+        self.deduplicator: Optional[UpdateDeduplicator] = None
+        self.journal: Optional[UpdateJournal] = None
+        self.outbound: Optional[OutboundQueue] = None
+        self.edit_coalescer: Optional[EditCoalescer] = None
+        
+        # Загрузка файлов: кэш file_id по хэшу содержимого
+        self.file_cache: Optional[FileIdCache] = FileIdCache()
+        self.upload_timeout = 300.0
+        
+        # Скачивание файлов: общий лимит одновременных загрузок
+        self.download_chunk_size = 256 * 1024
+        self.download_timeout = 60.0
+        self.download_semaphore = asyncio.Semaphore(4)
+        self.download_stats: Dict[str, int] = {"files": 0, "bytes": 0, "resumed": 0, "retries": 0}
         
         # Обработчики
         self.command_handlers: Dict[str, CommandHandler] = {}
         self.callback_handlers: List[CallbackHandler] = []
         self.message_handlers: List[MessageHandler] = []
+        self.album_handlers: List[AlbumHandler] = []
+        self.inline_handlers: List[InlineQueryHandler] = []
+        # Страницы результатов inline query: (префикс, запрос, язык, [пользователь], offset) -> параметры ответа
+        self.inline_cache = TTLCache(maxsize=10000, ttl=300.0, negative_ttl=None)
         self.state_handlers: Dict[str, List[Callable]] = {}
         
         # Настройки polling
@@ -49,77 +95,235 @@ class TelegramBot:
         self.offset = 0
         self.timeout = 30
         self.limit = 100
+        # Накопившаяся очередь (пачка заполнила limit): следующий getUpdates без ожидания
+        self.backlog_limit = 100
+        self.backlog_timeout = 0
+        # Запрашивать следующую пачку, пока обрабатывается текущая. Выключено по умолчанию:
+        # запрос с новым offset подтверждает пачку Telegram до ее обработки, и после падения
+        # процесса она не будет доставлена снова (safe offset не поможет). Включайте вместе
+        # с журналом (set_journal), из которого пачку можно восстановить
+        self.prefetch_updates = False
+        
+        # Подтверждение offset: сохраняется только offset, до которого все update обработаны
+        self.offset_store = offset_store
+        self.offset_commit_interval = 1.0
+        self._unprocessed_ids: Set[int] = set()
+        self._committed_offset = 0
+        self._last_commit_at = 0.0
+        self._in_flight = 0
+        # Update, обработку которых middleware отложил (defer_update): id -> количество
+        self._deferred_ids: Dict[int, int] = {}
+        self._poll_request: Optional[asyncio.Task] = None
+        self._stopping = False
+        
+        # Типы update, запрашиваемые у Telegram помимо нужных обработчикам
+        self.extra_update_types: Set[str] = set()
         
         # Webhook настройки
         self.webhook_url: Optional[str] = None
+        self._webhook_secret_token: Optional[str] = None
+        self._webhook_allowed_updates: Optional[List[str]] = None
+        self._webhook_sync_task: Optional[asyncio.Task] = None
         self.webhook_path: Optional[str] = None
         self.webhook_server: Optional[web.Application] = None
+        self.webhook_stats: Dict[str, Any] = {}
+        self._webhook_draining = False
+        
+        # Кэш администраторов и участников чатов (Filters.IsAdmin, модерация)
+        self.chat_members = ChatMemberCache(self)
+        
+        # Отложенные и периодические задания (хранилище - set_job_store)
+        self.scheduler = Scheduler(self)
+        
+        # Выполнение обработчиков: таймаут по умолчанию (None - без таймаута)
+        # и пулы для обработчиков с offload="thread" / "process"
+        self.handler_timeout: Optional[float] = None
+        self.executors = HandlerExecutors()
+        self.handler_stats: Dict[str, int] = {"timeouts": 0, "detached": 0}
+        # Обработчики, продолжающие работу после таймаута (cancel_on_timeout=False)
+        self._detached_handlers: Set[asyncio.Task] = set()
+        
+        # Сборка альбомов для album_handlers (окно - media_groups.window)
+        self.media_groups = MediaGroupAggregator(self._handle_album)
         
         # Обработчики ошибок
         self.error_handlers: List[Callable] = []
         
-        # Сессия для HTTP запросов
-        self.session: Optional[aiohttp.ClientSession] = None
+        # Транспорт запросов к API
+        self.transport: Transport = transport or AiohttpTransport()
+        self.retry_policy = retry_policy or RetryPolicy()
+    
+    @property
+    def session(self) -> Optional[aiohttp.ClientSession]:
+        """HTTP сессия aiohttp (только для AiohttpTransport)"""
+        return getattr(self.transport, "session", None)
     
     def set_state_machine(self, state_machine: StateMachine):
         """Установить state machine"""
         self.state_machine = state_machine
     
-    async def _make_request(self, method: str, retries: int = 3, **params) -> Dict[str, Any]:
+    def allow_updates(self, *update_types: str):
+        """
+        Дополнительно запрашивать у Telegram указанные типы update
+        
+        Args:
+            *update_types: Типы update ("edited_message", "chat_member", ...)
+        """
+        self.extra_update_types.update(update_types)
+    
+    @property
+    def allowed_updates(self) -> List[str]:
+        """
+        Типы update, нужные зарегистрированным обработчикам и middleware
+        
+        Пустой список означает набор Telegram по умолчанию (все, кроме chat_member и т.п.).
+        """
+        types = self.extra_update_types | self.middleware_manager.update_types()
+        if self.command_handlers or self.message_handlers or self.state_handlers or self.album_handlers:
+            types.add("message")
+        if self.callback_handlers:
+            types.add("callback_query")
+        if self.inline_handlers:
+            types.add("inline_query")
+        if types and self.chat_members.active:
+            # Изменения прав приходят только если запросить их явно
+            types.update(ChatMemberCache.update_types)
+        return sorted(types)
+    
+    def set_offset_store(self, offset_store: OffsetStore):
+        """Установить хранилище offset"""
+        self.offset_store = offset_store
+    
+    def set_deduplicator(self, deduplicator: UpdateDeduplicator):
+        """Установить дедупликатор update (повторные update_id отбрасываются до middleware)"""
+        self.deduplicator = deduplicator
+    
+    def set_journal(self, journal: UpdateJournal):
+        """Записывать все входящие update (polling и webhook) в журнал"""
+        self.journal = journal
+    
+    async def replay_journal(self, directory: str, speed: Optional[float] = None,
+                             limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Воспроизвести журнал update через обработчики бота
+        
+        Args:
+            directory: Директория журнала
+            speed: None - максимально быстро, 1.0 - в записанном темпе, 10.0 - в 10 раз быстрее
+            limit: Максимальное количество update
+        
+        Returns:
+            Статистика воспроизведения
+        """
+        return await JournalReplayer(directory, self._process_update).replay(speed=speed, limit=limit)
+    
+    async def _make_request(self, method: str, retries: Optional[int] = None,
+                            files: Optional[Dict[str, InputFile]] = None, **params) -> Dict[str, Any]:
         """
         Выполнить запрос к API Telegram с обработкой ошибок и retry
         
+        Повторы определяет retry_policy: сетевые ошибки и 5xx повторяются с
+        экспоненциальной задержкой в пределах бюджета, 429 - через retry_after,
+        остальные ошибки API (400, 403, ...) не повторяются.
+        
         Args:
             method: Название метода API
-            retries: Количество попыток при ошибке
+            retries: Максимум попыток (по умолчанию retry_policy.max_attempts)
+            files: Файлы для загрузки (запрос отправляется как multipart/form-data)
             **params: Параметры запроса
             
         Returns:
-            Ответ от API
-        """
-        if not self.session:
-            self.session = aiohttp.ClientSession()
+            Ответ от API; None, если редактирование ничего не изменило ("message is not modified")
         
+        Raises:
+            APIException: Подкласс по типу ошибки (ForbiddenError, RetryAfterError, ...)
+        """
         url = f"{self.api_url}/{method}"
+        # Long polling держит соединение timeout секунд: запасаем время сверх него
+        timeout = 30
+        if method == "getUpdates":
+            timeout += params.get("timeout") or 0
+        if files:
+            timeout = self.upload_timeout
+            if not all(file.reusable for file in files.values()):
+                # Поток нельзя прочитать второй раз
+                retries = 1
+        policy = self.retry_policy
+        policy.before_request(method)
         
-        for attempt in range(retries):
+        attempt = 0
+        while True:
+            attempt += 1
             try:
-                async with self.session.post(url, json=params, timeout=aiohttp.ClientTimeout(total=30)) as response:
-                    result = await response.json()
-                    
-                    if not result.get("ok"):
-                        error_code = result.get("error_code", 0)
-                        description = result.get("description", "Unknown error")
-                        
-                        # Обработка rate limit
-                        if error_code == 429:
-                            retry_after = result.get("parameters", {}).get("retry_after", 1)
-                            logger.warning(f"Rate limit exceeded. Waiting {retry_after} seconds...")
-                            await asyncio.sleep(retry_after)
-                            continue
-                        
-                        # Обработка других ошибок
-                        error = Exception(f"API Error {error_code}: {description}")
-                        await self._handle_error(error, method=method, params=params)
-                        raise error
-                    
-                    return result.get("result")
-                    
-            except asyncio.TimeoutError:
-                if attempt < retries - 1:
-                    logger.warning(f"Timeout on attempt {attempt + 1}/{retries}. Retrying...")
-                    await asyncio.sleep(1)
-                    continue
+                if files:
+                    result = await self.transport.upload(method, url, params, files, timeout=timeout)
+                else:
+                    result = await self.transport.request(method, url, params, timeout=timeout)
+            except asyncio.CancelledError:
+                policy.record_cancelled(method)
                 raise
             except Exception as e:
-                if attempt < retries - 1:
-                    logger.warning(f"Error on attempt {attempt + 1}/{retries}: {e}. Retrying...")
-                    await asyncio.sleep(1)
-                    continue
-                await self._handle_error(e, method=method, params=params)
-                raise
+                error = NetworkError(f"{type(e).__name__}: {e}", method=method)
+                error.__cause__ = e
+            else:
+                if result.get("ok"):
+                    policy.record_success(method)
+                    return result.get("result")
+                
+                error = APIException.from_response(method, result)
+                
+                # Повторное редактирование тем же содержимым - не ошибка, повтор не нужен.
+                # Сообщения в ответе нет: None вместо результата (True вызывающий принял бы за Message)
+                if error.error_code == 400 and "message is not modified" in error.description:
+                    policy.record_success(method)
+                    logger.debug(f"{method}: message is not modified")
+                    return None
+            
+            policy.record_failure(method, error)
+            if isinstance(error, RetryAfterError) and self.outbound:
+                # Лимит общий для бота: ждет вся очередь исходящих, а не только этот запрос
+                self.outbound.pause(error.retry_after or 1)
+            delay = policy.retry_delay(method, error, attempt, retries)
+            if delay is None:
+                await self._handle_error(error, method=method, params=params)
+                raise error
+            
+            logger.warning(f"{method} failed on attempt {attempt} ({error}). Retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+    
+    async def _send(self, method: str, params: Dict[str, Any], lane: str = "interactive",
+                    chat_id: Optional[int] = None) -> Any:
+        """Выполнить исходящий запрос через очередь исходящих (если включена) или напрямую"""
+        if self.outbound:
+            return await self.outbound.submit(method, params, lane=lane, chat_id=chat_id)
+        return await self._make_request(method, **params)
+    
+    def enable_outbound_queue(self, **kwargs) -> OutboundQueue:
+        """
+        Включить очередь исходящих запросов с приоритетными полосами
+        
+        Args:
+            **kwargs: Параметры OutboundQueue (rate, weights, max_in_flight, ...)
         
-        raise Exception(f"Failed to execute {method} after {retries} attempts")
+        Returns:
+            Очередь (также доступна как bot.outbound)
+        """
+        self.outbound = OutboundQueue(self, **kwargs)
+        return self.outbound
+    
+    def enable_edit_coalescing(self, interval: float = 1.0, **kwargs) -> EditCoalescer:
+        """
+        Объединять частые edit_message_text одного сообщения
+        
+        Args:
+            interval: Минимальный интервал между редактированиями одного сообщения
+            **kwargs: Параметры EditCoalescer
+        
+        Returns:
+            EditCoalescer (также доступен как bot.edit_coalescer)
+        """
+        self.edit_coalescer = EditCoalescer(self, interval=interval, **kwargs)
+        return self.edit_coalescer
     
     async def _handle_error(self, error: Exception, **context):
         """Обработать ошибку через зарегистрированные обработчики"""
@@ -138,6 +342,7 @@ class TelegramBot:
                           parse_mode: Optional[str] = None,
                           reply_to_message_id: Optional[int] = None,
                           rate_limit: bool = True,
+                          lane: str = "interactive",
                           **kwargs) -> Dict[str, Any]:
         """
         Отправить сообщение с rate limiting
@@ -149,12 +354,13 @@ class TelegramBot:
             parse_mode: Режим парсинга (HTML, Markdown, MarkdownV2)
             reply_to_message_id: ID сообщения для ответа
             rate_limit: Применить rate limiting
+            lane: Полоса очереди исходящих ("interactive", "callback", "bulk"), если она включена
             **kwargs: Дополнительные параметры
             
         Returns:
             Отправленное сообщение
         """
-        if rate_limit:
+        if rate_limit and not self.outbound:
             user_id = kwargs.get("user_id") if isinstance(chat_id, int) and chat_id > 0 else None
             await self.rate_limiter.wait_message(user_id)
         
@@ -171,13 +377,35 @@ class TelegramBot:
         if reply_to_message_id:
             params["reply_to_message_id"] = reply_to_message_id
         
-        return await self._make_request("sendMessage", **params)
+        return await self._send("sendMessage", params, lane, chat_id)
     
     async def edit_message_text(self, chat_id: int, message_id: int, text: str,
                                 reply_markup: Optional[Dict] = None,
                                 parse_mode: Optional[str] = None,
-                                **kwargs) -> Dict[str, Any]:
-        """Редактировать текст сообщения"""
+                                lane: str = "interactive",
+                                coalesce: bool = True,
+                                **kwargs) -> Optional[Dict[str, Any]]:
+        """
+        Редактировать текст сообщения
+        
+        Если включено объединение редактирований (enable_edit_coalescing),
+        частые вызовы для одного сообщения объединяются, а редактирование
+        без изменений не отправляется.
+        
+        Args:
+            chat_id: ID чата
+            message_id: ID сообщения
+            text: Новый текст
+            reply_markup: Клавиатура
+            parse_mode: Режим парсинга
+            lane: Полоса очереди исходящих, если она включена
+            coalesce: Использовать объединение редактирований (если включено)
+            **kwargs: Дополнительные параметры
+        
+        Returns:
+            Отредактированное сообщение. Если редактирование ничего не изменило -
+            последнее известное объединителю сообщение или None
+        """
         params = {
             "chat_id": chat_id,
             "message_id": message_id,
@@ -190,7 +418,9 @@ class TelegramBot:
         if parse_mode:
             params["parse_mode"] = parse_mode
         
-        return await self._make_request("editMessageText", **params)
+        if coalesce and self.edit_coalescer:
+            return await self.edit_coalescer.edit(params, lane)
+        return await self._send("editMessageText", params, lane, chat_id)
     
     async def answer_callback_query(self, callback_query_id: str, 
                                     text: Optional[str] = None,
@@ -207,58 +437,471 @@ class TelegramBot:
         if show_alert:
             params["show_alert"] = show_alert
         
-        return await self._make_request("answerCallbackQuery", **params)
+        return await self._send("answerCallbackQuery", params, "callback")
+    
+    async def get_chat_member(self, chat_id: int, user_id: int) -> Dict[str, Any]:
+        """
+        Получить участника чата (без кэша, см. bot.chat_members)
+        
+        Args:
+            chat_id: ID чата
+            user_id: ID пользователя
+        
+        Returns:
+            ChatMember
+        """
+        return await self._make_request("getChatMember", chat_id=chat_id, user_id=user_id)
+    
+    async def get_chat_administrators(self, chat_id: int) -> List[Dict[str, Any]]:
+        """
+        Получить администраторов чата (без кэша, см. bot.chat_members)
+        
+        Args:
+            chat_id: ID чата
+        
+        Returns:
+            Список ChatMember
+        """
+        return await self._make_request("getChatAdministrators", chat_id=chat_id)
+    
+    async def answer_inline_query(self, inline_query_id: str, results: List[Dict[str, Any]],
+                                  cache_time: int = 300, is_personal: bool = False,
+                                  next_offset: Optional[str] = None, **kwargs) -> bool:
+        """
+        Ответить на inline query
+        
+        Args:
+            inline_query_id: ID inline query
+            results: Результаты (InlineQueryResult)
+            cache_time: Сколько секунд Telegram может кэшировать ответ
+            is_personal: Кэшировать ответ только для этого пользователя
+            next_offset: offset следующей страницы ("" - страниц больше нет)
+            **kwargs: Дополнительные параметры (button, ...)
+        
+        Returns:
+            True при успехе
+        """
+        params = {
+            "inline_query_id": inline_query_id,
+            "results": json.dumps(results, ensure_ascii=False),
+            "cache_time": cache_time,
+            **kwargs
+        }
+        if is_personal:
+            params["is_personal"] = is_personal
+        if next_offset is not None:
+            params["next_offset"] = next_offset
+        
+        return await self._send("answerInlineQuery", params, "callback")
     
     async def delete_message(self, chat_id: int, message_id: int) -> bool:
         """Удалить сообщение"""
-        return await self._make_request("deleteMessage", chat_id=chat_id, message_id=message_id)
+        if self.edit_coalescer:
+            self.edit_coalescer.forget(chat_id, message_id)
+        return await self._send("deleteMessage", {"chat_id": chat_id, "message_id": message_id}, "interactive", chat_id)
+    
+    async def send_photo(self, chat_id: int, photo: MediaSource,
+                         caption: Optional[str] = None,
+                         reply_markup: Optional[Dict] = None,
+                         parse_mode: Optional[str] = None,
+                         lane: str = "interactive",
+                         **kwargs) -> Dict[str, Any]:
+        """
+        Отправить фото
+        
+        Args:
+            chat_id: ID чата
+            photo: file_id, URL, InputFile, путь (pathlib.Path) или bytes
+            caption: Подпись
+            reply_markup: Клавиатура
+            parse_mode: Режим парсинга подписи
+            lane: Полоса очереди исходящих, если она включена
+            **kwargs: Дополнительные параметры
+        
+        Returns:
+            Отправленное сообщение
+        """
+        params = self._media_params(chat_id, caption, reply_markup, parse_mode, kwargs)
+        return await self._send_media("sendPhoto", "photo", params, photo, lane)
+    
+    async def send_document(self, chat_id: int, document: MediaSource,
+                            caption: Optional[str] = None,
+                            reply_markup: Optional[Dict] = None,
+                            parse_mode: Optional[str] = None,
+                            lane: str = "interactive",
+                            **kwargs) -> Dict[str, Any]:
+        """
+        Отправить документ
+        
+        Args:
+            chat_id: ID чата
+            document: file_id, URL, InputFile, путь (pathlib.Path) или bytes
+            caption: Подпись
+            reply_markup: Клавиатура
+            parse_mode: Режим парсинга подписи
+            lane: Полоса очереди исходящих, если она включена
+            **kwargs: Дополнительные параметры
+        
+        Returns:
+            Отправленное сообщение
+        """
+        params = self._media_params(chat_id, caption, reply_markup, parse_mode, kwargs)
+        return await self._send_media("sendDocument", "document", params, document, lane)
+    
+    async def send_media_group(self, chat_id: int, media: List[Dict[str, Any]],
+                               lane: str = "interactive", **kwargs) -> List[Dict[str, Any]]:
+        """
+        Отправить альбом
+        
+        Args:
+            chat_id: ID чата
+            media: Элементы InputMedia: {"type": "photo", "media": InputFile(...), "caption": ...};
+                   media может быть file_id, URL, InputFile, путем или bytes
+            lane: Полоса очереди исходящих, если она включена
+            **kwargs: Дополнительные параметры
+        
+        Returns:
+            Список отправленных сообщений
+        """
+        items = [dict(item, media=self._input_file(item["media"])) for item in media]
+        digests: List[Optional[str]] = []
+        for item in items:
+            file = item["media"]
+            digests.append(await file.digest() if isinstance(file, InputFile) and self.file_cache else None)
+        
+        use_cache = True
+        while True:
+            files: Dict[str, InputFile] = {}
+            cached = []
+            payload = []
+            for i, (item, digest) in enumerate(zip(items, digests)):
+                file = item["media"]
+                if isinstance(file, InputFile):
+                    file_id = self.file_cache.get(digest, item["type"]) if use_cache and digest else None
+                    if file_id:
+                        cached.append(i)
+                        item = dict(item, media=file_id)
+                    else:
+                        files[f"file{i}"] = file
+                        item = dict(item, media=f"attach://file{i}")
+                payload.append(item)
+            
+            params = {"chat_id": chat_id, "media": payload, **kwargs}
+            if files:
+                params["files"] = files
+            try:
+                messages = await self._send("sendMediaGroup", params, lane, chat_id)
+                break
+            except BadRequestError as e:
+                if not cached or not is_stale_file_id_error(e.description):
+                    raise
+                # Сохраненный file_id больше не действителен: загружаем файлы заново
+                for i in cached:
+                    self.file_cache.discard(digests[i], items[i]["type"])
+                use_cache = False
+        
+        for i, item in enumerate(items):
+            file = item["media"]
+            if isinstance(file, InputFile) and self.file_cache and i < len(messages):
+                digest = digests[i] or file.stream_digest
+                file_id = file_id_from_message(messages[i], item["type"])
+                if digest and file_id:
+                    self.file_cache.set(digest, item["type"], file_id)
+        return messages
+    
+    @staticmethod
+    def _media_params(chat_id: int, caption: Optional[str], reply_markup: Optional[Dict],
+                      parse_mode: Optional[str], extra: Dict[str, Any]) -> Dict[str, Any]:
+        params = {"chat_id": chat_id, **extra}
+        if caption:
+            params["caption"] = caption
+        if reply_markup:
+            params["reply_markup"] = json.dumps(reply_markup)
+        if parse_mode:
+            params["parse_mode"] = parse_mode
+        return params
+    
+    @staticmethod
+    def _input_file(media: MediaSource) -> Union[str, InputFile]:
+        """Строка - file_id или URL, путь и bytes загружаются как файл"""
+        if isinstance(media, (bytes, bytearray, os.PathLike)):
+            return InputFile(media)
+        return media
+    
+    async def _send_media(self, method: str, kind: str, params: Dict[str, Any],
+                          media: MediaSource, lane: str) -> Dict[str, Any]:
+        """
+        Отправить файл: по file_id из кэша, если этот файл уже загружался, иначе загрузить
+        
+        Args:
+            method: Метод API (sendPhoto, sendDocument, ...)
+            kind: Поле файла и тип медиа (photo, document, ...)
+            params: Остальные параметры
+            media: Файл
+            lane: Полоса очереди исходящих
+        
+        Returns:
+            Отправленное сообщение
+        """
+        chat_id = params["chat_id"]
+        media = self._input_file(media)
+        if not isinstance(media, InputFile):
+            return await self._send(method, {**params, kind: media}, lane, chat_id)
+        
+        digest = await media.digest() if self.file_cache else None
+        if digest:
+            file_id = self.file_cache.get(digest, kind)
+            if file_id:
+                try:
+                    return await self._send(method, {**params, kind: file_id}, lane, chat_id)
+                except BadRequestError as e:
+                    # Остальные 400 (чат не найден, неверные параметры) повторная загрузка не исправит
+                    if not is_stale_file_id_error(e.description):
+                        raise
+                    # Сохраненный file_id больше не действителен: загружаем файл заново
+                    self.file_cache.discard(digest, kind)
+        
+        message = await self._send(method, {**params, "files": {kind: media}}, lane, chat_id)
+        digest = digest or media.stream_digest
+        file_id = file_id_from_message(message, kind)
+        if self.file_cache and digest and file_id:
+            self.file_cache.set(digest, kind, file_id)
+        return message
+    
+    def set_file_cache(self, cache: Optional[FileIdCache]):
+        """
+        Установить кэш file_id загруженных файлов
+        
+        Args:
+            cache: FileIdCache / SQLiteFileIdCache или None, чтобы отключить кэш
+        """
+        self.file_cache = cache
+    
+    def set_job_store(self, store):
+        """
+        Установить хранилище заданий планировщика (до запуска бота)
+        
+        Args:
+            store: ScheduledJobRepository или None - задания только в памяти
+        """
+        self.scheduler.set_store(store)
+    
+    async def get_file(self, file_id: str) -> Dict[str, Any]:
+        """
+        Получить информацию о файле для скачивания (getFile)
+        
+        Args:
+            file_id: ID файла
+        
+        Returns:
+            Объект File (file_id, file_size, file_path)
+        """
+        return await self._make_request("getFile", file_id=file_id)
+    
+    async def download_file(self, file: Union[str, Dict[str, Any]], dest: Union[str, "os.PathLike[str]"],
+                            chunk_size: Optional[int] = None, resume: bool = True) -> str:
+        """
+        Скачать файл на диск
+        
+        Файл пишется потоком во временный файл dest.part и переименовывается
+        в dest после скачивания; запись на диск выполняется в пуле потоков.
+        Число одновременных скачиваний ограничено download_semaphore. При
+        обрыве скачивание продолжается с места остановки (HTTP Range), в том
+        числе после перезапуска, если осталась dest.part.
+        
+        Args:
+            file: file_id, объект File (результат get_file) или объект медиа с file_id
+            dest: Путь к файлу или существующая директория (имя берется из file_path)
+            chunk_size: Размер записываемых на диск блоков (по умолчанию download_chunk_size)
+            resume: Продолжать скачивание из существующего dest.part
+        
+        Returns:
+            Путь к скачанному файлу
+        
+        Usage:
+            photo = update["message"]["photo"][-1]
+            path = await bot.download_file(photo, "downloads/")
+        """
+        chunk_size = chunk_size or self.download_chunk_size
+        async with self.download_semaphore:
+            info = file if isinstance(file, dict) and file.get("file_path") else await self.get_file(
+                file if isinstance(file, str) else file["file_id"]
+            )
+            file_path = info["file_path"]
+            
+            dest = os.fspath(dest)
+            if os.path.isdir(dest):
+                dest = os.path.join(dest, os.path.basename(file_path))
+            
+            loop = asyncio.get_running_loop()
+            if os.path.isabs(file_path) and os.path.exists(file_path):
+                # Локальный Bot API сервер (--local) отдает путь к файлу на своем диске
+                await loop.run_in_executor(None, shutil.copyfile, file_path, dest)
+            else:
+                await self._download_to(f"{self.file_url}/{file_path}", dest, info.get("file_size"),
+                                        chunk_size, resume)
+            
+            self.download_stats["files"] += 1
+            return dest
+    
+    async def _download_to(self, url: str, dest: str, size: Optional[int], chunk_size: int, resume: bool):
+        """Скачать URL в dest через dest.part с докачкой при обрыве"""
+        loop = asyncio.get_running_loop()
+        part = dest + ".part"
+        if resume and os.path.exists(part):
+            self.download_stats["resumed"] += 1
+        else:
+            open(part, "wb").close()
+        
+        attempt = 0
+        while True:
+            attempt += 1
+            offset = os.path.getsize(part)
+            try:
+                with open(part, "ab") as f:
+                    buffer = bytearray()
+                    async for chunk in self.transport.download(url, offset, timeout=self.download_timeout):
+                        buffer += chunk
+                        if len(buffer) >= chunk_size:
+                            await loop.run_in_executor(None, f.write, bytes(buffer))
+                            self.download_stats["bytes"] += len(buffer)
+                            buffer.clear()
+                    if buffer:
+                        await loop.run_in_executor(None, f.write, bytes(buffer))
+                        self.download_stats["bytes"] += len(buffer)
+                
+                if size and os.path.getsize(part) < size:
+                    raise NetworkError(f"Download interrupted at {os.path.getsize(part)} of {size} bytes")
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError, NetworkError) as e:
+                if attempt >= self.retry_policy.max_attempts:
+                    raise
+                delay = self.retry_policy.backoff(attempt)
+                self.download_stats["retries"] += 1
+                logger.warning(f"Download of {dest} failed ({e}). Resuming in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+        
+        os.replace(part, dest)
     
-    async def get_updates(self) -> List[Dict[str, Any]]:
-        """Получить обновления от Telegram"""
+    async def get_updates(self, timeout: Optional[int] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Получить обновления от Telegram
+        
+        Args:
+            timeout: Таймаут long polling (по умолчанию self.timeout)
+            limit: Максимум update в ответе (по умолчанию self.limit)
+        """
         params = {
             "offset": self.offset,
-            "timeout": self.timeout,
-            "limit": self.limit
+            "timeout": self.timeout if timeout is None else timeout,
+            "limit": limit or self.limit,
+            "allowed_updates": self.allowed_updates
         }
         
         updates = await self._make_request("getUpdates", **params)
         return updates or []
     
-    def register_command(self, command: str = None, handler: Callable = None, description: Optional[str] = None):
-        """Зарегистрировать обработчик команды"""
+    def register_command(self, command: str = None, handler: Callable = None, description: Optional[str] = None,
+                         timeout: Optional[float] = None, offload: Optional[str] = None,
+                         cancel_on_timeout: bool = True):
+        """
+        Зарегистрировать обработчик команды
+        
+        Args:
+            command: Название команды (без /)
+            handler: Функция-обработчик (или используйте как декоратор)
+            description: Описание команды
+            timeout: Сколько секунд ждать обработчик (None - bot.handler_timeout)
+            offload: "thread" или "process" - синхронный обработчик выполняется в bot.executors
+            cancel_on_timeout: Отменять обработчик по таймауту (False - дать завершиться в фоне)
+        
+        Usage:
+            @bot.register_command("report", offload="process", timeout=30)
+            def build_report(update, context):  # функция уровня модуля
+                return render_report(context["args"])  # строка отправляется в чат
+        """
+        options = {"timeout": timeout, "offload": offload, "cancel_on_timeout": cancel_on_timeout}
         if handler is None:
             def decorator(func: Callable):
-                self.command_handlers[command.lower()] = CommandHandler(command, func, description)
+                self.command_handlers[command.lower()] = CommandHandler(command, func, description, **options)
                 return func
             return decorator
         else:
-            self.command_handlers[command.lower()] = CommandHandler(command, handler, description)
+            self.command_handlers[command.lower()] = CommandHandler(command, handler, description, **options)
     
-    def register_callback(self, pattern: str = None, handler: Callable = None):
-        """Зарегистрировать обработчик callback"""
+    def register_callback(self, pattern: str = None, handler: Callable = None, timeout: Optional[float] = None,
+                          offload: Optional[str] = None, cancel_on_timeout: bool = True):
+        """
+        Зарегистрировать обработчик callback
+        
+        Args:
+            pattern: Паттерн для callback_data
+            handler: Функция-обработчик (или используйте как декоратор)
+            timeout, offload, cancel_on_timeout: Параметры выполнения (см. register_command)
+        """
+        options = {"timeout": timeout, "offload": offload, "cancel_on_timeout": cancel_on_timeout}
         if handler is None:
             def decorator(func: Callable):
-                self.callback_handlers.append(CallbackHandler(pattern, func))
+                self.callback_handlers.append(CallbackHandler(pattern, func, **options))
                 return func
             return decorator
         else:
-            self.callback_handlers.append(CallbackHandler(pattern, handler))
+            self.callback_handlers.append(CallbackHandler(pattern, handler, **options))
+    
+    def register_inline_handler(self, pattern: str = "", handler: Callable = None, page_size: int = 50,
+                                cache_ttl: float = 300.0, cache_time: int = 300, is_personal: bool = False):
+        """
+        Зарегистрировать обработчик inline query
+        
+        Если обработчик возвращает список результатов, бот сам отвечает на запрос
+        страницей с next_offset и кэширует ее по (запрос, язык пользователя, offset):
+        повторный запрос отдается из кэша без вызова обработчика. Обработчик
+        получает в context["offset"] и context["limit"] границы страницы и должен
+        вычислить только ее.
+        
+        Args:
+            pattern: Префикс текста запроса ("" - любой запрос)
+            handler: Функция-обработчик (или используйте как декоратор)
+            page_size: Результатов на странице (не больше 50)
+            cache_ttl: Время жизни страницы в кэше бота (0 - не кэшировать)
+            cache_time: cache_time ответа для Telegram
+            is_personal: Результаты зависят от пользователя
+        
+        Usage:
+            @bot.register_inline_handler("")
+            async def search(update, context):
+                rows = await products.search(context["query"], offset=context["offset"], limit=context["limit"])
+                return [{"type": "article", "id": str(row.id), "title": row.name,
+                         "input_message_content": {"message_text": row.name}} for row in rows]
+        """
+        def add(func: Callable):
+            self.inline_handlers.append(InlineQueryHandler(pattern, func, page_size, cache_ttl, cache_time, is_personal))
+            return func
+        
+        if handler is None:
+            return add
+        add(handler)
     
-    def register_message_handler(self, handler: Callable = None, filters=None):
-        """Зарегистрировать обработчик сообщений"""
+    def register_message_handler(self, handler: Callable = None, filters=None, timeout: Optional[float] = None,
+                                 offload: Optional[str] = None, cancel_on_timeout: bool = True):
+        """
+        Зарегистрировать обработчик сообщений
+        
+        Args:
+            handler: Функция-обработчик (или используйте как декоратор)
+            filters: Фильтр сообщений
+            timeout, offload, cancel_on_timeout: Параметры выполнения (см. register_command)
+        """
+        options = {"timeout": timeout, "offload": offload, "cancel_on_timeout": cancel_on_timeout}
         if handler is None and filters is None:
             def decorator(func: Callable):
-                self.message_handlers.append(MessageHandler(func, None))
+                self.message_handlers.append(MessageHandler(func, None, **options))
                 return func
             return decorator
         
         if handler is None and filters is not None:
             def decorator(func: Callable):
-                if hasattr(filters, 'check'):
-                    filter_func = filters.check
-                else:
-                    filter_func = filters
-                self.message_handlers.append(MessageHandler(func, filter_func))
+                self.message_handlers.append(MessageHandler(func, filters, **options))
                 return func
             return decorator
         
@@ -270,39 +913,143 @@ class TelegramBot:
                 
                 if len(params) == 1:
                     def decorator(func: Callable):
-                        if hasattr(handler, 'check'):
-                            filter_func = handler.check
-                        else:
-                            filter_func = handler
-                        self.message_handlers.append(MessageHandler(func, filter_func))
+                        self.message_handlers.append(MessageHandler(func, handler, **options))
                         return func
                     return decorator
             except (ValueError, TypeError):
                 pass
         
         if handler is not None and callable(handler):
-            if hasattr(filters, 'check'):
-                filter_func = filters.check
-            else:
-                filter_func = filters
-            self.message_handlers.append(MessageHandler(handler, filter_func))
+            self.message_handlers.append(MessageHandler(handler, filters, **options))
             return
         
         raise TypeError("register_message_handler: incorrect usage")
     
+    def register_album_handler(self, handler: Callable = None, filters=None, timeout: Optional[float] = None,
+                               offload: Optional[str] = None, cancel_on_timeout: bool = True):
+        """
+        Зарегистрировать обработчик альбомов (media group)
+        
+        Обработчик вызывается один раз на альбом с первым update альбома;
+        context["album"] - все сообщения альбома по порядку, context["updates"] - их update.
+        Альбомы, не подошедшие ни одному фильтру, обрабатываются как обычные сообщения.
+        
+        Args:
+            handler: Функция-обработчик (или используйте как декоратор)
+            filters: Фильтр по первому сообщению альбома
+            timeout, offload, cancel_on_timeout: Параметры выполнения (см. register_command)
+        
+        Usage:
+            @bot.register_album_handler(filters=Filters.Photo())
+            async def on_album(update, context):
+                await save_photos(context["album"])
+                await bot.send_message(context["chat"]["id"], f"Получено фото: {len(context['album'])}")
+        """
+        options = {"timeout": timeout, "offload": offload, "cancel_on_timeout": cancel_on_timeout}
+        if handler is None:
+            def decorator(func: Callable):
+                self.album_handlers.append(AlbumHandler(func, filters, **options))
+                return func
+            return decorator
+        self.album_handlers.append(AlbumHandler(handler, filters, **options))
+    
+    async def feed_update(self, update: Dict[str, Any]):
+        """
+        Обработать update напрямую, минуя polling и webhook (тесты, бенчмарки)
+        
+        Args:
+            update: Update от Telegram
+        """
+        await self._process_update(update)
+    
     async def _process_update(self, update: Dict[str, Any]):
         """Обработать одно обновление"""
+        self._in_flight += 1
+        try:
+            await self._dispatch_update(update)
+        finally:
+            self._in_flight -= 1
+    
+    async def _dispatch_update(self, update: Dict[str, Any]):
+        """Отбросить повторный update, остальные передать в _dispatch_new_update"""
+        update_id = update.get("update_id")
+        if not self.deduplicator or update_id is None:
+            await self._dispatch_new_update(update)
+            return
+        
+        if self.deduplicator.is_duplicate(update_id):
+            logger.debug(f"Skipping duplicate update {update_id}")
+            return
+        
+        # Обработанным update отмечается только после обработки: если процесс упадет
+        # раньше, повторно доставленный update не будет отброшен как дубликат.
+        # Ошибка обработчика тоже завершает update: его побочные эффекты (отправленные
+        # сообщения, списания) уже могли произойти, повтор выполнил бы их дважды
+        try:
+            await self._dispatch_new_update(update)
+        finally:
+            if update_id not in self._deferred_ids:
+                self.deduplicator.complete(update_id)
+    
+    async def _dispatch_new_update(self, update: Dict[str, Any]):
+        """Передать update через middleware в подходящий обработчик"""
         context = {
             "bot": self,
             "db_session": self.db_session,
             "state_machine": self.state_machine,
         }
         
+        if "chat_member" in update or "my_chat_member" in update:
+            self.chat_members.handle_update(update)
+        
         # Обработка через middleware
         should_continue = await self.middleware_manager.process(update, context)
         if not should_continue:
             return
         
+        await self._route_update(update, context)
+    
+    def defer_update(self, update: Dict[str, Any], context: Dict[str, Any], delay: float, after):
+        """
+        Продолжить обработку update через delay секунд, не задерживая остальные update
+        
+        Обработка продолжается с middleware, следующего за after, с тем же context.
+        Пока update ждет, safe_offset его не подтверждает, а stop() ждет его
+        завершения (в пределах drain_timeout).
+        
+        Args:
+            update: Update от Telegram
+            context: Контекст обработки
+            delay: Задержка в секундах
+            after: Middleware, отложивший update
+        """
+        update_id = update.get("update_id")
+        if update_id is not None:
+            self._deferred_ids[update_id] = self._deferred_ids.get(update_id, 0) + 1
+        self._in_flight += 1
+        asyncio.get_running_loop().create_task(self._resume_update(update, context, delay, after))
+    
+    async def _resume_update(self, update: Dict[str, Any], context: Dict[str, Any], delay: float, after):
+        """Продолжить обработку отложенного update"""
+        try:
+            await asyncio.sleep(delay)
+            if await self.middleware_manager.process(update, context, after=after):
+                await self._route_update(update, context)
+        except Exception as e:
+            logger.error(f"Error processing deferred update: {e}", exc_info=True)
+            await self._handle_error(e, update=update)
+        finally:
+            self._in_flight -= 1
+            update_id = update.get("update_id")
+            if update_id is not None:
+                count = self._deferred_ids.pop(update_id, 1) - 1
+                if count:
+                    self._deferred_ids[update_id] = count
+                elif self.deduplicator:
+                    self.deduplicator.complete(update_id)
+    
+    async def _route_update(self, update: Dict[str, Any], context: Dict[str, Any]):
+        """Передать update, прошедший middleware, подходящему обработчику"""
         # Обработка callback query
         if "callback_query" in update:
             await self._handle_callback(update, context)
@@ -312,6 +1059,11 @@ class TelegramBot:
         if "message" in update:
             await self._handle_message(update, context)
             return
+        
+        # Обработка inline query
+        if "inline_query" in update:
+            await self._handle_inline_query(update, context)
+            return
     
     async def _handle_callback(self, update: Dict[str, Any], context: Dict[str, Any]):
         """Обработать callback query"""
@@ -323,9 +1075,52 @@ class TelegramBot:
         
         for handler in self.callback_handlers:
             if handler.matches(callback_data):
-                await handler.handle(update, context)
+                await self._run_handler(handler, update, context)
                 return
     
+    async def _handle_inline_query(self, update: Dict[str, Any], context: Dict[str, Any]):
+        """Обработать inline query: страница из кэша или от обработчика"""
+        inline_query = update["inline_query"]
+        query = inline_query.get("query", "")
+        user = inline_query.get("from") or {}
+        
+        handler = next((h for h in self.inline_handlers if h.matches(query)), None)
+        if handler is None:
+            return
+        
+        try:
+            offset = int(inline_query.get("offset") or 0)
+        except ValueError:
+            offset = 0
+        
+        key = (handler.pattern, query, user.get("language_code"),
+               user.get("id") if handler.is_personal else None, offset)
+        answer = self.inline_cache.get(key)
+        if answer is None:
+            context["inline_query"] = inline_query
+            context["query"] = query
+            context["user"] = user
+            context["offset"] = offset
+            context["limit"] = handler.page_size
+            
+            results = await handler.handle(update, context)
+            if results is None:
+                # Обработчик ответил сам
+                return
+            
+            results = list(results)[:handler.page_size]
+            answer = {
+                # Сериализуем один раз: из кэша ответ уходит без повторного json.dumps
+                "results": json.dumps(results, ensure_ascii=False),
+                "cache_time": handler.cache_time,
+                "is_personal": handler.is_personal,
+                "next_offset": str(offset + len(results)) if len(results) == handler.page_size else "",
+            }
+            if handler.cache_ttl > 0:
+                self.inline_cache.set(key, answer, ttl=handler.cache_ttl)
+        
+        await self._send("answerInlineQuery", {"inline_query_id": inline_query["id"], **answer}, "callback")
+    
     async def _handle_message(self, update: Dict[str, Any], context: Dict[str, Any]):
         """Обработать сообщение"""
         message = update["message"]
@@ -338,6 +1133,11 @@ class TelegramBot:
         context["message"] = message
         context["text"] = text
         
+        # Элемент альбома: откладываем до получения всего альбома
+        if message.get("media_group_id") and self.album_handlers and not context.get("album_fallback"):
+            self.media_groups.add(update, context)
+            return
+        
         # Обработка команды
         if text and text.startswith("/"):
             command, args = parse_command(text)
@@ -345,7 +1145,7 @@ class TelegramBot:
             context["args"] = args
             
             if command in self.command_handlers:
-                await self.command_handlers[command].handle(update, context)
+                await self._run_handler(self.command_handlers[command], update, context)
                 return
         
         # Обработка FSM состояний
@@ -365,33 +1165,213 @@ class TelegramBot:
         
         # Обработка обычного сообщения
         for handler in self.message_handlers:
-            if handler.should_handle(update):
-                await handler.handle(update, context)
+            if await handler.should_handle_async(update, context) if handler.is_async else handler.should_handle(update):
+                await self._run_handler(handler, update, context)
+                return
+    
+    async def _run_handler(self, handler, update: Dict[str, Any], context: Dict[str, Any]):
+        """
+        Вызвать обработчик с таймаутом
+        
+        По таймауту обработчик отменяется (или, при cancel_on_timeout=False,
+        продолжает работу в фоне), а обработчики ошибок получают
+        HandlerTimeoutError. Update при этом считается обработанным: повторная
+        доставка зависшего update ничего бы не исправила.
+        """
+        timeout = handler.timeout or self.handler_timeout
+        if timeout is None:
+            await handler.handle(update, context)
+            return
+        
+        if handler.cancel_on_timeout:
+            try:
+                await asyncio.wait_for(handler.handle(update, context), timeout)
                 return
+            except asyncio.TimeoutError:
+                pass
+        else:
+            task = asyncio.ensure_future(handler.handle(update, context))
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout)
+                return
+            except asyncio.TimeoutError:
+                self._detach_handler(task)
+            except asyncio.CancelledError:
+                self._detach_handler(task)
+                raise
+        
+        self.handler_stats["timeouts"] += 1
+        logger.warning(f"Handler {handler.name} timed out after {timeout}s")
+        await self._handle_error(HandlerTimeoutError(handler.name, timeout), update=update)
+    
+    def _detach_handler(self, task: asyncio.Task):
+        """Оставить обработчик работать в фоне; stop() дождется его завершения"""
+        if task.done():
+            return
+        self.handler_stats["detached"] += 1
+        self._detached_handlers.add(task)
+        task.add_done_callback(self._detached_handler_done)
+    
+    def _detached_handler_done(self, task: asyncio.Task):
+        self._detached_handlers.discard(task)
+        if task.cancelled() or task.exception() is None:
+            return
+        error = task.exception()
+        logger.error(f"Error in detached handler: {error}", exc_info=error)
+        if self.error_handlers:
+            future = asyncio.ensure_future(self._handle_error(error))
+            self._detached_handlers.add(future)
+            future.add_done_callback(self._detached_handlers.discard)
+    
+    async def _handle_album(self, items: List[AlbumItem]):
+        """Обработать собранный альбом"""
+        self._in_flight += 1
+        try:
+            update, context = items[0]
+            for handler in self.album_handlers:
+                if await handler.should_handle_async(update, context):
+                    context["album"] = [item_update["message"] for item_update, _ in items]
+                    context["updates"] = [item_update for item_update, _ in items]
+                    context["media_group_id"] = update["message"]["media_group_id"]
+                    await self._run_handler(handler, update, context)
+                    return
+            
+            # Ни один обработчик альбомов не подошел: обрабатываем сообщения по отдельности
+            for item_update, item_context in items:
+                item_context["album_fallback"] = True
+                await self._handle_message(item_update, item_context)
+        except Exception as e:
+            await self._handle_error(e, update=items[0][0])
+            raise
+        finally:
+            self._in_flight -= 1
+    
+    @property
+    def safe_offset(self) -> int:
+        """Offset, до которого все полученные update обработаны"""
+        pending = list(self._unprocessed_ids)
+        pending.extend(self._deferred_ids)
+        album_pending = self.media_groups.oldest_update_id()
+        if album_pending is not None:
+            pending.append(album_pending)
+        if pending:
+            return min(pending)
+        return self.offset
+    
+    def _commit_offset(self, force: bool = False):
+        """Сохранить safe_offset в offset_store (не чаще offset_commit_interval)"""
+        if not self.offset_store:
+            return
+        
+        offset = self.safe_offset
+        if offset <= self._committed_offset:
+            return
+        
+        now = time.monotonic()
+        if not force and now - self._last_commit_at < self.offset_commit_interval:
+            return
+        
+        try:
+            self.offset_store.save(offset)
+        except Exception as e:
+            logger.error(f"Error saving update offset: {e}", exc_info=True)
+            return
+        self._committed_offset = offset
+        self._last_commit_at = now
+    
+    def _request_updates(self, backlog: bool) -> asyncio.Task:
+        """
+        Запустить getUpdates в фоне
+        
+        При накопившейся очереди (предыдущая пачка заполнила limit) запрашивается
+        пачка backlog_limit с таймаутом backlog_timeout, иначе - обычный long polling.
+        """
+        if backlog:
+            request = self.get_updates(timeout=self.backlog_timeout, limit=self.backlog_limit)
+        else:
+            request = self.get_updates()
+        self._poll_request = asyncio.ensure_future(request)
+        return self._poll_request
     
     async def _polling_loop(self):
         """Основной цикл polling"""
-        while self.running:
-            try:
-                updates = await self.get_updates()
-                
-                for update in updates:
-                    update_id = update.get("update_id")
-                    if update_id:
-                        self.offset = update_id + 1
+        backlog = False
+        request: Optional[asyncio.Task] = None
+        
+        try:
+            while self.running:
+                try:
+                    if request is None:
+                        request = self._request_updates(backlog)
+                    try:
+                        updates = await request
+                    finally:
+                        request = None
+                        self._poll_request = None
+                    
+                    for update in updates:
+                        if self.journal:
+                            self.journal.append(update)
+                        update_id = update.get("update_id")
+                        if update_id:
+                            self._unprocessed_ids.add(update_id)
+                            self.offset = max(self.offset, update_id + 1)
+                    
+                    backlog = len(updates) >= (self.backlog_limit if backlog else self.limit)
+                    if self.prefetch_updates and updates and self.running:
+                        # Следующий запрос уже несет новый offset и подтверждает эту пачку
+                        request = self._request_updates(backlog)
                     
-                    await self._process_update(update)
+                    for update in updates:
+                        if not self.running:
+                            # Необработанные update останутся за safe_offset и придут снова
+                            break
+                        
+                        try:
+                            await self._process_update(update)
+                        except Exception as e:
+                            logger.error(f"Error processing update: {e}", exc_info=True)
+                            await self._handle_error(e, update=update)
+                        finally:
+                            self._unprocessed_ids.discard(update.get("update_id"))
+                        self._commit_offset()
+                    
+                    self._commit_offset(force=True)
                 
-            except KeyboardInterrupt:
-                raise
-            except Exception as e:
-                logger.error(f"Error in polling loop: {e}", exc_info=True)
-                await self._handle_error(e)
-                await asyncio.sleep(5)
+                except KeyboardInterrupt:
+                    raise
+                except asyncio.CancelledError:
+                    if self.running:
+                        raise
+                    break
+                except Exception as e:
+                    logger.error(f"Error in polling loop: {e}", exc_info=True)
+                    await self._handle_error(e)
+                    await asyncio.sleep(5)
+        finally:
+            if request is not None:
+                request.cancel()
     
     async def start_polling(self):
-        """Запустить polling"""
+        """
+        Запустить polling
+        
+        При накопившейся очереди getUpdates вызывается без ожидания (backlog_limit,
+        backlog_timeout). Конвейерный режим (prefetch_updates) включается явно:
+        он подтверждает пачку до обработки, см. комментарий в __init__.
+        """
         self.running = True
+        self._stopping = False
+        
+        if self.offset_store:
+            stored = self.offset_store.load()
+            if stored:
+                self.offset = stored
+                self._committed_offset = stored
+                logger.info(f"Resuming polling from offset {stored}")
+        self._unprocessed_ids.clear()
+        self.scheduler.start()
+        
         logger.info("Bot started in polling mode")
         
         try:
@@ -401,17 +1381,46 @@ class TelegramBot:
         finally:
             await self.stop()
     
-    async def set_webhook(self, url: str, secret_token: Optional[str] = None):
-        """Установить webhook"""
-        params = {"url": url}
+    async def set_webhook(self, url: str, secret_token: Optional[str] = None,
+                          allowed_updates: Optional[List[str]] = None):
+        """
+        Установить webhook
+        
+        Args:
+            url: Публичный URL webhook
+            secret_token: Секретный токен для проверки запросов от Telegram
+            allowed_updates: Типы update (по умолчанию self.allowed_updates)
+        """
+        if allowed_updates is None:
+            allowed_updates = self.allowed_updates
+        params = {"url": url, "allowed_updates": allowed_updates}
         if secret_token:
             params["secret_token"] = secret_token
         
         result = await self._make_request("setWebhook", **params)
         self.webhook_url = url
+        self._webhook_secret_token = secret_token
+        self._webhook_allowed_updates = allowed_updates
         logger.info(f"Webhook set: {url}")
         return result
     
+    async def sync_allowed_updates(self):
+        """Обновить allowed_updates установленного webhook, если набор обработчиков изменился"""
+        if not self.webhook_url:
+            return
+        
+        allowed_updates = self.allowed_updates
+        if allowed_updates != self._webhook_allowed_updates:
+            logger.info(f"Updating webhook allowed_updates: {allowed_updates}")
+            await self.set_webhook(self.webhook_url, self._webhook_secret_token, allowed_updates)
+    
+    def _schedule_allowed_updates_sync(self):
+        """Запустить sync_allowed_updates в фоне, если набор типов изменился"""
+        if not self.webhook_url or (self._webhook_sync_task and not self._webhook_sync_task.done()):
+            return
+        if self.allowed_updates != self._webhook_allowed_updates:
+            self._webhook_sync_task = asyncio.ensure_future(self.sync_allowed_updates())
+    
     async def delete_webhook(self, drop_pending_updates: bool = False):
         """Удалить webhook"""
         params = {}
@@ -423,11 +1432,21 @@ class TelegramBot:
         logger.info("Webhook deleted")
         return result
     
-    async def start_webhook(self, host: str = "0.0.0.0", port: int = 8080,
-                           path: str = "/webhook", secret_token: Optional[str] = None):
-        """Запустить webhook сервер"""
+    def _build_webhook_app(self, path: str = "/webhook", secret_token: Optional[str] = None) -> web.Application:
+        """
+        Создать aiohttp приложение webhook с эндпоинтами /healthz и /metrics
+        
+        Args:
+            path: Путь webhook
+            secret_token: Секретный токен для проверки запросов от Telegram
+        
+        Returns:
+            Приложение aiohttp
+        """
         app = web.Application()
         self.webhook_path = path
+        self._webhook_draining = False
+        self.webhook_stats = {"requests": 0, "errors": 0, "in_flight": 0, "started_at": time.time()}
         
         async def webhook_handler(request):
             if secret_token:
@@ -436,27 +1455,105 @@ class TelegramBot:
                     logger.warning("Invalid secret token")
                     return web.Response(status=403)
             
+            self.webhook_stats["requests"] += 1
+            self.webhook_stats["in_flight"] += 1
             try:
                 update = await request.json()
+                if self.journal:
+                    self.journal.append(update)
                 await self._process_update(update)
+                self._schedule_allowed_updates_sync()
                 return web.Response(status=200)
             except Exception as e:
+                self.webhook_stats["errors"] += 1
                 logger.error(f"Error processing webhook: {e}", exc_info=True)
                 await self._handle_error(e, request=request)
                 return web.Response(status=500)
+            finally:
+                self.webhook_stats["in_flight"] -= 1
         
         app.router.add_post(path, webhook_handler)
+        self._add_health_routes(app)
         self.webhook_server = app
+        return app
+    
+    def _add_health_routes(self, app: web.Application):
+        """Добавить /healthz и /metrics текущего процесса"""
+        async def healthz(request):
+            status = "draining" if self._webhook_draining else "ok"
+            return web.json_response(
+                {"status": status, "pid": os.getpid()},
+                status=503 if self._webhook_draining else 200
+            )
+        
+        async def metrics(request):
+            stats = dict(self.webhook_stats)
+            stats["pid"] = os.getpid()
+            stats["uptime"] = time.time() - stats.pop("started_at")
+            stats["draining"] = self._webhook_draining
+            return web.json_response(stats)
+        
+        app.router.add_get("/healthz", healthz)
+        app.router.add_get("/metrics", metrics)
+    
+    async def _start_webhook_server(self, host: str, port: int, path: str, secret_token: Optional[str],
+                                    reuse_port: bool = False, health_port: Optional[int] = None,
+                                    drain_timeout: float = 30.0) -> List[web.AppRunner]:
+        """
+        Запустить webhook сервер (и отдельный сервер здоровья, если указан health_port)
         
-        runner = web.AppRunner(app)
+        Returns:
+            Запущенные runner'ы, для остановки см. _drain_webhook_server
+        """
+        runner = web.AppRunner(self._build_webhook_app(path, secret_token), shutdown_timeout=drain_timeout)
         await runner.setup()
-        site = web.TCPSite(runner, host, port)
-        await site.start()
+        await web.TCPSite(runner, host, port, reuse_port=reuse_port or None).start()
+        runners = [runner]
+        
+        if health_port:
+            health_app = web.Application()
+            self._add_health_routes(health_app)
+            health_runner = web.AppRunner(health_app)
+            await health_runner.setup()
+            # При rolling restart старый и новый воркер временно делят health порт
+            await web.TCPSite(health_runner, host, health_port, reuse_port=reuse_port or None).start()
+            runners.append(health_runner)
         
-        logger.info(f"Webhook server started on {host}:{port}{path}")
+        logger.info(f"Webhook server started on {host}:{port}{path} (pid {os.getpid()})")
+        return runners
+    
+    async def _drain_webhook_server(self, runners: List[web.AppRunner]):
+        """Перестать принимать соединения и дождаться обработки текущих запросов"""
+        self._webhook_draining = True
+        logger.info(f"Draining webhook server ({self.webhook_stats['in_flight']} requests in flight)")
+        for runner in runners:
+            await runner.cleanup()
+    
+    async def start_webhook(self, host: str = "0.0.0.0", port: int = 8080,
+                           path: str = "/webhook", secret_token: Optional[str] = None,
+                           reuse_port: bool = False, health_port: Optional[int] = None,
+                           drain_timeout: float = 30.0, manage_webhook: bool = True):
+        """
+        Запустить webhook сервер
+        
+        Args:
+            host: Адрес для прослушивания
+            port: Порт
+            path: Путь webhook
+            secret_token: Секретный токен для проверки запросов от Telegram
+            reuse_port: Включить SO_REUSEPORT (несколько процессов на одном порту)
+            health_port: Отдельный порт для /healthz и /metrics этого процесса
+            drain_timeout: Сколько ждать завершения текущих запросов при остановке
+            manage_webhook: Устанавливать webhook при старте и удалять при остановке
+        """
+        runners = await self._start_webhook_server(
+            host, port, path, secret_token, reuse_port, health_port, drain_timeout
+        )
+        self.scheduler.start()
         
-        webhook_url = f"https://{host}:{port}{path}" if host != "0.0.0.0" else f"http://your-domain.com{path}"
-        await self.set_webhook(webhook_url, secret_token)
+        if manage_webhook:
+            webhook_url = f"https://{host}:{port}{path}" if host != "0.0.0.0" else f"http://your-domain.com{path}"
+            await self.set_webhook(webhook_url, secret_token)
         
         try:
             while True:
@@ -464,14 +1561,52 @@ class TelegramBot:
         except KeyboardInterrupt:
             logger.info("Stopping webhook server...")
         finally:
-            await runner.cleanup()
-            await self.delete_webhook()
+            await self._drain_webhook_server(runners)
+            if manage_webhook:
+                await self.delete_webhook()
     
-    async def stop(self):
-        """Остановить бота"""
+    async def stop(self, drain_timeout: float = 30.0):
+        """
+        Остановить бота
+        
+        Прекращает получение update, ждет завершения текущих обработчиков
+        (не дольше drain_timeout), сохраняет offset и закрывает ресурсы.
+        
+        Args:
+            drain_timeout: Максимальное время ожидания обработчиков в секундах
+        """
+        if self._stopping:
+            return
+        self._stopping = True
         self.running = False
-        if self.session:
-            await self.session.close()
+        
+        # Прерываем ожидающий long polling запрос
+        if self._poll_request:
+            self._poll_request.cancel()
+        
+        deadline = time.monotonic() + drain_timeout
+        try:
+            await asyncio.wait_for(self.media_groups.flush(), drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+        while (self._in_flight or self._detached_handlers) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._in_flight or self._detached_handlers:
+            logger.warning(f"Stopping with {self._in_flight + len(self._detached_handlers)} handler(s) still in progress")
+        
+        self._commit_offset(force=True)
+        # Задания планировщика еще могут отправлять сообщения через очередь исходящих
+        await self.scheduler.stop(max(0.0, deadline - time.monotonic()))
+        # Не ждем задачи, уже выполняющиеся в потоках и процессах: их нельзя прервать
+        self.executors.shutdown(wait=False)
+        if self.edit_coalescer:
+            await self.edit_coalescer.flush()
+        if self.outbound:
+            await self.outbound.close(max(0.0, deadline - time.monotonic()))
+        if self.journal:
+            self.journal.flush()
+        await self.middleware_manager.shutdown()
+        await self.transport.close()
         logger.info("Bot stopped")
     
     def run(self):
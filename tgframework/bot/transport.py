@@ -0,0 +1,142 @@
+"""
+Транспорт запросов к Bot API
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, Optional
+
+import aiohttp
+
+from .media import InputFile, form_value
+
+
+class Transport(ABC):
+    """
+    Базовый класс транспорта
+    
+    Транспорт отправляет вызов метода Bot API и возвращает ответ API
+    целиком ({"ok": ..., "result": ...}). Повторы, 429 и обработка ошибок
+    остаются в TelegramBot._make_request.
+    """
+    
+    @abstractmethod
+    async def request(self, method: str, url: str, params: Dict[str, Any],
+                      timeout: float = 30.0) -> Dict[str, Any]:
+        """
+        Выполнить вызов метода
+        
+        Args:
+            method: Название метода API
+            url: Полный URL метода
+            params: Параметры запроса
+            timeout: Таймаут запроса в секундах
+        
+        Returns:
+            Ответ API
+        """
+        pass
+    
+    async def upload(self, method: str, url: str, params: Dict[str, Any],
+                     files: Dict[str, InputFile], timeout: float = 300.0) -> Dict[str, Any]:
+        """
+        Выполнить вызов метода с загрузкой файлов (multipart/form-data)
+        
+        Args:
+            method: Название метода API
+            url: Полный URL метода
+            params: Обычные параметры запроса
+            files: Файлы по именам полей
+            timeout: Таймаут запроса в секундах
+        
+        Returns:
+            Ответ API
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support file upload")
+    
+    async def download(self, url: str, offset: int = 0, chunk_size: int = 65536,
+                       timeout: float = 300.0) -> AsyncIterator[bytes]:
+        """
+        Скачать файл потоком
+        
+        Args:
+            url: URL файла
+            offset: С какого байта начать (докачка)
+            chunk_size: Максимальный размер чанка
+            timeout: Таймаут чтения в секундах (между чанками)
+        
+        Yields:
+            Чанки содержимого начиная с offset
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support file download")
+        yield b""
+    
+    async def close(self):
+        """Освободить ресурсы транспорта"""
+        pass
+
+
+class AiohttpTransport(Transport):
+    """HTTP транспорт на aiohttp (по умолчанию)"""
+    
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
+        """
+        Args:
+            session: Готовая сессия aiohttp (по умолчанию создается при первом запросе)
+        """
+        self.session = session
+    
+    async def request(self, method: str, url: str, params: Dict[str, Any],
+                      timeout: float = 30.0) -> Dict[str, Any]:
+        if not self.session:
+            self.session = aiohttp.ClientSession()
+        
+        async with self.session.post(url, json=params, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            return await response.json()
+    
+    async def upload(self, method: str, url: str, params: Dict[str, Any],
+                     files: Dict[str, InputFile], timeout: float = 300.0) -> Dict[str, Any]:
+        if not self.session:
+            self.session = aiohttp.ClientSession()
+        
+        form = aiohttp.FormData(quote_fields=False)
+        for name, value in params.items():
+            if value is not None:
+                form.add_field(name, form_value(value))
+        try:
+            # Файлы и итераторы aiohttp передает чанками, не читая целиком
+            for name, file in files.items():
+                form.add_field(name, file.open(), filename=file.filename, content_type=file.content_type)
+            async with self.session.post(url, data=form, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                return await response.json()
+        finally:
+            for file in files.values():
+                file.close()
+    
+    async def download(self, url: str, offset: int = 0, chunk_size: int = 65536,
+                       timeout: float = 300.0) -> AsyncIterator[bytes]:
+        if not self.session:
+            self.session = aiohttp.ClientSession()
+        
+        headers = {"Range": f"bytes={offset}-"} if offset else None
+        client_timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=timeout)
+        async with self.session.get(url, headers=headers, timeout=client_timeout) as response:
+            if offset and response.status == 416:
+                # Файл уже скачан целиком
+                return
+            response.raise_for_status()
+            
+            # Сервер без поддержки Range отдает файл с начала: пропускаем offset байт
+            skip = offset if response.status != 206 else 0
+            async for chunk in response.content.iter_chunked(chunk_size):
+                if skip:
+                    if len(chunk) <= skip:
+                        skip -= len(chunk)
+                        continue
+                    chunk = chunk[skip:]
+                    skip = 0
+                yield chunk
+    
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
@@ -0,0 +1,298 @@
+"""
+Триггеры планировщика
+
+Триггер вычисляет время следующего запуска задания (Unix время в секундах)
+и сериализуется в словарь, чтобы задание можно было сохранить в БД.
+"""
+
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Any, Dict, List, Optional, Union
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+# Момент времени: datetime (naive - локальное время) или Unix время
+TimePoint = Union[datetime, float, int]
+
+
+def to_timestamp(value: TimePoint) -> float:
+    """Преобразовать datetime или Unix время в Unix время"""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+def _tz_name(tz: Optional[tzinfo]) -> Optional[str]:
+    if tz is None:
+        return None
+    name = getattr(tz, "key", None) or tz.tzname(None)
+    if not name:
+        raise ValueError(f"Часовой пояс {tz!r} нельзя сохранить, используйте ZoneInfo")
+    return name
+
+
+def _tz_from_name(name: Optional[str]) -> Optional[tzinfo]:
+    if name is None:
+        return None
+    if name == "UTC" or ZoneInfo is None:
+        return timezone.utc
+    return ZoneInfo(name)
+
+
+class Trigger(ABC):
+    """Базовый класс триггера"""
+    
+    @abstractmethod
+    def next_after(self, timestamp: float) -> Optional[float]:
+        """
+        Время запуска строго после timestamp
+        
+        Args:
+            timestamp: Unix время
+        
+        Returns:
+            Unix время следующего запуска или None, если запусков больше нет
+        """
+        pass
+    
+    def first_run(self, now: float) -> Optional[float]:
+        """Время первого запуска задания, добавленного в момент now"""
+        return self.next_after(now)
+    
+    @abstractmethod
+    def to_dict(self) -> Dict[str, Any]:
+        """Сериализовать триггер"""
+        pass
+
+
+class DateTrigger(Trigger):
+    """
+    Однократный запуск
+    
+    Usage:
+        DateTrigger(datetime(2025, 12, 31, 23, 59))
+        DateTrigger(time.time() + 600)  # через 10 минут
+    """
+    
+    def __init__(self, run_at: TimePoint):
+        """
+        Args:
+            run_at: Время запуска (datetime или Unix время)
+        """
+        self.run_at = to_timestamp(run_at)
+    
+    def next_after(self, timestamp: float) -> Optional[float]:
+        return self.run_at if self.run_at > timestamp else None
+    
+    def first_run(self, now: float) -> Optional[float]:
+        # Время в прошлом - запуск сразу (с учетом политики пропуска)
+        return self.run_at
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"type": "date", "run_at": self.run_at}
+    
+    def __repr__(self) -> str:
+        return f"DateTrigger({datetime.fromtimestamp(self.run_at).isoformat()})"
+
+
+class IntervalTrigger(Trigger):
+    """
+    Периодический запуск с фиксированным интервалом
+    
+    Запуски привязаны к start + n * interval, поэтому длительность задания и
+    задержки планировщика не сдвигают расписание.
+    
+    Usage:
+        IntervalTrigger(minutes=5)
+        IntervalTrigger(hours=1, start=datetime(2025, 1, 1, 9, 0))
+    """
+    
+    def __init__(self, seconds: float = 0, minutes: float = 0, hours: float = 0, days: float = 0,
+                 start: Optional[TimePoint] = None):
+        """
+        Args:
+            seconds, minutes, hours, days: Интервал
+            start: Время первого запуска (по умолчанию через один интервал)
+        """
+        self.interval = seconds + minutes * 60 + hours * 3600 + days * 86400
+        if self.interval <= 0:
+            raise ValueError("Интервал должен быть больше нуля")
+        self.start = to_timestamp(start) if start is not None else time.time() + self.interval
+    
+    def next_after(self, timestamp: float) -> Optional[float]:
+        if timestamp < self.start:
+            return self.start
+        periods = int((timestamp - self.start) // self.interval) + 1
+        next_time = self.start + periods * self.interval
+        if next_time <= timestamp:
+            # Погрешность float: результат должен быть строго позже timestamp
+            next_time = self.start + (periods + 1) * self.interval
+        return next_time
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"type": "interval", "interval": self.interval, "start": self.start}
+    
+    def __repr__(self) -> str:
+        return f"IntervalTrigger({self.interval}s)"
+
+
+class CronTrigger(Trigger):
+    """
+    Запуск по cron выражению: "минута час день месяц день_недели"
+    
+    Поддерживаются *, списки (1,15), диапазоны (1-5), шаги (*/10, 0-30/5),
+    имена месяцев и дней недели (jan, mon) и @hourly, @daily, @weekly,
+    @monthly, @yearly. День недели: 0 или 7 - воскресенье. Если заданы и
+    день месяца, и день недели, подходит любой из них (как в cron).
+    
+    Usage:
+        CronTrigger("0 9 * * mon-fri")                        # по будням в 9:00
+        CronTrigger("*/15 * * * *")                           # каждые 15 минут
+        CronTrigger("0 20 * * sun", tz=ZoneInfo("Europe/Moscow"))
+    """
+    
+    MACROS = {
+        "@hourly": "0 * * * *",
+        "@daily": "0 0 * * *",
+        "@weekly": "0 0 * * 0",
+        "@monthly": "0 0 1 * *",
+        "@yearly": "0 0 1 1 *",
+        "@annually": "0 0 1 1 *",
+    }
+    MONTHS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+    WEEKDAYS = ("sun", "mon", "tue", "wed", "thu", "fri", "sat")
+    
+    # Поиск времени запуска не дальше этого количества шагов (например, для "0 0 30 2 *")
+    MAX_STEPS = 10000
+    
+    def __init__(self, expression: str, tz: Optional[tzinfo] = None):
+        """
+        Args:
+            expression: Cron выражение из 5 полей
+            tz: Часовой пояс расписания (по умолчанию локальное время)
+        """
+        self.expression = expression.strip()
+        self.tz = tz
+        fields = self.MACROS.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron выражение должно содержать 5 полей: {expression!r}")
+        
+        self.minutes = self._parse(fields[0], 0, 59)
+        self.hours = self._parse(fields[1], 0, 23)
+        self.days = self._parse(fields[2], 1, 31)
+        self.months = self._parse(fields[3], 1, 12, self.MONTHS, 1)
+        weekdays = self._parse(fields[4], 0, 7, self.WEEKDAYS, 0)
+        self.weekdays = sorted({day % 7 for day in weekdays})
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+    
+    @staticmethod
+    def _parse(field: str, low: int, high: int, names: tuple = (), names_base: int = 0) -> List[int]:
+        """Разобрать поле cron выражения в отсортированный список значений"""
+        def value(token: str) -> int:
+            token = token.lower()
+            if token in names:
+                return names.index(token) + names_base
+            number = int(token)
+            if not low <= number <= high:
+                raise ValueError(f"Значение {number} вне диапазона {low}-{high}")
+            return number
+        
+        values = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step_text = part.split("/", 1)
+                step = int(step_text)
+                if step <= 0:
+                    raise ValueError(f"Некорректный шаг в cron поле {field!r}")
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start_text, end_text = part.split("-", 1)
+                start, end = value(start_text), value(end_text)
+            else:
+                start = value(part)
+                end = high if step > 1 else start
+            values.update(range(start, end + 1, step))
+        
+        if not values:
+            raise ValueError(f"Пустое cron поле {field!r}")
+        return sorted(values)
+    
+    @staticmethod
+    def _next_value(values: List[int], current: int) -> Optional[int]:
+        index = bisect_left(values, current)
+        return values[index] if index < len(values) else None
+    
+    def _day_matches(self, dt: datetime) -> bool:
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.isoweekday() % 7) in self.weekdays
+        if self._any_day:
+            return weekday_ok
+        if self._any_weekday:
+            return day_ok
+        return day_ok or weekday_ok
+    
+    def next_after(self, timestamp: float) -> Optional[float]:
+        dt = datetime.fromtimestamp(timestamp, self.tz).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        
+        for _ in range(self.MAX_STEPS):
+            if dt.month not in self.months:
+                month = self._next_value(self.months, dt.month)
+                if month is None:
+                    dt = dt.replace(year=dt.year + 1, month=self.months[0], day=1, hour=0, minute=0)
+                else:
+                    dt = dt.replace(month=month, day=1, hour=0, minute=0)
+                continue
+            
+            if not self._day_matches(dt):
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            
+            hour = self._next_value(self.hours, dt.hour)
+            if hour is None:
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if hour != dt.hour:
+                dt = dt.replace(hour=hour, minute=0)
+            
+            minute = self._next_value(self.minutes, dt.minute)
+            if minute is None:
+                dt = (dt + timedelta(hours=1)).replace(minute=0)
+                continue
+            
+            return dt.replace(minute=minute).timestamp()
+        
+        return None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"type": "cron", "expression": self.expression, "tz": _tz_name(self.tz)}
+    
+    def __repr__(self) -> str:
+        return f"CronTrigger({self.expression!r})"
+
+
+def trigger_from_dict(data: Dict[str, Any]) -> Trigger:
+    """
+    Восстановить триггер из словаря Trigger.to_dict()
+    
+    Args:
+        data: Сериализованный триггер
+    
+    Returns:
+        Триггер
+    """
+    kind = data.get("type")
+    if kind == "date":
+        return DateTrigger(data["run_at"])
+    if kind == "interval":
+        return IntervalTrigger(seconds=data["interval"], start=data["start"])
+    if kind == "cron":
+        return CronTrigger(data["expression"], tz=_tz_from_name(data.get("tz")))
+    raise ValueError(f"Неизвестный тип триггера: {kind!r}")
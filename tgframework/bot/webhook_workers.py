@@ -0,0 +1,230 @@
+"""
+Webhook на нескольких процессах с SO_REUSEPORT
+
+Все воркеры слушают один порт, ядро распределяет входящие соединения между ними.
+SIGHUP запускает поочередный (rolling) перезапуск без остановки приема update.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _webhook_worker_main(index: int, bot_factory: Callable, options: Dict[str, Any], ready):
+    """Точка входа процесса webhook воркера"""
+    bot = bot_factory()
+    asyncio.run(_run_webhook_worker(index, bot, options, ready))
+
+
+async def _run_webhook_worker(index: int, bot, options: Dict[str, Any], ready):
+    """Принимать update до SIGTERM/SIGINT, затем дождаться текущих запросов"""
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    
+    bot.running = True
+    runners = await bot._start_webhook_server(reuse_port=True, **options)
+    ready.set()
+    logger.info(f"Webhook worker {index} ready (pid {os.getpid()})")
+    
+    try:
+        await stop.wait()
+    finally:
+        await bot._drain_webhook_server(runners)
+        await bot.stop()
+        logger.info(f"Webhook worker {index} stopped")
+
+
+class WebhookWorkerPool:
+    """
+    Пул процессов, принимающих webhook на общем порту (SO_REUSEPORT, Linux/BSD)
+    
+    bot_factory должна быть функцией верхнего уровня модуля и возвращать
+    полностью настроенный TelegramBot.
+    
+    Сигналы родительскому процессу:
+        SIGHUP - rolling restart: воркеры заменяются по одному, старый процесс
+                 перестает принимать соединения и дорабатывает текущие запросы
+        SIGTERM / SIGINT - остановка всех воркеров с ожиданием текущих запросов
+    
+    Usage:
+        if __name__ == "__main__":
+            WebhookWorkerPool(create_bot, workers=4, port=8080,
+                              webhook_url="https://example.com/webhook").run()
+    """
+    
+    def __init__(self, bot_factory: Callable, workers: Optional[int] = None,
+                 host: str = "0.0.0.0", port: int = 8080, path: str = "/webhook",
+                 secret_token: Optional[str] = None, webhook_url: Optional[str] = None,
+                 health_port_base: Optional[int] = None, drain_timeout: float = 30.0,
+                 start_timeout: float = 30.0, restart_delay: float = 1.0):
+        """
+        Args:
+            bot_factory: Функция, создающая бота (вызывается в каждом процессе)
+            workers: Количество процессов (по умолчанию число ядер)
+            host: Адрес для прослушивания
+            port: Общий порт webhook
+            path: Путь webhook
+            secret_token: Секретный токен для проверки запросов от Telegram
+            webhook_url: Публичный URL; если указан, webhook устанавливается в Telegram
+            health_port_base: Если указан, воркер i отдает /healthz и /metrics на порту base + i
+            drain_timeout: Сколько ждать текущих запросов при остановке воркера
+            start_timeout: Сколько ждать готовности нового воркера
+            restart_delay: Пауза перед перезапуском упавшего воркера
+        """
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise RuntimeError("SO_REUSEPORT не поддерживается на этой платформе")
+        
+        self.bot_factory = bot_factory
+        self.workers = workers or os.cpu_count() or 1
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self.webhook_url = webhook_url
+        self.health_port_base = health_port_base
+        self.drain_timeout = drain_timeout
+        self.start_timeout = start_timeout
+        self.restart_delay = restart_delay
+        
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: List[Optional[multiprocessing.Process]] = []
+        self._died_at: Dict[int, float] = {}
+        self._reload_requested = False
+        self._stop_requested = False
+        
+        # Метрики
+        self.restarts = 0
+        self.rolling_restarts = 0
+    
+    def _options(self, index: int) -> Dict[str, Any]:
+        """Параметры webhook сервера воркера"""
+        return {
+            "host": self.host,
+            "port": self.port,
+            "path": self.path,
+            "secret_token": self.secret_token,
+            "health_port": self.health_port_base + index if self.health_port_base else None,
+            "drain_timeout": self.drain_timeout,
+        }
+    
+    def _spawn(self, index: int) -> multiprocessing.Process:
+        """Запустить воркер и дождаться, пока он начнет слушать порт"""
+        ready = self._context.Event()
+        process = self._context.Process(
+            target=_webhook_worker_main,
+            args=(index, self.bot_factory, self._options(index), ready),
+            name=f"tgframework-webhook-{index}",
+        )
+        process.start()
+        
+        if not ready.wait(self.start_timeout):
+            process.kill()
+            process.join()
+            raise RuntimeError(f"Webhook worker {index} did not start in {self.start_timeout}s")
+        return process
+    
+    def _stop_process(self, index: int, process: multiprocessing.Process):
+        """Остановить воркер с ожиданием текущих запросов"""
+        if process.is_alive():
+            process.terminate()
+        process.join(self.drain_timeout + 5)
+        if process.is_alive():
+            logger.warning(f"Webhook worker {index} did not drain in time, killing")
+            process.kill()
+            process.join()
+    
+    def start(self):
+        """Запустить все воркеры"""
+        self._processes = [self._spawn(index) for index in range(self.workers)]
+        logger.info(f"Webhook pool started: {self.workers} workers on {self.host}:{self.port}{self.path}")
+    
+    def rolling_restart(self):
+        """Заменить воркеры по одному: сначала запускается новый, затем останавливается старый"""
+        logger.info("Rolling restart of webhook workers")
+        for index, old in enumerate(self._processes):
+            self._processes[index] = self._spawn(index)
+            if old is not None:
+                self._stop_process(index, old)
+        self.rolling_restarts += 1
+    
+    def check_workers(self):
+        """Перезапустить упавшие воркеры"""
+        now = time.monotonic()
+        for index, process in enumerate(self._processes):
+            if process is None or process.is_alive():
+                continue
+            
+            died_at = self._died_at.setdefault(index, now)
+            if now - died_at < self.restart_delay:
+                continue
+            
+            logger.warning(f"Webhook worker {index} exited with code {process.exitcode}, restarting")
+            del self._died_at[index]
+            self.restarts += 1
+            try:
+                self._processes[index] = self._spawn(index)
+            except RuntimeError as e:
+                logger.error(str(e))
+    
+    def stop(self):
+        """Остановить все воркеры"""
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for index, process in enumerate(self._processes):
+            if process is not None:
+                self._stop_process(index, process)
+        self._processes = []
+        logger.info("Webhook pool stopped")
+    
+    def _set_webhook(self, enabled: bool):
+        """Установить или удалить webhook в Telegram"""
+        bot = self.bot_factory()
+        
+        async def call():
+            try:
+                if enabled:
+                    await bot.set_webhook(self.webhook_url, self.secret_token)
+                else:
+                    await bot.delete_webhook()
+            finally:
+                await bot.stop()
+        
+        asyncio.run(call())
+    
+    def run(self):
+        """Запустить пул и обслуживать сигналы до остановки (синхронный метод)"""
+        def request_reload(signum, frame):
+            self._reload_requested = True
+        
+        def request_stop(signum, frame):
+            self._stop_requested = True
+        
+        signal.signal(signal.SIGHUP, request_reload)
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+        
+        self.start()
+        if self.webhook_url:
+            self._set_webhook(True)
+        
+        try:
+            while not self._stop_requested:
+                time.sleep(0.5)
+                if self._reload_requested:
+                    self._reload_requested = False
+                    self.rolling_restart()
+                self.check_workers()
+        finally:
+            self.stop()
+            if self.webhook_url:
+                self._set_webhook(False)
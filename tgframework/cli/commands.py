@@ -771,6 +771,33 @@ def run_migrations():
         print(f"[ERROR] Migration failed: {e}")
 
 
+def upgrade_migrations():
+    """Добавить недостающие миграции фреймворка в существующий проект и применить их"""
+    print("Upgrading framework migrations...")
+    
+    from tgframework.core import load_config
+    from tgframework.orm import create_engine, MigrationManager
+    from .migration_templates import upgrade_default_migrations
+    from pathlib import Path
+    
+    try:
+        config = load_config()
+        engine = create_engine(config.database.connection_string)
+        engine.connect()
+        
+        migrations_path = Path("migrations")
+        added = upgrade_default_migrations(migrations_path)
+        for name in added:
+            print(f"[OK] Added {migrations_path}/{name}")
+        
+        migration_manager = MigrationManager(engine, str(migrations_path))
+        migration_manager.migrate()
+        
+        print("[OK] Migrations applied")
+    except Exception as e:
+        print(f"[ERROR] Upgrade failed: {e}")
+
+
 def rollback_migrations(steps: int = 1):
     """Откатить миграции (php artisan migrate:rollback)"""
     print(f"Rolling back last {steps} migration batch(es)...")
@@ -902,6 +929,9 @@ def main():
     # migrate
     subparsers.add_parser("migrate", help="Запустить миграции")
     
+    # migrate:upgrade
+    subparsers.add_parser("migrate:upgrade", help="Добавить недостающие миграции фреймворка и применить их")
+    
     # migrate:rollback
     rollback_parser = subparsers.add_parser("migrate:rollback", help="Откатить последний батч миграций")
     rollback_parser.add_argument("--steps", type=int, default=1, help="Количество батчей для отката")
@@ -930,6 +960,8 @@ def main():
         init_database()
     elif args.command == "migrate":
         run_migrations()
+    elif args.command == "migrate:upgrade":
+        upgrade_migrations()
     elif args.command == "migrate:rollback":
         rollback_migrations(args.steps)
     elif args.command == "migrate:reset":
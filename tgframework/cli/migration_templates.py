@@ -2,8 +2,11 @@
 Шаблоны для создания дефолтных миграций
 """
 
+import shutil
+import tempfile
 from pathlib import Path
 from datetime import datetime
+from typing import List
 
 
 def create_default_migrations(migrations_path: Path):
@@ -27,10 +30,40 @@ def create_default_migrations(migrations_path: Path):
     # 4. Миграция для таблицы user_states
     create_user_states_migration(migrations_path)
     
+    # 5. Колонки last_seen_at для users и chats
+    create_last_seen_migration(migrations_path)
+    
+    # 6. Миграция для таблицы scheduled_jobs
+    create_scheduled_jobs_migration(migrations_path)
+    
     # __init__.py
     (migrations_path / "__init__.py").write_text('"""Migrations"""\n')
 
 
+def upgrade_default_migrations(migrations_path: Path) -> List[str]:
+    """
+    Добавить в существующий проект дефолтные миграции, появившиеся в новых версиях
+    
+    Уже существующие файлы миграций не перезаписываются.
+    
+    Args:
+        migrations_path: Путь к директории миграций
+    
+    Returns:
+        Имена добавленных файлов
+    """
+    migrations_path.mkdir(exist_ok=True)
+    added = []
+    with tempfile.TemporaryDirectory() as tmp:
+        create_default_migrations(Path(tmp))
+        for template in sorted(Path(tmp).glob("*.py")):
+            target = migrations_path / template.name
+            if not target.exists():
+                shutil.copyfile(template, target)
+                added.append(template.name)
+    return added
+
+
 def create_users_migration(migrations_path: Path):
     """Создать миграцию для таблицы users"""
     timestamp = "2024_01_01_000001"
@@ -214,3 +247,92 @@ class CreateUserStatesTable(Migration):
     
     (migrations_path / f"{timestamp}_create_user_states_table.py").write_text(content)
 
+
+def create_last_seen_migration(migrations_path: Path):
+    """Создать миграцию, добавляющую last_seen_at в users и chats"""
+    timestamp = "2024_01_01_000005"
+    content = '''"""
+Add last_seen_at to users and chats
+"""
+
+from tgframework.orm import Migration, DatabaseEngine
+
+
+class AddLastSeenColumns(Migration):
+    """Add last_seen_at columns migration"""
+    
+    tables = ("users", "chats")
+    
+    def up(self, engine: DatabaseEngine):
+        """Apply migration"""
+        is_postgres = "postgresql" in engine.connection_string
+        
+        for table in self.tables:
+            if is_postgres:
+                engine.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMP")
+                continue
+            
+            columns = [row["name"] for row in engine.fetchall(f"PRAGMA table_info({table})")]
+            if "last_seen_at" not in columns:
+                engine.execute(f"ALTER TABLE {table} ADD COLUMN last_seen_at TIMESTAMP")
+        
+        engine.commit()
+    
+    def down(self, engine: DatabaseEngine):
+        """Rollback migration"""
+        for table in self.tables:
+            engine.execute(f"ALTER TABLE {table} DROP COLUMN last_seen_at")
+        engine.commit()
+'''
+    
+    (migrations_path / f"{timestamp}_add_last_seen_columns.py").write_text(content)
+
+
+def create_scheduled_jobs_migration(migrations_path: Path):
+    """Создать миграцию для таблицы scheduled_jobs (планировщик)"""
+    timestamp = "2024_01_01_000006"
+    content = '''"""
+Create scheduled_jobs table
+"""
+
+from tgframework.orm import Migration, DatabaseEngine
+
+
+class CreateScheduledJobsTable(Migration):
+    """Create scheduled_jobs table migration"""
+    
+    def up(self, engine: DatabaseEngine):
+        """Apply migration"""
+        is_postgres = "postgresql" in engine.connection_string
+        bigint = "BIGINT" if is_postgres else "INTEGER"
+        
+        engine.execute(f"""
+            CREATE TABLE IF NOT EXISTS scheduled_jobs (
+                job_id VARCHAR(255) PRIMARY KEY,
+                task VARCHAR(255) NOT NULL,
+                trigger TEXT NOT NULL,
+                kwargs TEXT,
+                next_run_at {bigint} NOT NULL,
+                misfire_policy VARCHAR(32) NOT NULL DEFAULT 'run_once',
+                misfire_grace_time INTEGER,
+                runs INTEGER NOT NULL DEFAULT 0,
+                failures INTEGER NOT NULL DEFAULT 0,
+                misfires INTEGER NOT NULL DEFAULT 0,
+                last_run_at {bigint},
+                last_duration_ms INTEGER,
+                last_error TEXT
+            )
+        """)
+        engine.execute(
+            "CREATE INDEX IF NOT EXISTS idx_scheduled_jobs_next_run "
+            "ON scheduled_jobs (next_run_at, job_id)"
+        )
+        engine.commit()
+    
+    def down(self, engine: DatabaseEngine):
+        """Rollback migration"""
+        engine.execute("DROP TABLE IF EXISTS scheduled_jobs")
+        engine.commit()
+'''
+    
+    (migrations_path / f"{timestamp}_create_scheduled_jobs_table.py").write_text(content)
@@ -2,6 +2,8 @@
 Исключения фреймворка
 """
 
+from typing import Any, Dict, Optional
+
 
 class TgFrameworkException(Exception):
     """Базовое исключение фреймворка"""
@@ -28,7 +30,109 @@ class NotFoundException(TgFrameworkException):
     pass
 
 
+class HandlerTimeoutError(TgFrameworkException):
+    """Обработчик update не завершился за отведенное время"""
+    
+    def __init__(self, handler: str, timeout: float):
+        """
+        Args:
+            handler: Имя функции-обработчика
+            timeout: Таймаут в секундах
+        """
+        self.handler = handler
+        self.timeout = timeout
+        super().__init__(f"Handler {handler} timed out after {timeout}s")
+
+
 class APIException(TgFrameworkException):
     """Ошибки при работе с Telegram API"""
+    
+    #: Можно ли повторить запрос
+    retryable = False
+    
+    def __init__(self, description: str = "Unknown error", error_code: int = 0,
+                 method: Optional[str] = None, retry_after: Optional[float] = None):
+        """
+        Args:
+            description: Описание ошибки от API
+            error_code: Код ошибки API (0 - ошибка без ответа API)
+            method: Метод API, вызвавший ошибку
+            retry_after: Через сколько секунд можно повторить запрос
+        """
+        self.description = description
+        self.error_code = error_code
+        self.method = method
+        self.retry_after = retry_after
+        super().__init__(f"API Error {error_code}: {description}" if error_code else description)
+    
+    @classmethod
+    def from_response(cls, method: str, response: Dict[str, Any]) -> "APIException":
+        """
+        Создать исключение подходящего типа по ответу API
+        
+        Args:
+            method: Метод API
+            response: Ответ API с "ok": false
+        
+        Returns:
+            Экземпляр подкласса APIException
+        """
+        error_code = response.get("error_code", 0)
+        description = response.get("description", "Unknown error")
+        retry_after = (response.get("parameters") or {}).get("retry_after")
+        
+        if error_code == 429:
+            error_class = RetryAfterError
+        elif error_code >= 500:
+            error_class = ServerError
+        else:
+            error_class = _ERRORS_BY_CODE.get(error_code, APIException)
+        return error_class(description, error_code, method=method, retry_after=retry_after)
+
+
+class BadRequestError(APIException):
+    """400: неверный запрос (повтор не поможет)"""
+    pass
+
+
+class UnauthorizedError(APIException):
+    """401: неверный токен бота"""
+    pass
+
+
+class ForbiddenError(APIException):
+    """403: бот заблокирован пользователем, исключен из чата и т.п."""
+    pass
+
+
+class ConflictError(APIException):
+    """409: конфликт (например, getUpdates при установленном webhook)"""
+    pass
+
+
+class RetryAfterError(APIException):
+    """429: превышен лимит запросов, повтор через retry_after секунд"""
+    retryable = True
+
+
+class ServerError(APIException):
+    """5xx: ошибка на стороне Telegram"""
+    retryable = True
+
+
+class NetworkError(APIException):
+    """Ошибка сети или таймаут: ответ API не получен"""
+    retryable = True
+
+
+class CircuitOpenError(APIException):
+    """API недоступен: запросы временно не отправляются (circuit breaker открыт)"""
     pass
 
+
+_ERRORS_BY_CODE = {
+    400: BadRequestError,
+    401: UnauthorizedError,
+    403: ForbiddenError,
+    409: ConflictError,
+}
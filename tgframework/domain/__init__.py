@@ -2,9 +2,17 @@
 Domain слой с моделями и DTO
 """
 
-from .models import User, Chat, Message, UserState
-from .dto import UserDTO, ChatDTO, MessageDTO, CreateUserDTO, UpdateUserDTO
-from .repositories import UserRepository, ChatRepository, MessageRepository
+from .models import User, Chat, Message, UserState, ScheduledJob
+from .dto import UserDTO, ChatDTO, MessageDTO, CreateUserDTO, UpdateUserDTO, SearchHitDTO, SearchPageDTO
+from .repositories import (
+    UserRepository,
+    ChatRepository,
+    MessageRepository,
+    CachedUserRepository,
+    CachedChatRepository,
+    ScheduledJobRepository,
+)
+from .search import MessageSearchIndex
 from .services import UserService, ChatService, MessageService
 
 __all__ = [
@@ -12,14 +20,21 @@ __all__ = [
     "Chat",
     "Message",
     "UserState",
+    "ScheduledJob",
     "UserDTO",
     "ChatDTO",
     "MessageDTO",
     "CreateUserDTO",
     "UpdateUserDTO",
+    "SearchHitDTO",
+    "SearchPageDTO",
     "UserRepository",
     "ChatRepository",
     "MessageRepository",
+    "CachedUserRepository",
+    "CachedChatRepository",
+    "ScheduledJobRepository",
+    "MessageSearchIndex",
     "UserService",
     "ChatService",
     "MessageService",
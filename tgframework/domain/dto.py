@@ -2,8 +2,8 @@
 Data Transfer Objects (DTO)
 """
 
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -17,6 +17,7 @@ class UserDTO:
     language_code: Optional[str] = None
     is_bot: bool = False
     is_admin: bool = False
+    last_seen_at: Optional[datetime] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
     
@@ -60,6 +61,7 @@ class ChatDTO:
     chat_type: str
     title: Optional[str] = None
     username: Optional[str] = None
+    last_seen_at: Optional[datetime] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
@@ -73,3 +75,24 @@ class MessageDTO:
     text: Optional[str] = None
     created_at: Optional[datetime] = None
 
+
+@dataclass
+class SearchHitDTO:
+    """DTO для найденного сообщения"""
+    message_id: int
+    chat_id: int
+    user_id: int
+    text: Optional[str] = None
+    snippet: Optional[str] = None
+    rank: float = 0.0
+    created_at: Optional[datetime] = None
+
+
+@dataclass
+class SearchPageDTO:
+    """DTO для страницы результатов поиска"""
+    query: str
+    page: int
+    per_page: int
+    has_next: bool = False
+    hits: List[SearchHitDTO] = field(default_factory=list)
@@ -19,6 +19,7 @@ class User(Model):
     language_code = StringField(nullable=True)
     is_bot = BooleanField(default=False)
     is_admin = BooleanField(default=False)
+    last_seen_at = DateTimeField(nullable=True)
     created_at = DateTimeField(auto_now_add=True)
     updated_at = DateTimeField(auto_now=True)
     
@@ -42,6 +43,7 @@ class Chat(Model):
     chat_type = StringField()  # private, group, supergroup, channel
     title = StringField(nullable=True)
     username = StringField(nullable=True)
+    last_seen_at = DateTimeField(nullable=True)
     created_at = DateTimeField(auto_now_add=True)
     updated_at = DateTimeField(auto_now=True)
 
@@ -50,6 +52,7 @@ class Message(Model):
     """Модель сообщения"""
     
     _table_name = "messages"
+    _partition_by = "created_at"
     
     id = IntegerField(primary_key=True, auto_increment=True)
     message_id = IntegerField()
@@ -69,3 +72,22 @@ class UserState(Model):
     data = TextField(nullable=True)
     updated_at = DateTimeField(auto_now=True)
 
+
+class ScheduledJob(Model):
+    """Модель задания планировщика (bot.scheduler)"""
+    
+    _table_name = "scheduled_jobs"
+    
+    job_id = StringField(primary_key=True)
+    task = StringField()
+    trigger = TextField()  # JSON Trigger.to_dict()
+    kwargs = TextField(nullable=True)  # JSON аргументов задачи
+    next_run_at = IntegerField(index=True)  # Unix время в миллисекундах
+    misfire_policy = StringField(default="run_once")
+    misfire_grace_time = IntegerField(nullable=True)  # секунды
+    runs = IntegerField(default=0)
+    failures = IntegerField(default=0)
+    misfires = IntegerField(default=0)
+    last_run_at = IntegerField(nullable=True)  # Unix время в миллисекундах
+    last_duration_ms = IntegerField(nullable=True)
+    last_error = TextField(nullable=True)
@@ -2,10 +2,13 @@
 Репозитории для работы с данными (Repository Pattern)
 """
 
+from datetime import datetime
 from typing import List, Optional
 from abc import ABC, abstractmethod
-from ..orm import Session
-from .models import User, Chat, Message, UserState
+from ..orm import Session, PartitionManager
+from ..infrastructure.cache import TTLCache
+from .search import MessageSearchIndex, like_search
+from .models import User, Chat, Message, UserState, ScheduledJob
 from .dto import UserDTO, ChatDTO, MessageDTO, CreateUserDTO, UpdateUserDTO
 
 
@@ -128,6 +131,85 @@ class ChatRepository(IChatRepository):
         return self.session.add(chat)
 
 
+class CachedUserRepository(IUserRepository):
+    """Read-through кэш поверх репозитория пользователей"""
+    
+    def __init__(self, repository: IUserRepository, cache: Optional[TTLCache] = None):
+        """
+        Args:
+            repository: Исходный репозиторий
+            cache: Кэш (по умолчанию LRU на 10000 записей с TTL 5 минут)
+        """
+        self.repository = repository
+        self.cache = cache or TTLCache(maxsize=10000, ttl=300.0, negative_ttl=30.0)
+    
+    def get_by_id(self, user_id: int) -> Optional[User]:
+        """Получить пользователя по ID (неизвестные ID тоже кэшируются)"""
+        return self.cache.get_or_load(user_id, lambda: self.repository.get_by_id(user_id))
+    
+    def create(self, user_dto: CreateUserDTO) -> User:
+        """Создать пользователя и обновить кэш"""
+        user = self.repository.create(user_dto)
+        self.cache.set(user.user_id, user)
+        return user
+    
+    def update(self, user_id: int, user_dto: UpdateUserDTO) -> Optional[User]:
+        """Обновить пользователя и обновить кэш"""
+        self.cache.invalidate(user_id)
+        user = self.repository.update(user_id, user_dto)
+        if user:
+            self.cache.set(user_id, user)
+        return user
+    
+    def get_all(self, limit: Optional[int] = None) -> List[User]:
+        return self.repository.get_all(limit)
+    
+    def get_admins(self) -> List[User]:
+        return self.repository.get_admins()
+    
+    def count(self) -> int:
+        return self.repository.count()
+    
+    def invalidate(self, user_id: int):
+        """Сбросить запись пользователя в кэше"""
+        self.cache.invalidate(user_id)
+    
+    def cache_stats(self) -> dict:
+        """Статистика попаданий и промахов кэша"""
+        return self.cache.stats()
+
+
+class CachedChatRepository(IChatRepository):
+    """Read-through кэш поверх репозитория чатов"""
+    
+    def __init__(self, repository: IChatRepository, cache: Optional[TTLCache] = None):
+        """
+        Args:
+            repository: Исходный репозиторий
+            cache: Кэш (по умолчанию LRU на 10000 записей с TTL 5 минут)
+        """
+        self.repository = repository
+        self.cache = cache or TTLCache(maxsize=10000, ttl=300.0, negative_ttl=30.0)
+    
+    def get_by_id(self, chat_id: int) -> Optional[Chat]:
+        """Получить чат по ID (неизвестные ID тоже кэшируются)"""
+        return self.cache.get_or_load(chat_id, lambda: self.repository.get_by_id(chat_id))
+    
+    def create(self, chat_dto: ChatDTO) -> Chat:
+        """Создать чат и обновить кэш"""
+        chat = self.repository.create(chat_dto)
+        self.cache.set(chat.chat_id, chat)
+        return chat
+    
+    def invalidate(self, chat_id: int):
+        """Сбросить запись чата в кэше"""
+        self.cache.invalidate(chat_id)
+    
+    def cache_stats(self) -> dict:
+        """Статистика попаданий и промахов кэша"""
+        return self.cache.stats()
+
+
 class IMessageRepository(ABC):
     """Интерфейс репозитория сообщений"""
     
@@ -143,8 +225,30 @@ class IMessageRepository(ABC):
 class MessageRepository(IMessageRepository):
     """Репозиторий сообщений"""
     
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, partitions: Optional[PartitionManager] = None,
+                 search_index: Optional[MessageSearchIndex] = None):
+        """
+        Args:
+            session: Сессия БД
+            partitions: Менеджер помесячных партиций таблицы messages (опционально)
+            search_index: Полнотекстовый индекс сообщений (опционально)
+        """
         self.session = session
+        self.partitions = partitions
+        self.search_index = search_index
+    
+    def detached(self) -> Optional["MessageRepository"]:
+        """
+        Копия репозитория с собственным подключением к БД (для записи из другого потока)
+        
+        Returns:
+            Новый MessageRepository или None, если БД в памяти и второе подключение ее не увидит
+        """
+        session = self.session.detached()
+        if session is None:
+            return None
+        partitions = self.partitions.detached(session.engine) if self.partitions else None
+        return MessageRepository(session, partitions)
     
     def create(self, message_dto: MessageDTO) -> Message:
         """Создать сообщение"""
@@ -153,10 +257,124 @@ class MessageRepository(IMessageRepository):
             chat_id=message_dto.chat_id,
             user_id=message_dto.user_id,
             text=message_dto.text,
+            created_at=message_dto.created_at or datetime.now(),
         )
-        return self.session.add(message)
+        if self.partitions:
+            row = message.to_dict()
+            self.partitions.insert([row])
+            message.id = row["id"]
+        else:
+            self.session.add(message)
+        return message
+    
+    def bulk_create(self, message_dtos: List[MessageDTO]) -> int:
+        """Создать пачку сообщений одним запросом"""
+        now = datetime.now()
+        rows = [
+            {
+                "message_id": dto.message_id,
+                "chat_id": dto.chat_id,
+                "user_id": dto.user_id,
+                "text": dto.text,
+                "created_at": dto.created_at or now,
+            }
+            for dto in message_dtos
+        ]
+        if self.partitions:
+            return self.partitions.insert(rows)
+        return self.session.bulk_insert(Message, rows)
     
     def get_by_chat(self, chat_id: int, limit: int = 100) -> List[Message]:
         """Получить сообщения чата"""
+        if self.partitions:
+            return self.partitions.select(limit=limit, chat_id=chat_id)
         return self.session.query(Message).where(chat_id=chat_id).order_by("created_at DESC").limit(limit).all()
+    
+    def get_by_chat_range(self, chat_id: int, start: Optional[datetime] = None,
+                          end: Optional[datetime] = None, limit: int = 100) -> List[Message]:
+        """Получить сообщения чата за интервал [start, end)"""
+        if self.partitions:
+            return self.partitions.select(start=start, end=end, limit=limit, chat_id=chat_id)
+        
+        query = "SELECT * FROM messages WHERE chat_id = ?"
+        params = [chat_id]
+        if start is not None:
+            query += " AND created_at >= ?"
+            params.append(start.isoformat())
+        if end is not None:
+            query += " AND created_at < ?"
+            params.append(end.isoformat())
+        query += f" ORDER BY created_at DESC LIMIT {int(limit)}"
+        return [Message.from_dict(row) for row in self.session.engine.fetchall(query, tuple(params))]
+    
+    def search(self, chat_id: int, query: str, limit: int = 20, offset: int = 0) -> List[dict]:
+        """Полнотекстовый поиск по сообщениям чата (без индекса - LIKE скан)"""
+        if self.search_index:
+            return self.search_index.search(chat_id, query, limit, offset)
+        return like_search(self.session.engine, chat_id, query, limit, offset)
+
 
+class ScheduledJobRepository:
+    """
+    Хранилище заданий планировщика
+    
+    Usage:
+        bot.set_job_store(ScheduledJobRepository(session))
+    """
+    
+    def __init__(self, session: Session):
+        self.session = session
+    
+    def detached(self) -> Optional["ScheduledJobRepository"]:
+        """
+        Копия хранилища с собственным подключением к БД (для записи из другого потока)
+        
+        Returns:
+            Новый ScheduledJobRepository или None, если БД в памяти
+        """
+        session = self.session.detached()
+        return ScheduledJobRepository(session) if session is not None else None
+    
+    def get(self, job_id: str) -> Optional[ScheduledJob]:
+        """Получить задание по ID"""
+        return self.session.get(ScheduledJob, job_id)
+    
+    def save_many(self, rows: List[dict]) -> int:
+        """Сохранить задания пакетным upsert"""
+        return self.session.bulk_upsert(ScheduledJob, rows)
+    
+    def delete_many(self, job_ids: List[str]) -> int:
+        """Удалить задания"""
+        if not job_ids:
+            return 0
+        self.session.engine.executemany(
+            "DELETE FROM scheduled_jobs WHERE job_id = ?", [(job_id,) for job_id in job_ids]
+        )
+        self.session.engine.commit()
+        return len(job_ids)
+    
+    def load_window(self, after_ms: int, after_id: str, until_ms: int, limit: int) -> List[ScheduledJob]:
+        """
+        Задания по возрастанию (next_run_at, job_id) строго после курсора
+        (after_ms, after_id) и не позже until_ms
+        
+        Args:
+            after_ms: Время курсора в миллисекундах
+            after_id: ID задания курсора
+            until_ms: Верхняя граница next_run_at в миллисекундах
+            limit: Размер страницы
+        
+        Returns:
+            Список заданий
+        """
+        query = (
+            "SELECT * FROM scheduled_jobs "
+            "WHERE (next_run_at > ? OR (next_run_at = ? AND job_id > ?)) AND next_run_at <= ? "
+            f"ORDER BY next_run_at, job_id LIMIT {int(limit)}"
+        )
+        rows = self.session.engine.fetchall(query, (after_ms, after_ms, after_id, until_ms))
+        return [ScheduledJob.from_dict(row) for row in rows]
+    
+    def count(self) -> int:
+        """Количество сохраненных заданий"""
+        return self.session.query(ScheduledJob).count()
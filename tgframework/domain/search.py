@@ -0,0 +1,225 @@
+"""
+Полнотекстовый поиск по сообщениям
+
+SQLite: виртуальная таблица FTS5 (messages_fts), заполняется триггерами таблицы сообщений.
+PostgreSQL: генерируемая колонка tsvector в messages с GIN индексом,
+синхронизируется самой БД.
+"""
+
+import html
+import logging
+import re
+from typing import Any, Dict, List
+
+from ..orm import DatabaseEngine
+
+logger = logging.getLogger(__name__)
+
+# Метки подсветки в сниппете: символы Private Use Area не встречаются в обычном
+# тексте и заменяются на <b></b> уже после HTML-экранирования
+_MARK_START = "\ue000"
+_MARK_END = "\ue001"
+
+
+def highlight(snippet: str) -> str:
+    """Экранировать сниппет для HTML и превратить метки подсветки в <b></b>"""
+    return html.escape(snippet).replace(_MARK_START, "<b>").replace(_MARK_END, "</b>")
+
+
+class MessageSearchIndex:
+    """
+    Полнотекстовый индекс по тексту сообщений
+    
+    В SQLite индекс обновляют триггеры AFTER INSERT/UPDATE/DELETE таблицы
+    сообщений (или каждой помесячной партиции), поэтому в него попадают
+    сообщения из любого пути записи: MessageRepository, bulk_create,
+    MessageLogPipeline. Строка индекса имеет rowid сообщения; колонка chat
+    содержит токен чата, и поиск по чату пересекает его список документов
+    со списками слов запроса, а не фильтрует совпадения по всей базе.
+    """
+    
+    def __init__(self, engine: DatabaseEngine, table: str = "messages", language: str = "simple"):
+        """
+        Args:
+            engine: Движок БД
+            table: Таблица сообщений
+            language: Конфигурация текстового поиска PostgreSQL
+        """
+        self.engine = engine
+        self.table = table
+        self.fts_table = f"{table}_fts"
+        self.language = language
+        self.is_postgres = "postgresql" in engine.connection_string
+        self._partition_re = re.compile(rf"^{re.escape(table)}_\d{{4}}_\d{{2}}$")
+    
+    @staticmethod
+    def chat_token(chat_id: int) -> str:
+        """Токен чата в колонке chat ("c123", "cn100123" для отрицательных ID)"""
+        return "c" + str(chat_id).replace("-", "n")
+    
+    def setup(self, rebuild: bool = False):
+        """
+        Создать структуры индекса и триггеры (идемпотентно)
+        
+        При первом создании индекса в SQLite (и при обновлении схемы индекса)
+        существующие сообщения индексируются сразу.
+        
+        Args:
+            rebuild: Переиндексировать уже существующие сообщения (SQLite)
+        """
+        if self.is_postgres:
+            self.engine.execute(
+                f"ALTER TABLE {self.table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                f"GENERATED ALWAYS AS (to_tsvector('{self.language}', coalesce(text, ''))) STORED"
+            )
+            self.engine.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.table}_search_vector "
+                f"ON {self.table} USING GIN (search_vector)"
+            )
+            self.engine.commit()
+            return
+        
+        row = self.engine.fetchone(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (self.fts_table,)
+        )
+        if row and "chat_id UNINDEXED" in row["sql"]:
+            # Индекс прежней схемы (chat_id без индекса, без связи с rowid сообщения)
+            self.engine.execute(f"DROP TABLE {self.fts_table}")
+            row = None
+        
+        self.engine.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_table} USING fts5("
+            f"text, chat, message_id UNINDEXED, user_id UNINDEXED, created_at UNINDEXED, "
+            f"tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        for source in self._source_tables():
+            for trigger in self._triggers(source):
+                self.engine.execute(trigger)
+        
+        if rebuild or not row:
+            self.rebuild()
+        self.engine.commit()
+    
+    def _source_tables(self) -> List[str]:
+        """Таблицы с данными сообщений: сама таблица или ее партиции (view SQLite)"""
+        row = self.engine.fetchone("SELECT type FROM sqlite_master WHERE name = ?", (self.table,))
+        if row and row["type"] == "table":
+            return [self.table]
+        rows = self.engine.fetchall(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?",
+            (f"{self.table}_%",)
+        )
+        return sorted(row["name"] for row in rows if self._partition_re.match(row["name"]))
+    
+    def _triggers(self, source: str) -> List[str]:
+        """
+        Триггеры синхронизации индекса с таблицей source
+        
+        Имена триггеров начинаются с имени таблицы: PartitionManager копирует
+        триггеры последней партиции на новые, заменяя имя таблицы.
+        """
+        columns = "rowid, text, chat, message_id, user_id, created_at"
+        
+        def values(row: str) -> str:
+            return (f"{row}.id, {row}.text, 'c' || replace({row}.chat_id, '-', 'n'), "
+                    f"{row}.message_id, {row}.user_id, {row}.created_at")
+        
+        return [
+            f"CREATE TRIGGER IF NOT EXISTS {source}_fts_insert AFTER INSERT ON {source} "
+            f"WHEN NEW.text IS NOT NULL BEGIN\n"
+            f"INSERT INTO {self.fts_table} ({columns}) VALUES ({values('NEW')});\n"
+            f"END",
+            f"CREATE TRIGGER IF NOT EXISTS {source}_fts_delete AFTER DELETE ON {source} BEGIN\n"
+            f"DELETE FROM {self.fts_table} WHERE rowid = OLD.id;\n"
+            f"END",
+            f"CREATE TRIGGER IF NOT EXISTS {source}_fts_update "
+            f"AFTER UPDATE OF id, text, chat_id, message_id, user_id, created_at ON {source} BEGIN\n"
+            f"DELETE FROM {self.fts_table} WHERE rowid = OLD.id;\n"
+            f"INSERT INTO {self.fts_table} ({columns}) SELECT {values('NEW')} WHERE NEW.text IS NOT NULL;\n"
+            f"END",
+        ]
+    
+    def rebuild(self):
+        """Заново проиндексировать все сообщения (SQLite)"""
+        if self.is_postgres:
+            return
+        
+        self.engine.execute(f"DELETE FROM {self.fts_table}")
+        self.engine.execute(
+            f"INSERT INTO {self.fts_table} (rowid, text, chat, message_id, user_id, created_at) "
+            f"SELECT id, text, 'c' || replace(chat_id, '-', 'n'), message_id, user_id, created_at "
+            f"FROM {self.table} WHERE text IS NOT NULL"
+        )
+        self.engine.commit()
+    
+    def search(self, chat_id: int, query: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Найти сообщения чата, отсортированные по релевантности
+        
+        Args:
+            chat_id: ID чата
+            query: Поисковый запрос (слова через пробел, все должны встретиться)
+            limit: Размер страницы
+            offset: Смещение
+        
+        Returns:
+            Строки {message_id, chat_id, user_id, text, created_at, snippet, rank};
+            snippet - HTML-экранированный фрагмент с совпадениями в <b></b>
+        """
+        if self.is_postgres:
+            rows = self.engine.fetchall(
+                f"SELECT message_id, chat_id, user_id, text, created_at, "
+                f"ts_headline('{self.language}', coalesce(text, ''), q, ?) AS snippet, "
+                f"ts_rank(search_vector, q) AS rank "
+                f"FROM {self.table}, websearch_to_tsquery('{self.language}', ?) AS q "
+                f"WHERE chat_id = ? AND search_vector @@ q "
+                f"ORDER BY rank DESC, created_at DESC LIMIT {int(limit)} OFFSET {int(offset)}",
+                (f"StartSel={_MARK_START}, StopSel={_MARK_END}, MaxFragments=1, MaxWords=20", query, chat_id)
+            )
+        else:
+            match = self._to_fts5_query(query)
+            if not match:
+                return []
+            
+            rows = self.engine.fetchall(
+                f"SELECT message_id, user_id, text, created_at, "
+                f"snippet({self.fts_table}, 0, ?, ?, '...', 16) AS snippet, "
+                f"bm25({self.fts_table}, 1.0, 0.0) AS rank "
+                f"FROM {self.fts_table} "
+                f"WHERE {self.fts_table} MATCH ? "
+                f"ORDER BY rank, created_at DESC LIMIT {int(limit)} OFFSET {int(offset)}",
+                (_MARK_START, _MARK_END, f'chat : "{self.chat_token(chat_id)}" AND text : ({match})')
+            )
+        
+        for row in rows:
+            row["chat_id"] = chat_id
+            row["snippet"] = highlight(row["snippet"] or "")
+        return rows
+    
+    @staticmethod
+    def _to_fts5_query(query: str) -> str:
+        """Экранировать пользовательский запрос: каждое слово как отдельная фраза"""
+        tokens = re.findall(r"\w+", query, flags=re.UNICODE)
+        return " ".join('"' + token.replace('"', '""') + '"' for token in tokens)
+
+
+def like_search(engine: DatabaseEngine, chat_id: int, query: str, limit: int = 20,
+                offset: int = 0, table: str = "messages") -> List[Dict[str, Any]]:
+    """
+    Поиск через LIKE без индекса (запасной вариант, полный скан чата)
+    
+    Returns:
+        Строки в формате MessageSearchIndex.search
+    """
+    pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    rows = engine.fetchall(
+        f"SELECT message_id, chat_id, user_id, text, created_at FROM {table} "
+        f"WHERE chat_id = ? AND text LIKE ? ESCAPE '\\' "
+        f"ORDER BY created_at DESC LIMIT {int(limit)} OFFSET {int(offset)}",
+        (chat_id, pattern)
+    )
+    for row in rows:
+        row["snippet"] = highlight(row["text"] or "")
+        row["rank"] = 0.0
+    return rows
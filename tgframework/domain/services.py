@@ -4,7 +4,7 @@ Domain сервисы (бизнес-логика)
 
 from typing import List, Optional
 from .models import User, Chat, Message
-from .dto import UserDTO, CreateUserDTO, UpdateUserDTO, ChatDTO, MessageDTO
+from .dto import UserDTO, CreateUserDTO, UpdateUserDTO, ChatDTO, MessageDTO, SearchHitDTO, SearchPageDTO
 from .repositories import UserRepository, ChatRepository, MessageRepository
 
 
@@ -66,6 +66,7 @@ class UserService:
             language_code=user.language_code,
             is_bot=user.is_bot,
             is_admin=user.is_admin,
+            last_seen_at=user.last_seen_at,
             created_at=user.created_at,
             updated_at=user.updated_at,
         )
@@ -96,6 +97,7 @@ class ChatService:
             chat_type=chat.chat_type,
             title=chat.title,
             username=chat.username,
+            last_seen_at=chat.last_seen_at,
             created_at=chat.created_at,
             updated_at=chat.updated_at,
         )
@@ -117,6 +119,37 @@ class MessageService:
         messages = self.repository.get_by_chat(chat_id, limit)
         return [self._to_dto(message) for message in messages]
     
+    def search(self, chat_id: int, query: str, page: int = 1, per_page: int = 20) -> SearchPageDTO:
+        """
+        Найти сообщения чата по тексту
+        
+        Args:
+            chat_id: ID чата
+            query: Поисковый запрос
+            page: Номер страницы (с 1)
+            per_page: Размер страницы
+        
+        Returns:
+            Страница результатов, отсортированных по релевантности
+        """
+        page = max(1, page)
+        # Берем на одну строку больше, чтобы узнать о следующей странице без COUNT(*)
+        rows = self.repository.search(chat_id, query, limit=per_page + 1, offset=(page - 1) * per_page)
+        
+        hits = [
+            SearchHitDTO(
+                message_id=row["message_id"],
+                chat_id=row["chat_id"],
+                user_id=row["user_id"],
+                text=row["text"],
+                snippet=row.get("snippet"),
+                rank=row.get("rank") or 0.0,
+                created_at=Message.get_fields()["created_at"].from_db_value(row.get("created_at")),
+            )
+            for row in rows[:per_page]
+        ]
+        return SearchPageDTO(query=query, page=page, per_page=per_page, has_next=len(rows) > per_page, hits=hits)
+    
     def _to_dto(self, message: Message) -> MessageDTO:
         """Преобразовать модель в DTO"""
         return MessageDTO(
@@ -2,17 +2,39 @@
 Infrastructure слой - внешние сервисы, утилиты
 """
 
-from .rate_limiter import RateLimiter, TelegramRateLimiter
-from .utils import get_user_info, get_chat_info, format_text, parse_command, escape_html, escape_markdown
+from .rate_limiter import RateLimiter, TelegramRateLimiter, SlidingWindowCounter
+from .cache import TTLCache
+from .dedup import UpdateDeduplicator, SQLiteUpdateDeduplicator
+from .journal import UpdateJournal, JournalReader, JournalReplayer
+from .file_cache import FileIdCache, SQLiteFileIdCache
+from .utils import (
+    get_user_info,
+    get_chat_info,
+    format_text,
+    parse_command,
+    escape_html,
+    escape_markdown,
+    extract_user_chat,
+)
 
 __all__ = [
     "RateLimiter",
     "TelegramRateLimiter",
+    "SlidingWindowCounter",
+    "TTLCache",
+    "UpdateDeduplicator",
+    "SQLiteUpdateDeduplicator",
+    "UpdateJournal",
+    "JournalReader",
+    "JournalReplayer",
+    "FileIdCache",
+    "SQLiteFileIdCache",
     "get_user_info",
     "get_chat_info",
     "format_text",
     "parse_command",
     "escape_html",
     "escape_markdown",
+    "extract_user_chat",
 ]
 
@@ -0,0 +1,174 @@
+"""
+Кэш в памяти: LRU с TTL, отрицательным кэшированием и защитой от stampede
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Ограниченный LRU кэш с временем жизни записей"""
+    
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0,
+                 negative_ttl: Optional[float] = 30.0):
+        """
+        Инициализация кэша
+        
+        Args:
+            maxsize: Максимальное количество записей
+            ttl: Время жизни записи в секундах
+            negative_ttl: Время жизни отрицательной записи (None значение),
+                None - не кэшировать отсутствие значения
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        
+        # Метрики
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.evictions = 0
+        self.loads = 0
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Получить значение из кэша
+        
+        Args:
+            key: Ключ
+            default: Значение по умолчанию при промахе
+        
+        Returns:
+            Закэшированное значение или default
+        """
+        value = self._lookup(key)
+        if value is _MISSING:
+            return default
+        return value
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Положить значение в кэш
+        
+        Args:
+            key: Ключ
+            value: Значение (None сохраняется как отрицательная запись)
+            ttl: Время жизни (по умолчанию ttl кэша)
+        """
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        if ttl is None or ttl <= 0:
+            self.invalidate(key)
+            return
+        
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+    
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Получить значение или загрузить его через loader
+        
+        Одновременные промахи по одному ключу выполняют loader один раз.
+        
+        Args:
+            key: Ключ
+            loader: Функция загрузки значения
+        
+        Returns:
+            Значение
+        """
+        value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+        
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        
+        with key_lock:
+            # Пока ждали блокировку, значение мог загрузить другой поток
+            value = self._peek(key)
+            if value is not _MISSING:
+                return value
+            
+            try:
+                value = loader()
+                self.loads += 1
+                self.set(key, value)
+                return value
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+    
+    def invalidate(self, key: Hashable):
+        """Удалить запись из кэша"""
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def clear(self):
+        """Очистить кэш"""
+        with self._lock:
+            self._data.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Получить статистику кэша
+        
+        Returns:
+            Словарь с метриками попаданий и промахов
+        """
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "negative_hits": self.negative_hits,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+            "miss_rate": self.misses / total if total else 0.0,
+        }
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return self._peek(key) is not _MISSING
+    
+    def _peek(self, key: Hashable) -> Any:
+        """Получить значение без учета в метриках"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return _MISSING
+            return value
+    
+    def _lookup(self, key: Hashable) -> Any:
+        """Получить значение с учетом метрик и LRU порядка"""
+        with self._lock:
+            value = self._peek(key)
+            if value is _MISSING:
+                self.misses += 1
+                return _MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            if value is None:
+                self.negative_hits += 1
+            return value
@@ -0,0 +1,247 @@
+"""
+Дедупликация update по update_id
+
+Telegram повторно доставляет webhook update при таймауте или ответе 5xx,
+а после перезапуска polling может получить уже обработанную пачку.
+
+Проверка (is_duplicate) только занимает update_id на время обработки;
+обработанным он становится после complete. Занятый, но не завершенный
+update (процесс упал во время обработки) при повторной доставке не
+отбрасывается.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDeduplicator:
+    """
+    Окно последних update_id в памяти процесса
+    
+    Кольцевой буфер (deque) хранит порядок поступления, словарь {update_id: время} -
+    быструю проверку. ID вытесняется, когда окно заполнено или истек ttl.
+    Окно живет в памяти процесса и после его падения пусто, поэтому
+    отдельная отметка завершения здесь не нужна.
+    """
+    
+    def __init__(self, window: int = 10000, ttl: float = 3600.0):
+        """
+        Args:
+            window: Максимальное количество запоминаемых update_id
+            ttl: Сколько секунд помнить update_id
+        """
+        self.window = window
+        self.ttl = ttl
+        self._order: Deque[Tuple[int, float]] = deque()
+        self._seen: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        
+        # Метрики
+        self.checked = 0
+        self.duplicates = 0
+    
+    def is_duplicate(self, update_id: int) -> bool:
+        """
+        Проверить update_id и занять его на время обработки
+        
+        Args:
+            update_id: ID update
+        
+        Returns:
+            True если update уже встречался в окне
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.checked += 1
+            self._evict(now)
+            if update_id in self._seen:
+                self.duplicates += 1
+                return True
+            
+            self._seen[update_id] = now
+            self._order.append((update_id, now))
+            return False
+    
+    def complete(self, update_id: int):
+        """
+        Отметить update как обработанный
+        
+        Args:
+            update_id: ID update, занятый is_duplicate
+        """
+        # Окно в памяти не переживает падение процесса: занятый ID уже равен обработанному
+        pass
+    
+    def release(self, update_id: int):
+        """
+        Освободить update_id, обработка которого не начиналась (повторная доставка будет обработана)
+        
+        Бот не вызывает release при ошибке обработчика: его побочные эффекты уже могли произойти.
+        
+        Args:
+            update_id: ID update, занятый is_duplicate
+        """
+        with self._lock:
+            # Запись в _order остается и пропускается при вытеснении (см. _evict)
+            self._seen.pop(update_id, None)
+    
+    def _evict(self, now: float):
+        """Удалить устаревшие и не помещающиеся в окно ID"""
+        while self._order and (len(self._order) >= self.window or now - self._order[0][1] > self.ttl):
+            update_id, seen_at = self._order.popleft()
+            # Освобожденный и занятый заново ID имеет в _order более позднюю запись
+            if self._seen.get(update_id) == seen_at:
+                del self._seen[update_id]
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Получить метрики
+        
+        Returns:
+            Словарь с метриками
+        """
+        return {
+            "size": len(self._seen),
+            "checked": self.checked,
+            "duplicates": self.duplicates,
+        }
+
+
+class SQLiteUpdateDeduplicator(UpdateDeduplicator):
+    """
+    Общее окно update_id для нескольких процессов на одной машине
+    
+    Каждый процесс открывает один и тот же файл SQLite; проверка и запись
+    выполняются одним INSERT OR IGNORE по первичному ключу. Локальное окно
+    в памяти отсекает повторы внутри процесса без обращения к файлу.
+    
+    Запись сначала помечается как занятая процессом (pid), complete отмечает ее
+    обработанной. Занятую запись можно перехватить, если процесс-владелец
+    завершился или прошло claim_timeout секунд.
+    """
+    
+    def __init__(self, path: str, key: str = "default", window: int = 10000,
+                 ttl: float = 3600.0, prune_every: int = 1000, claim_timeout: float = 300.0):
+        """
+        Args:
+            path: Путь к файлу SQLite
+            key: Ключ бота (update_id уникальны только в пределах бота)
+            window: Размер локального окна в памяти
+            ttl: Сколько секунд помнить update_id
+            prune_every: Как часто (в новых update) удалять устаревшие записи
+            claim_timeout: Через сколько секунд незавершенная обработка считается брошенной
+        """
+        super().__init__(window, ttl)
+        self.path = path
+        self.key = key
+        self.prune_every = prune_every
+        self.claim_timeout = claim_timeout
+        self._inserted = 0
+        self._pid = os.getpid()
+        
+        # Метрики
+        self.reclaimed = 0
+        
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS processed_updates ("
+            "bot_key TEXT NOT NULL, "
+            "update_id INTEGER NOT NULL, "
+            "seen_at REAL NOT NULL, "
+            "PRIMARY KEY (bot_key, update_id)) WITHOUT ROWID"
+        )
+        # Файл, созданный предыдущей версией: все записи в нем - обработанные update
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(processed_updates)")}
+        if "owner_pid" not in columns:
+            self._conn.execute("ALTER TABLE processed_updates ADD COLUMN owner_pid INTEGER")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_processed_updates_seen_at ON processed_updates (seen_at)")
+    
+    def is_duplicate(self, update_id: int) -> bool:
+        if super().is_duplicate(update_id):
+            return True
+        
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO processed_updates (bot_key, update_id, seen_at, owner_pid) "
+                "VALUES (?, ?, ?, ?)",
+                (self.key, update_id, now, self._pid)
+            )
+            if cursor.rowcount == 0 and not self._reclaim(update_id, now):
+                self.duplicates += 1
+                # В локальном окне остается: повтор отсекается без обращения к файлу
+                return True
+            
+            self._inserted += 1
+            if self._inserted % self.prune_every == 0:
+                self._conn.execute("DELETE FROM processed_updates WHERE seen_at < ?", (now - self.ttl,))
+        return False
+    
+    def _reclaim(self, update_id: int, now: float) -> bool:
+        """Перехватить незавершенную запись упавшего процесса"""
+        row = self._conn.execute(
+            "SELECT owner_pid, seen_at FROM processed_updates WHERE bot_key = ? AND update_id = ?",
+            (self.key, update_id)
+        ).fetchone()
+        if row is None or row[0] is None:
+            return False
+        owner_pid, claimed_at = row
+        if now - claimed_at < self.claim_timeout and self._process_alive(owner_pid):
+            return False
+        
+        cursor = self._conn.execute(
+            "UPDATE processed_updates SET seen_at = ?, owner_pid = ? "
+            "WHERE bot_key = ? AND update_id = ? AND owner_pid = ? AND seen_at = ?",
+            (now, self._pid, self.key, update_id, owner_pid, claimed_at)
+        )
+        if cursor.rowcount:
+            self.reclaimed += 1
+            logger.warning(f"Update {update_id} was not completed by process {owner_pid}, processing it again")
+        return cursor.rowcount > 0
+    
+    def _process_alive(self, pid: int) -> bool:
+        """Жив ли процесс pid (на Windows проверка недоступна, владелец считается живым)"""
+        if pid == self._pid:
+            # Запись этого же процесса, не отмеченная в локальном окне: обработка не завершилась
+            return False
+        if os.name == "nt":
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+    
+    def complete(self, update_id: int):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE processed_updates SET owner_pid = NULL, seen_at = ? "
+                "WHERE bot_key = ? AND update_id = ? AND owner_pid = ?",
+                (time.time(), self.key, update_id, self._pid)
+            )
+    
+    def release(self, update_id: int):
+        super().release(update_id)
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM processed_updates WHERE bot_key = ? AND update_id = ? AND owner_pid = ?",
+                (self.key, update_id, self._pid)
+            )
+    
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "reclaimed": self.reclaimed}
+    
+    def close(self):
+        """Закрыть соединение с БД"""
+        self._conn.close()
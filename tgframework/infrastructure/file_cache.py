@@ -0,0 +1,171 @@
+"""
+Кэш file_id загруженных файлов
+
+Telegram возвращает file_id для каждого загруженного файла; повторная
+отправка по file_id не передает содержимое заново. Кэш сопоставляет хэш
+содержимого и тип медиа с file_id.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class FileIdCache:
+    """
+    Кэш file_id в памяти процесса (LRU)
+    
+    Ключ - (хэш содержимого, тип медиа): file_id документа не всегда можно
+    отправить как фото и наоборот.
+    """
+    
+    def __init__(self, max_size: int = 100000):
+        """
+        Args:
+            max_size: Максимальное количество записей
+        """
+        self.max_size = max_size
+        self._items: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        # Метрики
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def get(self, digest: str, kind: str) -> Optional[str]:
+        """
+        Получить file_id
+        
+        Args:
+            digest: Хэш содержимого (InputFile.digest)
+            kind: Тип медиа ("photo", "document", ...)
+        
+        Returns:
+            file_id или None
+        """
+        with self._lock:
+            file_id = self._items.get((digest, kind))
+            if file_id is not None:
+                self._items.move_to_end((digest, kind))
+        if file_id is None:
+            file_id = self._load(digest, kind)
+            if file_id is not None:
+                self._remember(digest, kind, file_id)
+        
+        if file_id is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return file_id
+    
+    def set(self, digest: str, kind: str, file_id: str):
+        """Запомнить file_id"""
+        self._remember(digest, kind, file_id)
+        self._store(digest, kind, file_id)
+    
+    def discard(self, digest: str, kind: str):
+        """Забыть file_id (Telegram его больше не принимает)"""
+        with self._lock:
+            self._items.pop((digest, kind), None)
+        self._delete(digest, kind)
+        self.invalidations += 1
+    
+    def _remember(self, digest: str, kind: str, file_id: str):
+        with self._lock:
+            self._items[(digest, kind)] = file_id
+            self._items.move_to_end((digest, kind))
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+    
+    def _load(self, digest: str, kind: str) -> Optional[str]:
+        """Прочитать из постоянного хранилища"""
+        return None
+    
+    def _store(self, digest: str, kind: str, file_id: str):
+        """Записать в постоянное хранилище"""
+        pass
+    
+    def _delete(self, digest: str, kind: str):
+        """Удалить из постоянного хранилища"""
+        pass
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Получить метрики
+        
+        Returns:
+            Словарь с метриками
+        """
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+class SQLiteFileIdCache(FileIdCache):
+    """
+    Постоянный кэш file_id в SQLite
+    
+    Переживает перезапуск бота и общий для процессов на одной машине.
+    file_id привязан к боту, поэтому записи разделяются по key.
+    """
+    
+    def __init__(self, path: str, key: str = "default", max_size: int = 100000):
+        """
+        Args:
+            path: Путь к файлу SQLite
+            key: Ключ бота (file_id действителен только для своего бота)
+            max_size: Размер кэша в памяти перед SQLite
+        """
+        super().__init__(max_size)
+        self.path = path
+        self.key = key
+        
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS file_ids ("
+            "bot_key TEXT NOT NULL, "
+            "digest TEXT NOT NULL, "
+            "kind TEXT NOT NULL, "
+            "file_id TEXT NOT NULL, "
+            "created_at REAL NOT NULL, "
+            "PRIMARY KEY (bot_key, digest, kind)) WITHOUT ROWID"
+        )
+    
+    def _load(self, digest: str, kind: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT file_id FROM file_ids WHERE bot_key = ? AND digest = ? AND kind = ?",
+                (self.key, digest, kind)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def _store(self, digest: str, kind: str, file_id: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO file_ids (bot_key, digest, kind, file_id, created_at) VALUES (?, ?, ?, ?, ?)",
+                (self.key, digest, kind, file_id, time.time())
+            )
+    
+    def _delete(self, digest: str, kind: str):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM file_ids WHERE bot_key = ? AND digest = ? AND kind = ?",
+                (self.key, digest, kind)
+            )
+    
+    def close(self):
+        """Закрыть соединение с БД"""
+        self._conn.close()
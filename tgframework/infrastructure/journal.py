@@ -0,0 +1,229 @@
+"""
+Журнал входящих update (append-only) и воспроизведение
+
+Формат записи: заголовок <длина payload: uint32, crc32: uint32, время: float64>
+и payload - компактный JSON update. Журнал разбит на сегменты
+updates-00000001.journal, updates-00000002.journal, ... Новый сегмент
+начинается, когда текущий превышает segment_size.
+
+Неполная или поврежденная запись в конце сегмента (падение во время записи)
+при чтении игнорируется.
+"""
+
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct("<IId")
+SEGMENT_PATTERN = "updates-*.journal"
+
+
+def _segment_paths(directory: Path) -> List[Path]:
+    """Сегменты журнала в порядке записи"""
+    return sorted(directory.glob(SEGMENT_PATTERN))
+
+
+class UpdateJournal:
+    """
+    Запись update в журнал
+    
+    Usage:
+        journal = UpdateJournal("data/journal")
+        bot.set_journal(journal)
+    """
+    
+    def __init__(self, directory: Union[str, Path], segment_size: int = 64 * 1024 * 1024,
+                 fsync: bool = False):
+        """
+        Args:
+            directory: Директория журнала
+            segment_size: Максимальный размер сегмента в байтах
+            fsync: Сбрасывать данные на диск после каждой записи
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+        self.fsync = fsync
+        
+        segments = _segment_paths(self.directory)
+        self._segment_no = int(segments[-1].stem.split("-")[1]) if segments else 0
+        self._file = None
+        self._size = 0
+        self._lock = threading.Lock()
+        
+        # Метрики
+        self.records = 0
+        self.bytes_written = 0
+    
+    def _rotate(self):
+        """Закрыть текущий сегмент и открыть следующий"""
+        if self._file:
+            self._file.close()
+        self._segment_no += 1
+        path = self.directory / f"updates-{self._segment_no:08d}.journal"
+        self._file = open(path, "ab", buffering=1024 * 1024)
+        self._size = self._file.tell()
+    
+    def append(self, update: Dict[str, Any], timestamp: Optional[float] = None):
+        """
+        Записать update
+        
+        Args:
+            update: Update от Telegram
+            timestamp: Время получения (по умолчанию текущее)
+        """
+        payload = json.dumps(update, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        record = HEADER.pack(len(payload), zlib.crc32(payload), timestamp or time.time()) + payload
+        
+        with self._lock:
+            if self._file is None or self._size + len(record) > self.segment_size:
+                self._rotate()
+            self._file.write(record)
+            self._size += len(record)
+            self.records += 1
+            self.bytes_written += len(record)
+            if self.fsync:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+    
+    def flush(self):
+        """Сбросить буфер записи в файл"""
+        with self._lock:
+            if self._file:
+                self._file.flush()
+    
+    def close(self):
+        """Закрыть журнал"""
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+class JournalReader:
+    """Чтение журнала через mmap"""
+    
+    def __init__(self, directory: Union[str, Path]):
+        """
+        Args:
+            directory: Директория журнала
+        """
+        self.directory = Path(directory)
+        
+        # Метрики
+        self.corrupted = 0
+    
+    def __iter__(self) -> Iterator[Tuple[float, Dict[str, Any]]]:
+        for timestamp, payload in self.iter_raw():
+            yield timestamp, json.loads(payload)
+    
+    def iter_raw(self) -> Iterator[Tuple[float, bytes]]:
+        """
+        Перебрать записи без разбора JSON
+        
+        Yields:
+            (время получения, payload в байтах)
+        """
+        for path in _segment_paths(self.directory):
+            if path.stat().st_size == 0:
+                continue
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield from self._read_segment(path, data)
+    
+    def _read_segment(self, path: Path, data: mmap.mmap) -> Iterator[Tuple[float, bytes]]:
+        """Прочитать записи одного сегмента до конца или первой поврежденной записи"""
+        header_size = HEADER.size
+        unpack_from = HEADER.unpack_from
+        end = len(data)
+        position = 0
+        
+        while position + header_size <= end:
+            length, checksum, timestamp = unpack_from(data, position)
+            start = position + header_size
+            position = start + length
+            if position > end:
+                break
+            
+            payload = data[start:position]
+            if zlib.crc32(payload) != checksum:
+                self.corrupted += 1
+                logger.warning(f"Corrupted journal record in {path.name} at byte {start - header_size}")
+                return
+            yield timestamp, payload
+        
+        if position != end:
+            logger.warning(f"Truncated journal record at the end of {path.name}")
+
+
+class JournalReplayer:
+    """
+    Воспроизведение журнала через обработчик update
+    
+    Usage:
+        replayer = JournalReplayer("data/journal", bot._process_update)
+        stats = await replayer.replay(speed=10.0)
+    """
+    
+    def __init__(self, directory: Union[str, Path],
+                 handler: Callable[[Dict[str, Any]], Awaitable[Any]]):
+        """
+        Args:
+            directory: Директория журнала
+            handler: Асинхронная функция обработки update
+        """
+        self.reader = JournalReader(directory)
+        self.handler = handler
+    
+    async def replay(self, speed: Optional[float] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Воспроизвести журнал
+        
+        Args:
+            speed: None - максимально быстро, 1.0 - в записанном темпе,
+                   2.0 - в два раза быстрее записанного и т.д.
+            limit: Максимальное количество update
+        
+        Returns:
+            Статистика: количество update, ошибки, время и скорость
+        """
+        count = 0
+        errors = 0
+        first_timestamp = None
+        started = time.perf_counter()
+        
+        for timestamp, update in self.reader:
+            if limit is not None and count >= limit:
+                break
+            
+            if speed:
+                if first_timestamp is None:
+                    first_timestamp = timestamp
+                delay = (timestamp - first_timestamp) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            
+            try:
+                await self.handler(update)
+            except Exception as e:
+                errors += 1
+                logger.error(f"Error replaying update {update.get('update_id')}: {e}")
+            count += 1
+        
+        elapsed = time.perf_counter() - started
+        return {
+            "updates": count,
+            "errors": errors,
+            "corrupted": self.reader.corrupted,
+            "elapsed": elapsed,
+            "updates_per_second": count / elapsed if elapsed else 0.0,
+        }
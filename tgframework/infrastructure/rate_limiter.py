@@ -3,8 +3,9 @@ Rate limiter для защиты от превышения лимитов Telegr
 """
 
 import time
-from typing import Dict, Optional
-from collections import defaultdict
+from array import array
+from typing import Dict, Hashable, Optional
+from collections import OrderedDict, defaultdict
 import asyncio
 
 
@@ -67,3 +68,80 @@ class TelegramRateLimiter:
         if user_id:
             await self.user_limiter.wait(str(user_id))
 
+
+class SlidingWindowCounter:
+    """
+    Счетчики событий по ключам в скользящем окне
+    
+    Скользящее окно приближается двумя соседними окнами фиксированной длины:
+    оценка = previous * (доля предыдущего окна внутри скользящего) + current.
+    Счетчики хранятся в массивах фиксированного размера capacity: ключ
+    занимает слот, при нехватке слотов переиспользуется слот ключа, который
+    дольше всех не встречался (его окно обычно уже истекло).
+    """
+    
+    def __init__(self, window: float = 1.0, capacity: int = 100000):
+        """
+        Args:
+            window: Длина окна в секундах
+            capacity: Максимальное количество одновременно отслеживаемых ключей
+        """
+        self.window = window
+        self.capacity = capacity
+        self._slots: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._free = list(range(capacity - 1, -1, -1))
+        # Начало текущего окна, счетчики текущего и предыдущего окна по слотам
+        self._start = array("d", bytes(8 * capacity))
+        self._current = array("I", bytes(4 * capacity))
+        self._previous = array("I", bytes(4 * capacity))
+        
+        # Метрики
+        self.evictions = 0
+    
+    def _slot(self, key: Hashable, now: float) -> int:
+        slot = self._slots.get(key)
+        if slot is not None:
+            self._slots.move_to_end(key)
+            return slot
+        
+        if self._free:
+            slot = self._free.pop()
+        else:
+            _, slot = self._slots.popitem(last=False)
+            if now - self._start[slot] < 2 * self.window:
+                # Ключ еще активен: capacity мала для текущей нагрузки
+                self.evictions += 1
+        self._slots[key] = slot
+        self._start[slot] = now
+        self._current[slot] = 0
+        self._previous[slot] = 0
+        return slot
+    
+    def hit(self, key: Hashable, now: Optional[float] = None) -> float:
+        """
+        Учесть событие
+        
+        Args:
+            key: Ключ (ID пользователя, чата)
+            now: Время time.monotonic() (по умолчанию текущее)
+        
+        Returns:
+            Оценка количества событий ключа за последнее окно, включая это
+        """
+        if now is None:
+            now = time.monotonic()
+        slot = self._slot(key, now)
+        
+        elapsed = now - self._start[slot]
+        if elapsed >= self.window:
+            windows = int(elapsed // self.window)
+            self._previous[slot] = self._current[slot] if windows == 1 else 0
+            self._current[slot] = 0
+            self._start[slot] += windows * self.window
+            elapsed -= windows * self.window
+        
+        self._current[slot] += 1
+        return self._previous[slot] * (1 - elapsed / self.window) + self._current[slot]
+    
+    def __len__(self) -> int:
+        return len(self._slots)
@@ -2,7 +2,7 @@
 Утилиты для работы с ботом
 """
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 
 def get_user_info(user: Dict[str, Any]) -> Dict[str, Any]:
@@ -117,3 +117,45 @@ def parse_command(text: str) -> tuple[str, str]:
     
     return command, args
 
+
+
+# Типы update, в которых есть отправитель и/или чат
+_UPDATE_ENTITY_KEYS = (
+    "message",
+    "edited_message",
+    "channel_post",
+    "edited_channel_post",
+    "callback_query",
+    "inline_query",
+    "chosen_inline_result",
+    "shipping_query",
+    "pre_checkout_query",
+    "poll_answer",
+    "my_chat_member",
+    "chat_member",
+    "chat_join_request",
+)
+
+
+def extract_user_chat(update: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Извлечь отправителя и чат из update любого типа
+    
+    Args:
+        update: Update от Telegram
+    
+    Returns:
+        Кортеж (пользователь, чат), отсутствующие элементы равны None
+    """
+    for key in _UPDATE_ENTITY_KEYS:
+        payload = update.get(key)
+        if payload is None:
+            continue
+        
+        user = payload.get("from") or payload.get("user")
+        chat = payload.get("chat")
+        if chat is None and key == "callback_query":
+            chat = (payload.get("message") or {}).get("chat")
+        return user, chat
+    
+    return None, None
@@ -7,6 +7,7 @@ from .models import Model, Field, IntegerField, StringField, BooleanField, DateT
 from .query import QueryBuilder
 from .session import Session
 from .migrations import Migration, MigrationManager
+from .partitioning import PartitionManager, PartitionedTableMigration
 
 __all__ = [
     "DatabaseEngine",
@@ -23,5 +24,7 @@ __all__ = [
     "Session",
     "Migration",
     "MigrationManager",
+    "PartitionManager",
+    "PartitionedTableMigration",
 ]
 
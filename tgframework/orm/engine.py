@@ -32,6 +32,11 @@ class DatabaseEngine(ABC):
         """Выполнить запрос"""
         pass
     
+    @abstractmethod
+    def executemany(self, query: str, params_seq: List[Tuple]) -> Any:
+        """Выполнить запрос для набора параметров"""
+        pass
+    
     @abstractmethod
     def fetchone(self, query: str, params: Tuple = ()) -> Optional[Dict]:
         """Получить одну строку"""
@@ -82,6 +87,15 @@ class SQLiteEngine(DatabaseEngine):
         cursor.execute(query, params)
         return cursor
     
+    def executemany(self, query: str, params_seq: List[Tuple]) -> sqlite3.Cursor:
+        """Выполнить запрос для набора параметров"""
+        if not self.connection:
+            self.connect()
+        cursor = self.connection.cursor()
+        logger.debug(f"Executing many: {query}")
+        cursor.executemany(query, params_seq)
+        return cursor
+    
     def fetchone(self, query: str, params: Tuple = ()) -> Optional[Dict]:
         """Получить одну строку"""
         cursor = self.execute(query, params)
@@ -161,6 +175,16 @@ class PostgreSQLEngine(DatabaseEngine):
         cursor.execute(query, params)
         return cursor
     
+    def executemany(self, query: str, params_seq: List[Tuple]) -> Any:
+        """Выполнить запрос для набора параметров"""
+        if not self.connection:
+            self.connect()
+        cursor = self.connection.cursor()
+        query = query.replace("?", "%s")
+        logger.debug(f"Executing many: {query}")
+        self.extras.execute_batch(cursor, query, params_seq)
+        return cursor
+    
     def fetchone(self, query: str, params: Tuple = ()) -> Optional[Dict]:
         """Получить одну строку"""
         cursor = self.execute(query, params)
@@ -153,6 +153,7 @@ class Model(metaclass=ModelMeta):
     
     _fields: Dict[str, Field] = {}
     _table_name: str = ""
+    _partition_by: Optional[str] = None  # Колонка времени для PartitionManager
     _session: Optional['Session'] = None
     
     def __init__(self, **kwargs):
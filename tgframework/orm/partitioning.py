@@ -0,0 +1,742 @@
+"""
+Партиционирование таблиц по времени (помесячно)
+
+PostgreSQL: нативное декларативное партиционирование (PARTITION BY RANGE).
+SQLite: отдельная таблица на каждый месяц ({table}_YYYY_MM) и view {table}
+с UNION ALL по всем партициям, чтобы обычные запросы через модель продолжали работать.
+INSTEAD OF триггеры view направляют INSERT/UPDATE/DELETE в партицию месяца строки,
+ID выдает общая для всех партиций последовательность {table}_sequence. Триггеры
+таблицы (например, индекса MessageSearchIndex) переносятся на партиции, новая
+партиция получает триггеры последней.
+"""
+
+import gzip
+import json
+import logging
+import re
+import weakref
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from .engine import DatabaseEngine
+from .migrations import Migration
+from .models import Model
+
+logger = logging.getLogger(__name__)
+
+
+def _month_start(value: datetime) -> datetime:
+    """Начало месяца"""
+    return datetime(value.year, value.month, 1)
+
+
+def _next_month(value: datetime) -> datetime:
+    """Начало следующего месяца"""
+    if value.month == 12:
+        return datetime(value.year + 1, 1, 1)
+    return datetime(value.year, value.month + 1, 1)
+
+
+def _add_months(value: datetime, months: int) -> datetime:
+    """Сдвинуть начало месяца на months (может быть отрицательным)"""
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+class PartitionManager:
+    """Менеджер помесячных партиций таблицы модели"""
+    
+    def __init__(self, engine: DatabaseEngine, model: Type[Model], column: Optional[str] = None,
+                 archive_dir: Optional[str] = None):
+        """
+        Args:
+            engine: Движок БД
+            model: Модель партиционированной таблицы
+            column: Колонка времени (по умолчанию model._partition_by или created_at)
+            archive_dir: Директория для архивов удаляемых партиций
+        """
+        self.engine = engine
+        self.model = model
+        self.table = model.get_table_name()
+        self.column = column or getattr(model, "_partition_by", None) or "created_at"
+        self.archive_dir = Path(archive_dir) if archive_dir else None
+        self.is_postgres = "postgresql" in engine.connection_string
+        self._name_re = re.compile(rf"^{re.escape(self.table)}_(\d{{4}})_(\d{{2}})$")
+        self._partitions: Optional[Dict[str, datetime]] = None
+        self.sequence_table = f"{self.table}_sequence"
+        self._sequence_ready = False
+        # Триггеры исходной таблицы для первой партиции при конвертации (только SQLite)
+        self._base_triggers: List[Tuple[str, str]] = []
+        # Менеджеры той же таблицы на других подключениях (см. detached): общий сброс кэша партиций
+        self._peers: "weakref.WeakSet[PartitionManager]" = weakref.WeakSet([self])
+    
+    def detached(self, engine: DatabaseEngine) -> "PartitionManager":
+        """
+        Копия менеджера на другом подключении (например, для записи из отдельного потока)
+        
+        Партиции, созданные одним из менеджеров, становятся видны другому.
+        
+        Args:
+            engine: Движок с собственным подключением к той же БД
+        
+        Returns:
+            Новый PartitionManager
+        """
+        clone = PartitionManager(engine, self.model, self.column,
+                                 str(self.archive_dir) if self.archive_dir else None)
+        clone._base_triggers = self._base_triggers
+        clone._peers = self._peers
+        self._peers.add(clone)
+        return clone
+    
+    def partition_name(self, value: datetime) -> str:
+        """Имя партиции для момента времени"""
+        return f"{self.table}_{value.year:04d}_{value.month:02d}"
+    
+    def _column_definitions(self, partitioned_parent: bool = False, autoincrement: bool = True) -> List[str]:
+        """
+        Определения колонок по полям модели
+        
+        Args:
+            partitioned_parent: Родительская таблица PostgreSQL (первичный ключ с колонкой времени)
+            autoincrement: AUTOINCREMENT для SQLite (у партиций ID выдает общая последовательность)
+        """
+        engine_type = "postgresql" if self.is_postgres else "sqlite"
+        columns = []
+        pk_name = None
+        
+        for field_name, field in self.model.get_fields().items():
+            auto_increment = getattr(field, "auto_increment", False)
+            
+            if self.is_postgres and auto_increment:
+                sql_type = "BIGSERIAL"
+            elif self.is_postgres and field.get_sql_type(engine_type) == "INTEGER":
+                sql_type = "BIGINT"
+            else:
+                sql_type = field.get_sql_type(engine_type)
+            
+            column_def = f"{field_name} {sql_type}"
+            if field.primary_key:
+                pk_name = field_name
+                if not partitioned_parent:
+                    column_def += " PRIMARY KEY"
+                    if not self.is_postgres and auto_increment and autoincrement:
+                        column_def += " AUTOINCREMENT"
+            elif not field.nullable:
+                column_def += " NOT NULL"
+            
+            if field_name == self.column:
+                column_def += " DEFAULT CURRENT_TIMESTAMP"
+            columns.append(column_def)
+        
+        # В PostgreSQL первичный ключ партиционированной таблицы должен включать ключ партиционирования
+        if partitioned_parent and pk_name:
+            columns.append(f"PRIMARY KEY ({pk_name}, {self.column})")
+        return columns
+    
+    def _index_columns(self) -> List[Tuple[str, ...]]:
+        """Индексы для каждой партиции"""
+        fields = self.model.get_fields()
+        indexes = [(self.column,)]
+        if "chat_id" in fields:
+            indexes.append(("chat_id", self.column))
+        for field_name, field in fields.items():
+            if field.index and field_name != self.column:
+                indexes.append((field_name,))
+        return indexes
+    
+    def list_partitions(self) -> Dict[str, datetime]:
+        """
+        Получить существующие партиции
+        
+        Returns:
+            Словарь {имя партиции: начало месяца}, отсортированный по времени
+        """
+        if self._partitions is not None:
+            return self._partitions
+        
+        if self.is_postgres:
+            rows = self.engine.fetchall(
+                "SELECT c.relname AS name FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = ?",
+                (self.table,)
+            )
+        else:
+            rows = self.engine.fetchall(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?",
+                (f"{self.table}_%",)
+            )
+        
+        partitions = {}
+        for row in rows:
+            match = self._name_re.match(row["name"])
+            if match:
+                partitions[row["name"]] = datetime(int(match.group(1)), int(match.group(2)), 1)
+        
+        self._partitions = dict(sorted(partitions.items(), key=lambda item: item[1]))
+        return self._partitions
+    
+    def _invalidate_peers(self):
+        """Сбросить кэш партиций менеджеров на других подключениях"""
+        for peer in list(self._peers):
+            if peer is not self:
+                peer._partitions = None
+    
+    def _table_kind(self, name: str) -> Optional[str]:
+        """Тип объекта с именем name: table, view, partitioned или None"""
+        if self.is_postgres:
+            row = self.engine.fetchone(
+                "SELECT relkind FROM pg_class WHERE relname = ? AND relkind IN ('r', 'p', 'v')",
+                (name,)
+            )
+            if not row:
+                return None
+            return {"r": "table", "p": "partitioned", "v": "view"}[row["relkind"]]
+        
+        row = self.engine.fetchone(
+            "SELECT type FROM sqlite_master WHERE name = ? AND type IN ('table', 'view')",
+            (name,)
+        )
+        return row["type"] if row else None
+    
+    def setup(self, premake: int = 1):
+        """
+        Перевести таблицу модели на партиции (идемпотентно)
+        
+        Существующая непартиционированная таблица переносится в партиции.
+        
+        Args:
+            premake: Сколько будущих месяцев создать заранее
+        """
+        kind = self._table_kind(self.table)
+        
+        if kind == "table":
+            self._convert_existing_table()
+        elif kind is None and self.is_postgres:
+            self.engine.execute(
+                f"CREATE TABLE {self.table} ({', '.join(self._column_definitions(True))}) "
+                f"PARTITION BY RANGE ({self.column})"
+            )
+        
+        current = _month_start(datetime.now())
+        for months in range(premake + 1):
+            self.ensure_partition(_add_months(current, months), refresh_view=False)
+        
+        self._setup_sequence()
+        self._refresh_view()
+        self.engine.commit()
+    
+    def _convert_existing_table(self):
+        """Перенести данные обычной таблицы в партиции"""
+        legacy = f"{self.table}_legacy"
+        logger.info(f"Converting {self.table} to monthly partitions")
+        
+        triggers: List[Tuple[str, str]] = []
+        if not self.is_postgres:
+            # Триггеры таблицы переезжают на партиции, а не на удаляемую legacy таблицу
+            for name, sql in self._table_triggers(self.table):
+                triggers.append((self.table, sql))
+                self.engine.execute(f"DROP TRIGGER {name}")
+        
+        self.engine.execute(f"ALTER TABLE {self.table} RENAME TO {legacy}")
+        if self.is_postgres:
+            self.engine.execute(
+                f"CREATE TABLE {self.table} ({', '.join(self._column_definitions(True))}) "
+                f"PARTITION BY RANGE ({self.column})"
+            )
+        
+        row = self.engine.fetchone(
+            f"SELECT MIN({self.column}) AS first, MAX({self.column}) AS last FROM {legacy}"
+        )
+        if row and row["first"] is not None:
+            month = _month_start(self._to_datetime(row["first"]))
+            last = _month_start(self._to_datetime(row["last"]))
+            columns = ", ".join(self.model.get_fields())
+            
+            while month <= last:
+                name = self.ensure_partition(month, refresh_view=False)
+                target = self.table if self.is_postgres else name
+                self.engine.execute(
+                    f"INSERT INTO {target} ({columns}) SELECT {columns} FROM {legacy} "
+                    f"WHERE {self.column} >= ? AND {self.column} < ?",
+                    (self._bound(month), self._bound(_next_month(month)))
+                )
+                month = _next_month(month)
+        
+        self.engine.execute(f"DROP TABLE {legacy}")
+        
+        # Триггеры создаются после переноса: перенесенные строки уже учтены
+        # зависимыми данными (например, индексом поиска)
+        for name in self.list_partitions():
+            for source, sql in triggers:
+                self.engine.execute(self._retarget_trigger(sql, source, name))
+        self._base_triggers = triggers
+        
+        # Перенесенные строки сохранили ID, сдвигаем последовательность
+        pk_field = self.model.get_primary_key_field()
+        if self.is_postgres and pk_field and getattr(pk_field, "auto_increment", False):
+            self.engine.execute(
+                f"SELECT setval(pg_get_serial_sequence('{self.table}', '{pk_field.name}'), "
+                f"COALESCE((SELECT MAX({pk_field.name}) FROM {self.table}), 1))"
+            )
+    
+    def ensure_partition(self, value: datetime, refresh_view: bool = True) -> str:
+        """
+        Создать партицию для месяца value, если ее нет
+        
+        Returns:
+            Имя партиции
+        """
+        name = self.partition_name(value)
+        partitions = self.list_partitions()
+        if name in partitions:
+            return name
+        
+        start = _month_start(value)
+        if self.is_postgres:
+            self.engine.execute(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {self.table} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{_next_month(start).isoformat()}')"
+            )
+        else:
+            template = self._base_triggers
+            if partitions:
+                latest = list(partitions)[-1]
+                template = [(latest, sql) for _, sql in self._table_triggers(latest)]
+            
+            self.engine.execute(
+                f"CREATE TABLE IF NOT EXISTS {name} ({', '.join(self._column_definitions(autoincrement=False))})"
+            )
+            for source, sql in template:
+                self.engine.execute(self._retarget_trigger(sql, source, name))
+        
+        for columns in self._index_columns():
+            index_name = f"idx_{name}_{'_'.join(columns)}"
+            self.engine.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {name} ({', '.join(columns)})")
+        
+        partitions[name] = start
+        self._partitions = dict(sorted(partitions.items(), key=lambda item: item[1]))
+        self._invalidate_peers()
+        logger.info(f"Created partition {name}")
+        
+        if refresh_view:
+            self._refresh_view()
+        return name
+    
+    def _table_triggers(self, table: str) -> List[Tuple[str, str]]:
+        """Триггеры таблицы: [(имя, SQL)] (только SQLite)"""
+        rows = self.engine.fetchall(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?",
+            (table,)
+        )
+        return [(row["name"], row["sql"]) for row in rows]
+    
+    def _purge_dependents(self, name: str):
+        """
+        Выполнить работу триггеров AFTER DELETE партиции для всех ее строк сразу (только SQLite)
+        
+        Оператор тела вида "DELETE FROM t WHERE rowid = OLD.col" выполняется одним
+        запросом по множеству ID партиции. Если тело триггера другое, строки
+        удаляются построчно, чтобы триггер отработал сам.
+        """
+        statements = []
+        for _, sql in self._table_triggers(name):
+            if not re.match(r"(?is)CREATE\s+TRIGGER\s+(?:IF\s+NOT\s+EXISTS\s+)?\w+\s+AFTER\s+DELETE\b", sql):
+                continue
+            body = re.search(r"(?is)\bBEGIN\b(.*)\bEND\s*$", sql).group(1)
+            for statement in filter(None, (part.strip() for part in body.split(";"))):
+                match = re.fullmatch(r"(?is)DELETE\s+FROM\s+(\w+)\s+WHERE\s+rowid\s*=\s*OLD\.(\w+)", statement)
+                if not match:
+                    self.engine.execute(f"DELETE FROM {name}")
+                    return
+                statements.append(f"DELETE FROM {match.group(1)} WHERE rowid IN (SELECT {match.group(2)} FROM {name})")
+        
+        for statement in statements:
+            self.engine.execute(statement)
+    
+    @staticmethod
+    def _retarget_trigger(sql: str, source: str, target: str) -> str:
+        """
+        SQL триггера таблицы source для таблицы target
+        
+        Меняются только имя триггера (имя таблицы в нем или суффикс) и
+        ON {source}; тело триггера остается прежним.
+        """
+        header = re.match(r"(?is)(CREATE\s+TRIGGER\s+(?:IF\s+NOT\s+EXISTS\s+)?)(\w+)", sql)
+        name = header.group(2)
+        new_name = name.replace(source, target, 1) if source in name else f"{name}_{target}"
+        sql = header.group(1) + new_name + sql[header.end():]
+        return re.sub(rf"(?i)(\bON\s+){re.escape(source)}\b", rf"\g<1>{target}", sql, count=1)
+    
+    def _auto_pk(self) -> Optional[str]:
+        """Имя автоинкрементного первичного ключа модели"""
+        pk_field = self.model.get_primary_key_field()
+        if pk_field and getattr(pk_field, "auto_increment", False):
+            return pk_field.name
+        return None
+    
+    def _setup_sequence(self):
+        """
+        Создать общую последовательность ID партиций (только SQLite)
+        
+        Последовательность продолжается с максимального ID всех партиций, поэтому
+        партиции, созданные до ее появления, тоже получают неповторяющиеся ID.
+        """
+        pk = self._auto_pk()
+        if self.is_postgres or not pk:
+            return
+        
+        self.engine.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.sequence_table} (id INTEGER PRIMARY KEY AUTOINCREMENT)"
+        )
+        last = max([self._sequence_value()] + [
+            self.engine.fetchone(f"SELECT COALESCE(MAX({pk}), 0) AS id FROM {name}")["id"]
+            for name in self.list_partitions()
+        ])
+        self._set_sequence_value(last)
+        self._sequence_ready = True
+    
+    def _sequence_value(self) -> int:
+        row = self.engine.fetchone("SELECT seq FROM sqlite_sequence WHERE name = ?", (self.sequence_table,))
+        return row["seq"] if row else 0
+    
+    def _set_sequence_value(self, value: int):
+        # Только вперед: другое подключение могло уже выдать ID больше value
+        if self.engine.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?",
+                               (value, self.sequence_table)).rowcount == 0:
+            self.engine.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)",
+                                (self.sequence_table, value))
+    
+    def _allocate_ids(self, count: int) -> List[int]:
+        """Выдать count новых ID из общей последовательности"""
+        pk = self._auto_pk()
+        if self.is_postgres:
+            rows = self.engine.fetchall(
+                f"SELECT nextval(pg_get_serial_sequence('{self.table}', '{pk}')) AS id "
+                f"FROM generate_series(1, ?)",
+                (count,)
+            )
+            return [row["id"] for row in rows]
+        
+        if not self._sequence_ready:
+            self._setup_sequence()
+        # Сдвиг открывает транзакцию записи: другое подключение не получит те же ID
+        self.engine.execute("UPDATE sqlite_sequence SET seq = seq + ? WHERE name = ?",
+                            (count, self.sequence_table))
+        last = self._sequence_value()
+        return list(range(last - count + 1, last + 1))
+    
+    def _refresh_view(self):
+        """Пересоздать view над партициями и его триггеры записи (только SQLite)"""
+        if self.is_postgres:
+            return
+        
+        self.engine.execute(f"DROP VIEW IF EXISTS {self.table}")
+        names = list(self.list_partitions())
+        if names:
+            union = " UNION ALL ".join(f"SELECT * FROM {name}" for name in names)
+            self.engine.execute(f"CREATE VIEW {self.table} AS {union}")
+            for trigger in self._view_triggers():
+                self.engine.execute(trigger)
+    
+    def _view_triggers(self) -> List[str]:
+        """
+        INSTEAD OF триггеры view: Session.add/update/delete через модель пишут в партиции
+        
+        Строка попадает в партицию по месяцу колонки времени (первые 7 символов
+        "YYYY-MM" - не зависят от разделителя даты и времени). Для месяца без
+        партиции запись завершается ошибкой, как в PostgreSQL без DEFAULT партиции:
+        партиции создает PartitionManager.setup(premake=...) или insert().
+        """
+        columns = list(self.model.get_fields())
+        pk = self._auto_pk()
+        months = {name: f"{month.year:04d}-{month.month:02d}" for name, month in self.list_partitions().items()}
+        # CURRENT_TIMESTAMP совпадает с DEFAULT колонки времени
+        created = f"COALESCE(NEW.{self.column}, CURRENT_TIMESTAMP)"
+        
+        def insert_new(row_id: str) -> str:
+            values = ", ".join(
+                row_id if column == pk else created if column == self.column else f"NEW.{column}"
+                for column in columns
+            )
+            return "".join(
+                f"INSERT INTO {name} ({', '.join(columns)}) SELECT {values} "
+                f"WHERE substr({created}, 1, 7) = '{month}';\n"
+                for name, month in months.items()
+            )
+        
+        def delete_old() -> str:
+            return "".join(
+                f"DELETE FROM {name} WHERE {pk} = OLD.{pk} AND substr(OLD.{self.column}, 1, 7) = '{month}';\n"
+                for name, month in months.items()
+            )
+        
+        check = (
+            f"SELECT RAISE(ABORT, 'No partition of {self.table} for the row month') "
+            f"WHERE substr({created}, 1, 7) NOT IN ({', '.join(repr(month) for month in months.values())});\n"
+        )
+        
+        if not pk:
+            return [f"CREATE TRIGGER {self.table}_insert INSTEAD OF INSERT ON {self.table} BEGIN\n"
+                    f"{check}{insert_new('')}END"]
+        
+        # ID из общей последовательности; явно заданный ID сдвигает ее вперед
+        insert_body = (
+            check
+            + f"INSERT OR IGNORE INTO {self.sequence_table} (id) VALUES (NEW.{pk});\n"
+            + insert_new(f"COALESCE(NEW.{pk}, last_insert_rowid())")
+            + f"DELETE FROM {self.sequence_table};\n"
+        )
+        # UPDATE может перенести строку в другой месяц: удаляем из старой партиции, вставляем в новую
+        update_body = check + delete_old() + insert_new(f"NEW.{pk}")
+        return [
+            f"CREATE TRIGGER {self.table}_insert INSTEAD OF INSERT ON {self.table} BEGIN\n{insert_body}END",
+            f"CREATE TRIGGER {self.table}_update INSTEAD OF UPDATE ON {self.table} BEGIN\n{update_body}END",
+            f"CREATE TRIGGER {self.table}_delete INSTEAD OF DELETE ON {self.table} BEGIN\n{delete_old()}END",
+        ]
+    
+    def insert(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Вставить строки, распределив их по партициям
+        
+        Строкам без первичного ключа ID выдается из общей последовательности
+        и записывается в переданные словари.
+        
+        Args:
+            rows: Строки в виде словарей {поле: значение}
+        
+        Returns:
+            Количество вставленных строк
+        """
+        rows = list(rows)
+        fields = self.model.get_fields()
+        pk = self._auto_pk()
+        columns = list(fields)
+        now = datetime.now()
+        
+        if pk:
+            missing = [row for row in rows if row.get(pk) is None]
+            if missing:
+                for row, row_id in zip(missing, self._allocate_ids(len(missing))):
+                    row[pk] = row_id
+        
+        grouped: Dict[str, List[Tuple]] = {}
+        created = False
+        for row in rows:
+            value = row.get(self.column) or now
+            row = {**row, self.column: value}
+            name = self.partition_name(value)
+            if name not in self.list_partitions():
+                self.ensure_partition(value, refresh_view=False)
+                created = True
+            grouped.setdefault(name, []).append(
+                tuple(fields[column].to_db_value(row.get(column)) for column in columns)
+            )
+        
+        if created:
+            self._refresh_view()
+        
+        placeholders = ", ".join("?" for _ in columns)
+        count = 0
+        for name, params_seq in grouped.items():
+            target = self.table if self.is_postgres else name
+            self.engine.executemany(
+                f"INSERT INTO {target} ({', '.join(columns)}) VALUES ({placeholders})",
+                params_seq
+            )
+            count += len(params_seq)
+        
+        self.engine.commit()
+        return count
+    
+    def partitions_for_range(self, start: Optional[datetime] = None,
+                             end: Optional[datetime] = None) -> List[str]:
+        """
+        Партиции, пересекающиеся с интервалом [start, end)
+        
+        Returns:
+            Имена партиций в хронологическом порядке
+        """
+        result = []
+        for name, month in self.list_partitions().items():
+            if start is not None and _next_month(month) <= start:
+                continue
+            if end is not None and month >= end:
+                continue
+            result.append(name)
+        return result
+    
+    def select(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+               limit: Optional[int] = None, newest_first: bool = True,
+               **conditions) -> List[Model]:
+        """
+        Выбрать записи за интервал, затрагивая только нужные партиции
+        
+        Args:
+            start: Начало интервала (включительно)
+            end: Конец интервала (не включительно)
+            limit: Максимальное количество записей
+            newest_first: Сортировка от новых к старым
+            **conditions: Условия равенства (как в QueryBuilder.where)
+        
+        Returns:
+            Список моделей
+        """
+        where = [f"{field} = ?" for field in conditions]
+        params: List[Any] = list(conditions.values())
+        if start is not None:
+            where.append(f"{self.column} >= ?")
+            params.append(self._bound(start))
+        if end is not None:
+            where.append(f"{self.column} < ?")
+            params.append(self._bound(end))
+        
+        suffix = ""
+        if where:
+            suffix += " WHERE " + " AND ".join(where)
+        suffix += f" ORDER BY {self.column} {'DESC' if newest_first else 'ASC'}"
+        
+        # PostgreSQL сам отсекает лишние партиции по условию на колонку времени
+        if self.is_postgres:
+            query = f"SELECT * FROM {self.table}{suffix}"
+            if limit:
+                query += f" LIMIT {int(limit)}"
+            return [self.model.from_dict(row) for row in self.engine.fetchall(query, tuple(params))]
+        
+        names = self.partitions_for_range(start, end)
+        if newest_first:
+            names.reverse()
+        
+        result: List[Model] = []
+        for name in names:
+            query = f"SELECT * FROM {name}{suffix}"
+            if limit:
+                query += f" LIMIT {int(limit) - len(result)}"
+            result.extend(self.model.from_dict(row) for row in self.engine.fetchall(query, tuple(params)))
+            if limit and len(result) >= limit:
+                break
+        return result
+    
+    def apply_retention(self, keep_months: int, archive: bool = True,
+                        now: Optional[datetime] = None) -> List[str]:
+        """
+        Удалить партиции старше keep_months месяцев целиком (без построчного DELETE)
+        
+        DROP TABLE не вызывает триггеры удаления (SQLite), поэтому зависимые данные
+        (индекс MessageSearchIndex) очищаются одним запросом на таблицу, см. _purge_dependents.
+        
+        Args:
+            keep_months: Сколько месяцев хранить, включая текущий
+            archive: Сохранить данные в {archive_dir}/{partition}.ndjson.gz перед удалением
+            now: Текущий момент (для тестов)
+        
+        Returns:
+            Имена удаленных партиций
+        """
+        cutoff = _add_months(_month_start(now or datetime.now()), -(keep_months - 1))
+        expired = [name for name, month in self.list_partitions().items() if month < cutoff]
+        
+        for name in expired:
+            if archive and self.archive_dir:
+                path = self.archive_partition(name)
+                logger.info(f"Archived partition {name} to {path}")
+            
+            if self.is_postgres:
+                self.engine.execute(f"ALTER TABLE {self.table} DETACH PARTITION {name}")
+            else:
+                self._purge_dependents(name)
+            self.engine.execute(f"DROP TABLE {name}")
+            del self._partitions[name]
+            logger.info(f"Dropped partition {name}")
+        
+        if expired:
+            self._invalidate_peers()
+            self._refresh_view()
+            self.engine.commit()
+        return expired
+    
+    def archive_partition(self, name: str, chunk_size: int = 5000) -> Path:
+        """
+        Выгрузить партицию в сжатый NDJSON файл
+        
+        Args:
+            name: Имя партиции
+            chunk_size: Размер порции чтения
+        
+        Returns:
+            Путь к архиву
+        """
+        if not self.archive_dir:
+            raise ValueError("archive_dir не задан")
+        
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        path = self.archive_dir / f"{name}.ndjson.gz"
+        pk_field = self.model.get_primary_key_field()
+        order_column = pk_field.name if pk_field else self.column
+        
+        offset = 0
+        with gzip.open(path, "wt", encoding="utf-8") as archive:
+            while True:
+                rows = self.engine.fetchall(
+                    f"SELECT * FROM {name} ORDER BY {order_column} LIMIT {chunk_size} OFFSET {offset}"
+                )
+                for row in rows:
+                    archive.write(json.dumps(row, ensure_ascii=False, default=str))
+                    archive.write("\n")
+                if len(rows) < chunk_size:
+                    break
+                offset += chunk_size
+        return path
+    
+    def _bound(self, value: datetime) -> Any:
+        """Значение границы интервала для запроса"""
+        if self.is_postgres:
+            return value
+        return value.isoformat()
+    
+    @staticmethod
+    def _to_datetime(value: Any) -> datetime:
+        if isinstance(value, datetime):
+            return value
+        return datetime.fromisoformat(str(value).replace(" ", "T"))
+
+
+class PartitionedTableMigration(Migration):
+    """
+    Миграция, переводящая таблицу модели на помесячные партиции
+    
+    Usage:
+        class PartitionMessages(PartitionedTableMigration):
+            model = Message
+    """
+    
+    model: Type[Model] = None
+    column: Optional[str] = None
+    
+    def up(self, engine: DatabaseEngine):
+        """Apply migration"""
+        PartitionManager(engine, self.model, self.column).setup()
+    
+    def down(self, engine: DatabaseEngine):
+        """Rollback migration: собрать партиции обратно в одну таблицу"""
+        manager = PartitionManager(engine, self.model, self.column)
+        table = manager.table
+        merged = f"{table}_merged"
+        columns = ", ".join(self.model.get_fields())
+        
+        engine.execute(f"CREATE TABLE {merged} ({', '.join(manager._column_definitions())})")
+        engine.execute(f"INSERT INTO {merged} ({columns}) SELECT {columns} FROM {table}")
+        
+        if manager.is_postgres:
+            engine.execute(f"DROP TABLE {table} CASCADE")
+        else:
+            engine.execute(f"DROP VIEW IF EXISTS {table}")
+            for name in manager.list_partitions():
+                engine.execute(f"DROP TABLE {name}")
+            engine.execute(f"DROP TABLE IF EXISTS {manager.sequence_table}")
+        
+        engine.execute(f"ALTER TABLE {merged} RENAME TO {table}")
+        engine.commit()
@@ -2,14 +2,17 @@
 Сессия для работы с БД
 """
 
-from typing import Type, TypeVar, Optional, List
-from .models import Model
+import logging
+from typing import Any, Dict, Type, TypeVar, Optional, List, Set
+from .models import Model, Field
 from .query import QueryBuilder
-from .engine import DatabaseEngine
+from .engine import DatabaseEngine, create_engine
 
 
 T = TypeVar('T', bound=Model)
 
+logger = logging.getLogger(__name__)
+
 
 class Session:
     """Сессия для работы с БД"""
@@ -17,6 +20,49 @@ class Session:
     def __init__(self, engine: DatabaseEngine):
         self.engine = engine
         self._in_transaction = False
+        # Таблица -> nullable поля модели без колонки в БД (миграция еще не применена)
+        self._missing_columns: Dict[str, Set[str]] = {}
+    
+    def detached(self) -> Optional["Session"]:
+        """
+        Сессия с собственным подключением к той же БД (для записи из другого потока)
+        
+        Returns:
+            Новая сессия или None, если БД в памяти и второе подключение ее не увидит
+        """
+        connection_string = self.engine.connection_string
+        if connection_string.startswith("sqlite://") and ":memory:" in connection_string:
+            return None
+        return Session(create_engine(connection_string))
+    
+    def _fields(self, model: Type[Model]) -> Dict[str, Field]:
+        """
+        Поля модели для записи в БД
+        
+        Nullable поля, добавленные в модель новой версией фреймворка, пропускаются,
+        пока миграция (tgframework migrate:upgrade) не добавила их колонки.
+        Отсутствие колонки проверяется один раз на таблицу за время жизни сессии.
+        """
+        table_name = model.get_table_name()
+        fields = model.get_fields()
+        missing = self._missing_columns.get(table_name)
+        if missing is None:
+            try:
+                cursor = self.engine.execute(f"SELECT * FROM {table_name} LIMIT 0")
+                columns = {column[0] for column in cursor.description}
+            except Exception:
+                # Нет таблицы: ошибку покажет сам запрос записи
+                return fields
+            missing = {name for name, field in fields.items() if field.nullable and name not in columns}
+            self._missing_columns[table_name] = missing
+            if missing:
+                logger.warning(
+                    f"Table {table_name} has no columns {sorted(missing)}, they are not saved. "
+                    f"Run: tgframework migrate:upgrade"
+                )
+        if not missing:
+            return fields
+        return {name: field for name, field in fields.items() if name not in missing}
     
     def query(self, model: Type[T]) -> QueryBuilder:
         """Создать запрос для модели"""
@@ -25,7 +71,7 @@ class Session:
     def add(self, instance: Model):
         """Добавить объект в БД"""
         table_name = instance.get_table_name()
-        fields = instance.get_fields()
+        fields = self._fields(type(instance))
         
         # Собираем данные для вставки
         columns = []
@@ -50,17 +96,114 @@ class Session:
         if hasattr(cursor, 'lastrowid'):
             pk_field = instance.get_primary_key_field()
             if pk_field:
-                setattr(instance, pk_field.name, cursor.lastrowid)
+                setattr(instance, pk_field.name, self._inserted_id(instance, cursor))
         
         if not self._in_transaction:
             self.engine.commit()
         
         return instance
     
+    def _inserted_id(self, instance: Model, cursor: Any) -> Any:
+        """ID вставленной записи"""
+        if instance._partition_by and self.engine.connection_string.startswith("sqlite"):
+            # INSERT во view помесячных партиций (PartitionManager): lastrowid не меняется,
+            # ID выдан общей последовательностью партиций
+            row = self.engine.fetchone(
+                "SELECT seq FROM sqlite_sequence WHERE name = ?",
+                (f"{instance.get_table_name()}_sequence",)
+            )
+            if row:
+                return row["seq"]
+        return cursor.lastrowid
+    
+    def bulk_insert(self, model: Type[T], rows: List[Dict[str, Any]]) -> int:
+        """
+        Вставить набор строк одним пакетным запросом
+        
+        Args:
+            model: Класс модели
+            rows: Строки в виде словарей {поле: значение}
+        
+        Returns:
+            Количество вставленных строк
+        """
+        if not rows:
+            return 0
+        
+        fields = self._fields(model)
+        columns = [
+            name for name, field in fields.items()
+            if not getattr(field, 'auto_increment', False) and any(name in row for row in rows)
+        ]
+        
+        query = (
+            f"INSERT INTO {model.get_table_name()} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+        params_seq = [
+            tuple(fields[name].to_db_value(row.get(name)) for name in columns)
+            for row in rows
+        ]
+        self.engine.executemany(query, params_seq)
+        
+        if not self._in_transaction:
+            self.engine.commit()
+        
+        return len(rows)
+    
+    def bulk_upsert(self, model: Type[T], rows: List[Dict[str, Any]],
+                    update_fields: Optional[List[str]] = None) -> int:
+        """
+        Вставить или обновить набор строк одним запросом (INSERT ... ON CONFLICT)
+        
+        Args:
+            model: Класс модели
+            rows: Строки в виде словарей {поле: значение}
+            update_fields: Поля для обновления при конфликте
+                (по умолчанию все переданные поля, кроме первичного ключа)
+        
+        Returns:
+            Количество обработанных строк
+        """
+        if not rows:
+            return 0
+        
+        pk_field = model.get_primary_key_field()
+        if not pk_field:
+            raise ValueError("Модель не имеет первичного ключа")
+        
+        fields = self._fields(model)
+        columns = [name for name in fields if any(name in row for row in rows)]
+        if update_fields is None:
+            update_fields = [name for name in columns if name != pk_field.name]
+        else:
+            update_fields = [name for name in update_fields if name in fields]
+        
+        query = (
+            f"INSERT INTO {model.get_table_name()} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT ({pk_field.name}) "
+        )
+        if update_fields:
+            query += "DO UPDATE SET " + ", ".join(f"{name} = excluded.{name}" for name in update_fields)
+        else:
+            query += "DO NOTHING"
+        
+        params_seq = [
+            tuple(fields[name].to_db_value(row.get(name)) for name in columns)
+            for row in rows
+        ]
+        self.engine.executemany(query, params_seq)
+        
+        if not self._in_transaction:
+            self.engine.commit()
+        
+        return len(rows)
+    
     def update(self, instance: Model):
         """Обновить объект в БД"""
         table_name = instance.get_table_name()
-        fields = instance.get_fields()
+        fields = self._fields(type(instance))
         pk_field = instance.get_primary_key_field()
         
         if not pk_field:
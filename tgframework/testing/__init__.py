@@ -0,0 +1,11 @@
+"""
+Инструменты для тестов и бенчмарков
+"""
+
+from .fake_api import FakeTelegramAPI
+from .transport import InMemoryTransport
+
+__all__ = [
+    "FakeTelegramAPI",
+    "InMemoryTransport",
+]
@@ -0,0 +1,379 @@
+"""
+Локальный fake Telegram Bot API сервер
+
+Позволяет запускать TelegramBot без api.telegram.org: для e2e тестов,
+бенчмарков и отладки. Сервер отдает update через getUpdates, принимает
+исходящие методы и умеет имитировать задержки, 429 и ошибки сервера.
+
+Usage:
+    async with FakeTelegramAPI(latency=0.01, rate_limit_rate=0.05) as api:
+        api.generate_updates(1000)
+        bot = TelegramBot("123:TEST", api_base_url=api.base_url)
+        ...
+        print(api.stats())
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import random
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+
+class FakeTelegramAPI:
+    """Fake Bot API на aiohttp"""
+    
+    # Методы, к которым применяются задержка и ошибки (getUpdates не затрагивается)
+    FAULT_EXEMPT_METHODS = ("getUpdates",)
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: int = 1, error_rate: float = 0.0,
+                 max_poll_timeout: float = 1.0, poll_latency: float = 0.0, seed: Optional[int] = None):
+        """
+        Args:
+            host: Адрес сервера
+            port: Порт (0 - выбрать свободный)
+            latency: Задержка ответа на исходящие методы в секундах
+            rate_limit_rate: Доля запросов, на которые отвечать 429
+            retry_after: Значение retry_after в ответе 429
+            error_rate: Доля запросов, на которые отвечать 500
+            max_poll_timeout: Максимальное время ожидания в getUpdates
+            poll_latency: Задержка ответа getUpdates (имитация сетевого RTT)
+            seed: Seed генератора случайных чисел для воспроизводимости
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.max_poll_timeout = max_poll_timeout
+        self.poll_latency = poll_latency
+        self.random = random.Random(seed)
+        
+        self.updates: Deque[Dict[str, Any]] = deque()
+        self.files: Dict[str, bytes] = {}
+        self.allowed_updates: List[str] = []
+        self.requests: List[Dict[str, Any]] = []
+        self._new_updates = asyncio.Event()
+        self._next_update_id = 1
+        self._message_ids = itertools.count(1)
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url: Optional[str] = None
+        
+        # Метрики
+        self.method_counts: Counter = Counter()
+        self.injected_429 = 0
+        self.injected_errors = 0
+    
+    async def __aenter__(self) -> "FakeTelegramAPI":
+        await self.start()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+    
+    async def start(self) -> str:
+        """
+        Запустить сервер
+        
+        Returns:
+            Базовый URL для TelegramBot(api_base_url=...)
+        """
+        # Bot API принимает файлы до 50 MB
+        app = web.Application(client_max_size=50 * 1024 * 1024)
+        app.router.add_route("*", "/bot{token}/{method}", self._handle)
+        app.router.add_get("/file/bot{token}/{file_path:.+}", self._handle_file)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        
+        self.port = self._runner.addresses[0][1]
+        self.base_url = f"http://{self.host}:{self.port}"
+        logger.info(f"Fake Bot API started on {self.base_url}")
+        return self.base_url
+    
+    async def stop(self):
+        """Остановить сервер"""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+    
+    def add_update(self, update: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Поставить update в очередь getUpdates (update_id назначается, если не указан)
+        
+        Returns:
+            Добавленный update
+        """
+        if "update_id" not in update:
+            update = {"update_id": self._next_update_id, **update}
+        self._next_update_id = max(self._next_update_id, update["update_id"] + 1)
+        self.updates.append(update)
+        self._new_updates.set()
+        return update
+    
+    def add_updates(self, updates: Iterable[Dict[str, Any]]):
+        """Поставить несколько update в очередь"""
+        for update in updates:
+            self.add_update(update)
+    
+    def add_journal(self, directory: str):
+        """Поставить в очередь update из журнала UpdateJournal"""
+        from ..infrastructure.journal import JournalReader
+        self.add_updates(update for _, update in JournalReader(directory))
+    
+    def generate_updates(self, count: int, chats: int = 100, text: str = "hello",
+                         callback_ratio: float = 0.0):
+        """
+        Сгенерировать синтетические update
+        
+        Args:
+            count: Количество update
+            chats: Количество разных чатов (пользователь = чат)
+            text: Текст сообщений
+            callback_ratio: Доля callback_query среди update
+        """
+        now = int(time.time())
+        for i in range(count):
+            chat_id = 100000 + i % chats
+            user = {"id": chat_id, "is_bot": False, "first_name": f"User{chat_id}"}
+            chat = {"id": chat_id, "type": "private", "first_name": user["first_name"]}
+            message = {"message_id": i + 1, "date": now, "chat": chat, "from": user, "text": text}
+            
+            if callback_ratio and self.random.random() < callback_ratio:
+                self.add_update({"callback_query": {
+                    "id": str(i + 1), "from": user, "message": message,
+                    "chat_instance": str(chat_id), "data": text,
+                }})
+            else:
+                self.add_update({"message": message})
+    
+    def add_file(self, file_id: str, content: bytes) -> Dict[str, Any]:
+        """
+        Добавить файл, доступный через getFile и /file/bot<token>/<file_path>
+        
+        Returns:
+            Объект File
+        """
+        self.files[file_id] = content
+        return self._file_info(file_id)
+    
+    def _file_info(self, file_id: str) -> Dict[str, Any]:
+        return {"file_id": file_id, "file_unique_id": file_id,
+                "file_size": len(self.files[file_id]), "file_path": f"files/{file_id}"}
+    
+    def sent(self, method: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Принятые запросы
+        
+        Args:
+            method: Фильтр по методу
+        
+        Returns:
+            Список {"method", "params", "time"}
+        """
+        if method is None:
+            return list(self.requests)
+        return [request for request in self.requests if request["method"] == method]
+    
+    async def wait_for(self, method: str, count: int, timeout: float = 30.0) -> bool:
+        """
+        Дождаться, пока метод будет успешно вызван count раз
+        
+        Returns:
+            True если дождались, False по таймауту
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if len(self.sent(method)) >= count:
+                return True
+            await asyncio.sleep(0.01)
+        return False
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Получить метрики сервера
+        
+        Returns:
+            Словарь с метриками
+        """
+        return {
+            "pending_updates": len(self.updates),
+            "methods": dict(self.method_counts),
+            "injected_429": self.injected_429,
+            "injected_errors": self.injected_errors,
+        }
+    
+    async def _read_params(self, request: web.Request) -> Dict[str, Any]:
+        """Параметры запроса из JSON, формы или query string"""
+        params: Dict[str, Any] = dict(request.query)
+        if request.can_read_body:
+            if request.content_type == "application/json":
+                params.update(await request.json())
+            else:
+                for name, value in (await request.post()).items():
+                    if isinstance(value, web.FileField):
+                        # Файлы не храним: достаточно имени и размера
+                        value = {"filename": value.filename, "size": len(value.file.read())}
+                    params[name] = value
+        return params
+    
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = await self._read_params(request)
+        self.method_counts[method] += 1
+        
+        if method not in self.FAULT_EXEMPT_METHODS:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self.rate_limit_rate and self.random.random() < self.rate_limit_rate:
+                self.injected_429 += 1
+                return web.json_response({
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                }, status=429)
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.injected_errors += 1
+                return web.json_response({
+                    "ok": False,
+                    "error_code": 500,
+                    "description": "Internal Server Error",
+                }, status=500)
+        
+        if method == "getUpdates":
+            result = await self._get_updates(params)
+        elif method == "getFile" and params.get("file_id") in self.files:
+            result = self._file_info(params["file_id"])
+        else:
+            self.requests.append({"method": method, "params": params, "time": time.time()})
+            result = fake_result(method, params, next(self._message_ids), pending_updates=len(self.updates))
+        
+        return web.json_response({"ok": True, "result": result})
+    
+    async def _handle_file(self, request: web.Request) -> web.StreamResponse:
+        """Скачивание файла с поддержкой Range"""
+        file_id = request.match_info["file_path"].rsplit("/", 1)[-1]
+        content = self.files.get(file_id)
+        if content is None:
+            raise web.HTTPNotFound()
+        self.method_counts["download"] += 1
+        
+        range_header = request.headers.get("Range", "")
+        if range_header.startswith("bytes="):
+            start = int(range_header[6:].split("-")[0] or 0)
+            if start >= len(content):
+                raise web.HTTPRequestRangeNotSatisfiable()
+            return web.Response(body=content[start:], status=206, headers={
+                "Content-Range": f"bytes {start}-{len(content) - 1}/{len(content)}",
+            })
+        return web.Response(body=content)
+    
+    async def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """getUpdates: подтвердить update ниже offset и вернуть следующую пачку"""
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = min(float(params.get("timeout") or 0), self.max_poll_timeout)
+        
+        allowed = params.get("allowed_updates")
+        if isinstance(allowed, str):
+            allowed = json.loads(allowed)
+        if allowed is not None:
+            self.allowed_updates = allowed
+        
+        while self.updates and self.updates[0]["update_id"] < offset:
+            self.updates.popleft()
+        
+        if self.allowed_updates:
+            # Как и Telegram, не доставляем (и отбрасываем) update неразрешенных типов
+            allowed_set = set(self.allowed_updates)
+            self.updates = deque(
+                update for update in self.updates
+                if any(key in allowed_set for key in update if key != "update_id")
+            )
+        
+        if not self.updates and timeout > 0:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        
+        if self.poll_latency:
+            await asyncio.sleep(self.poll_latency)
+        return list(itertools.islice(self.updates, limit))
+
+
+def fake_result(method: str, params: Dict[str, Any], message_id: int, pending_updates: int = 0) -> Any:
+    """
+    Правдоподобный результат исходящего метода Bot API
+    
+    Args:
+        method: Название метода
+        params: Параметры вызова
+        message_id: ID для нового сообщения
+        pending_updates: Значение pending_update_count для getWebhookInfo
+    
+    Returns:
+        Поле result ответа API
+    """
+    if method in ("sendMessage", "editMessageText", "sendPhoto", "sendDocument"):
+        chat_id = params.get("chat_id")
+        message = {
+            "message_id": int(params.get("message_id") or message_id),
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id) if str(chat_id).lstrip("-").isdigit() else chat_id, "type": "private"},
+        }
+        if "text" in params:
+            message["text"] = params["text"]
+        if "caption" in params:
+            message["caption"] = params["caption"]
+        if "reply_markup" in params:
+            markup = params["reply_markup"]
+            message["reply_markup"] = json.loads(markup) if isinstance(markup, str) else markup
+        if method == "sendPhoto":
+            message["photo"] = [_fake_file(params.get("photo"), message["message_id"])]
+        elif method == "sendDocument":
+            message["document"] = _fake_file(params.get("document"), message["message_id"])
+        return message
+    if method == "sendMediaGroup":
+        media = params.get("media") or []
+        if isinstance(media, str):
+            media = json.loads(media)
+        messages = []
+        for i, item in enumerate(media):
+            kind = item.get("type", "document")
+            message = fake_result("sendPhoto" if kind == "photo" else "sendDocument",
+                                  {"chat_id": params.get("chat_id"), kind: item.get("media")},
+                                  message_id * 100 + i)
+            message["media_group_id"] = str(message_id)
+            messages.append(message)
+        return messages
+    if method == "getChatAdministrators":
+        return []
+    if method == "getChatMember":
+        return {"status": "member", "user": {"id": int(params.get("user_id") or 0), "is_bot": False, "first_name": "User"}}
+    if method == "getMe":
+        return {"id": 1, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}
+    if method == "getWebhookInfo":
+        return {"url": "", "has_custom_certificate": False, "pending_update_count": pending_updates}
+    return True
+
+
+def _fake_file(value: Any, message_id: int) -> Dict[str, Any]:
+    """Описание файла: переданный file_id или новый для загруженного файла"""
+    if isinstance(value, str) and value and not value.startswith("attach://") and "://" not in value:
+        file_id = value
+    else:
+        file_id = f"fake-file-{message_id}"
+    return {"file_id": file_id, "file_unique_id": file_id}
@@ -0,0 +1,167 @@
+"""
+Транспорт в памяти для тестов и бенчмарков
+"""
+
+import asyncio
+import itertools
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterable, List, Optional, Union
+
+from ..bot.media import InputFile
+from ..bot.transport import Transport
+from .fake_api import fake_result
+
+
+class InMemoryTransport(Transport):
+    """
+    Транспорт без сети: запоминает вызовы и возвращает заготовленные ответы
+    
+    Usage:
+        transport = InMemoryTransport()
+        bot = TelegramBot("123:TEST", transport=transport)
+        
+        await bot.feed_update(update)
+        assert transport.calls_to("sendMessage")[0]["text"] == "Привет"
+    """
+    
+    def __init__(self, record: bool = True):
+        """
+        Args:
+            record: Запоминать вызовы (отключается в бенчмарках)
+        """
+        self.record = record
+        self.calls: List[Dict[str, Any]] = []
+        self.updates: Deque[Dict[str, Any]] = deque()
+        self._results: Dict[str, Union[Any, Callable[[Dict[str, Any]], Any]]] = {}
+        self._errors: Dict[str, Deque[Dict[str, Any]]] = {}
+        self.files: Dict[str, bytes] = {}
+        self._message_ids = itertools.count(1)
+        self._new_updates = asyncio.Event()
+    
+    def set_result(self, method: str, result: Union[Any, Callable[[Dict[str, Any]], Any]]):
+        """
+        Задать ответ метода
+        
+        Args:
+            method: Название метода
+            result: Значение result или функция params -> result
+        """
+        self._results[method] = result
+    
+    def fail(self, method: str, error_code: int = 400, description: str = "Bad Request",
+             times: int = 1, retry_after: Optional[int] = None):
+        """
+        Вернуть ошибку на следующие times вызовов метода
+        
+        Args:
+            method: Название метода
+            error_code: Код ошибки API
+            description: Описание ошибки
+            times: Сколько вызовов завершить ошибкой
+            retry_after: parameters.retry_after (для 429)
+        """
+        response = {"ok": False, "error_code": error_code, "description": description}
+        if retry_after is not None:
+            response["parameters"] = {"retry_after": retry_after}
+        self._errors.setdefault(method, deque()).extend([response] * times)
+    
+    def add_updates(self, updates: Iterable[Dict[str, Any]]):
+        """Поставить update в очередь getUpdates"""
+        self.updates.extend(updates)
+        self._new_updates.set()
+    
+    def add_file(self, file_id: str, content: bytes) -> Dict[str, Any]:
+        """
+        Добавить файл, доступный через getFile и download
+        
+        Returns:
+            Объект File
+        """
+        self.files[file_id] = content
+        return self._file_info(file_id)
+    
+    def _file_info(self, file_id: str) -> Dict[str, Any]:
+        return {"file_id": file_id, "file_unique_id": file_id,
+                "file_size": len(self.files[file_id]), "file_path": f"files/{file_id}"}
+    
+    def calls_to(self, method: str) -> List[Dict[str, Any]]:
+        """
+        Параметры всех вызовов метода
+        
+        Returns:
+            Список параметров в порядке вызовов
+        """
+        return [call["params"] for call in self.calls if call["method"] == method]
+    
+    def reset(self):
+        """Забыть вызовы, ответы и ошибки"""
+        self.calls.clear()
+        self._results.clear()
+        self._errors.clear()
+    
+    async def request(self, method: str, url: str, params: Dict[str, Any],
+                      timeout: float = 30.0) -> Dict[str, Any]:
+        errors = self._errors.get(method)
+        if errors:
+            return errors.popleft()
+        
+        if method == "getUpdates":
+            return {"ok": True, "result": await self._get_updates(params)}
+        
+        if self.record:
+            self.calls.append({"method": method, "params": params})
+        
+        if method == "getFile" and params.get("file_id") in self.files:
+            return {"ok": True, "result": self._file_info(params["file_id"])}
+        
+        if method in self._results:
+            result = self._results[method]
+            if callable(result):
+                result = result(params)
+        else:
+            result = fake_result(method, params, next(self._message_ids))
+        return {"ok": True, "result": result}
+    
+    async def upload(self, method: str, url: str, params: Dict[str, Any],
+                     files: Dict[str, InputFile], timeout: float = 300.0) -> Dict[str, Any]:
+        uploaded = {}
+        for name, file in files.items():
+            # Читаем источник, как это сделал бы сетевой транспорт
+            data = file.open()
+            try:
+                if isinstance(data, bytes):
+                    size = len(data)
+                elif hasattr(data, "read"):
+                    size = sum(len(chunk) for chunk in iter(lambda: data.read(65536), b""))
+                else:
+                    size = 0
+                    async for chunk in data:
+                        size += len(chunk)
+            finally:
+                file.close()
+            uploaded[name] = {"filename": file.filename, "content_type": file.content_type, "size": size}
+        return await self.request(method, url, {**params, "files": uploaded}, timeout)
+    
+    async def download(self, url: str, offset: int = 0, chunk_size: int = 65536,
+                       timeout: float = 300.0) -> AsyncIterator[bytes]:
+        file_id = url.rsplit("/", 1)[-1]
+        if file_id not in self.files:
+            raise FileNotFoundError(url)
+        content = self.files[file_id]
+        for start in range(offset, len(content), chunk_size):
+            yield content[start:start + chunk_size]
+    
+    async def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Отдать update начиная с offset; без update ждать не дольше timeout"""
+        offset = params.get("offset") or 0
+        while self.updates and self.updates[0]["update_id"] < offset:
+            self.updates.popleft()
+        
+        if not self.updates and params.get("timeout"):
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), params["timeout"])
+            except asyncio.TimeoutError:
+                pass
+        
+        return list(itertools.islice(self.updates, params.get("limit") or 100))
@@ -16,6 +16,29 @@ class AdminController(Controller):
         super().__init__()
         self.session = session
         self.auth = auth
+        self._user_service = None
+        self._message_service = None
+    
+    def _get_user_service(self):
+        """Получить сервис пользователей с кэшем проверок прав"""
+        if self._user_service is None:
+            from ...domain import UserService, UserRepository, CachedUserRepository
+            from ...infrastructure import TTLCache
+            
+            # Короткий TTL, чтобы снятие прав применялось быстро
+            repository = CachedUserRepository(UserRepository(self.session), TTLCache(ttl=60.0))
+            self._user_service = UserService(repository)
+        return self._user_service
+    
+    def _get_message_service(self):
+        """Получить сервис сообщений с полнотекстовым индексом"""
+        if self._message_service is None:
+            from ...domain import MessageService, MessageRepository, MessageSearchIndex
+            
+            search_index = MessageSearchIndex(self.session.engine)
+            search_index.setup()
+            self._message_service = MessageService(MessageRepository(self.session, search_index=search_index))
+        return self._message_service
     
     def _check_admin(self, request: web.Request) -> bool:
         """Проверить права администратора"""
@@ -30,9 +53,7 @@ class AdminController(Controller):
             if not user_id or not self.session:
                 return False
             
-            from ...domain import UserService, UserRepository
-            user_service = UserService(UserRepository(self.session))
-            return user_service.is_admin(user_id)
+            return self._get_user_service().is_admin(user_id)
         except Exception:
             return False
     
@@ -226,10 +247,7 @@ class AdminController(Controller):
         
         user_id = user_data['id']
         
-        from ...domain import UserService, UserRepository
-        user_service = UserService(UserRepository(self.session))
-        
-        if not user_service.is_admin(user_id):
+        if not self._get_user_service().is_admin(user_id):
             return self.redirect('/admin/login?error=not_admin')
         
         session_data = {
@@ -276,4 +294,52 @@ class AdminController(Controller):
             ])
         except Exception as e:
             return self.error(str(e), 500)
-
+    
+    async def cache_stats(self, request: web.Request):
+        """GET /admin/cache - статистика кэша пользователей"""
+        if not self._check_admin(request):
+            return self.error("Unauthorized", 401)
+        
+        return self.success(self._get_user_service().repository.cache_stats())
+    
+    async def search_messages(self, request: web.Request):
+        """GET /admin/messages/search?chat_id=...&q=...&page=1 - поиск по сообщениям"""
+        if not self._check_admin(request):
+            return self.error("Unauthorized", 401)
+        
+        if not self.session:
+            return self.error("Database not configured", 500)
+        
+        try:
+            chat_id = int(request.query.get("chat_id", ""))
+            page = int(request.query.get("page", 1))
+            per_page = min(int(request.query.get("per_page", 20)), 100)
+        except ValueError:
+            return self.error("chat_id, page and per_page must be integers", 400)
+        
+        query = request.query.get("q", "").strip()
+        if not query:
+            return self.error("q is required", 400)
+        
+        try:
+            result = self._get_message_service().search(chat_id, query, page, per_page)
+            
+            return self.success({
+                "query": result.query,
+                "page": result.page,
+                "per_page": result.per_page,
+                "has_next": result.has_next,
+                "hits": [
+                    {
+                        "message_id": hit.message_id,
+                        "user_id": hit.user_id,
+                        "text": hit.text,
+                        "snippet": hit.snippet,
+                        "rank": hit.rank,
+                        "created_at": hit.created_at.isoformat() if hit.created_at else None,
+                    }
+                    for hit in result.hits
+                ],
+            })
+        except Exception as e:
+            return self.error(str(e), 500)
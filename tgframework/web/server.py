@@ -64,6 +64,8 @@ class WebServer:
                 self.router.get("/login", self.admin_controller.login, name="admin.login")
                 self.router.get("/auth", self.admin_controller.authenticate, name="admin.auth")
                 self.router.get("/users", self.admin_controller.users, name="admin.users")
+                self.router.get("/cache", self.admin_controller.cache_stats, name="admin.cache")
+                self.router.get("/messages/search", self.admin_controller.search_messages, name="admin.messages.search")
                 self.router.post("/logout", self.admin_controller.logout, name="admin.logout")
         
         # Применить маршруты к приложению